@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# In-memory airline lookup, built once from the airline_info collection
+# populated by skyshark_metadata_loader.load_airlines(). Flight IDs are
+# resolved with one or two dict lookups so that this can run for every
+# ACARS message without touching the database.
+
+import re
+import logging
+
+airline_fields = ['iata', 'icao', 'airline', 'callsign', 'country']
+
+def airline_resolver(dbh, coll='airline_info'):
+    '''Build a dict mapping 2-character IATA and 3-character ICAO prefixes to airline records.
+
+    Entries flagged 'unlikely' only win if nothing else claims the prefix.
+    '''
+    resolver = {}
+    unlikely = set()
+    projection = dict([(f, True) for f in airline_fields + ['unlikely']])
+    projection['_id'] = False
+
+    for rec in dbh[coll].find({}, projection):
+        is_unlikely = bool(rec.pop('unlikely', False))
+        for key, rgx in [('iata', '^[0-9A-Z]{2}$'), ('icao', '^[A-Z]{3}$')]:
+            code = (rec.get(key) or '').strip().upper()
+            if not re.match(rgx, code):
+                continue
+            if code in resolver:
+                if is_unlikely or code not in unlikely:
+                    logging.debug("airline prefix %s: keeping %s over %s", code,
+                                  resolver[code].get('airline'), rec.get('airline'))
+                    continue
+            resolver[code] = rec
+            if is_unlikely:
+                unlikely.add(code)
+            else:
+                unlikely.discard(code)
+
+    logging.info("loaded %d airline prefixes", len(resolver))
+    return resolver
+
+def resolve_flight(resolver, flight):
+    '''Map a flight ID such as "UA0123" or "UAL123" to an airline record, or None'''
+    if not resolver or not flight or len(flight) < 3:
+        return None
+    # ICAO style flight IDs have a letter in the third position, IATA style
+    # flight IDs are always numeric after the two character prefix.
+    if flight[2].isalpha():
+        rec = resolver.get(flight[:3])
+        if rec is not None:
+            return rec
+    return resolver.get(flight[:2])
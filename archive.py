@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Columnar archive of positions and ACARS messages, for analysis with
+# vectorized tools (pandas, DuckDB, Spark, ...) instead of aggregations in
+# Mongo. Files are Parquet or Arrow IPC, one directory per kind and day:
+#
+#   DIR/adsb_positions/date=2024-03-15/part-1710460800-1710547200.parquet
+#   DIR/acars/date=2024-03-15/part-...arrow
+#
+# Each file holds documents with lo <= time < hi, named by those epoch
+# seconds. Files are written under a temporary name and renamed when
+# complete, so readers never see a partial file. skyshark_export.py keeps
+# a watermark per kind in DIR/KIND/_watermark and only exports what is
+# newer; the loaders can also write the archive directly (-A), see
+# ArchiveSink. Needs pyarrow.
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from calendar import timegm
+
+import metrics
+from stream import msg_position
+from partitions import _utc
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+rows_total = metrics.counter('skyshark_archive_rows_total', 'rows written to the columnar archive', ['kind'])
+files_total = metrics.counter('skyshark_archive_files_total', 'files written to the columnar archive', ['kind'])
+
+def _str(v):
+    if v is None:
+        return None
+    return v if isinstance(v, basestring) else str(v)
+
+def _int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def _bool(v):
+    return None if v is None else bool(v)
+
+def _lon(doc):
+    pos = msg_position(doc)
+    return pos[0] if pos is not None else None
+
+def _lat(doc):
+    pos = msg_position(doc)
+    return pos[1] if pos is not None else None
+
+def _acars_time(doc):
+    return doc['date'] if 'date' in doc else doc['timestamp']
+
+# kind -> (time field in mongo, [(column, type, extract)])
+schemas = {
+    'adsb_positions': ('timestamp', [
+        ('timestamp', 'timestamp', lambda d: _utc(d['timestamp'])),
+        ('icao24', 'string', lambda d: _str(d.get('icao24'))),
+        ('callsign', 'string', lambda d: _str(d.get('callsign')) or None),
+        ('lon', 'float64', _lon),
+        ('lat', 'float64', _lat),
+        ('altitude', 'float32', lambda d: _float(d.get('altitude'))),
+        ('squawk', 'int16', lambda d: _int(d.get('squawk'))),
+        ('is_on_ground', 'bool', lambda d: _bool(d.get('is_on_ground'))),
+        ('alert', 'bool', lambda d: _bool(d.get('alert'))),
+        ('emergency', 'bool', lambda d: _bool(d.get('emergency'))),
+        ('spi', 'bool', lambda d: _bool(d.get('spi'))),
+    ]),
+    'acars': ('date', [
+        ('timestamp', 'timestamp', lambda d: _utc(_acars_time(d))),
+        ('station_id', 'string', lambda d: _str(d.get('station_id'))),
+        ('channel', 'int16', lambda d: _int(d.get('channel'))),
+        ('rxfreq', 'float64', lambda d: _float(d.get('rxfreq', d.get('freq')))),
+        ('level', 'float32', lambda d: _float(d.get('level'))),
+        ('error', 'int16', lambda d: _int(d.get('error'))),
+        ('mode', 'string', lambda d: _str(d.get('mode'))),
+        ('label', 'string', lambda d: _str(d.get('label'))),
+        ('expn', 'string', lambda d: _str(d.get('expn'))),
+        ('block_id', 'string', lambda d: _str(d.get('block_id'))),
+        ('ack', 'string', lambda d: _str(d.get('ack'))),
+        ('msgno', 'string', lambda d: _str(d.get('msgno'))),
+        ('tail', 'string', lambda d: _str(d.get('tail'))),
+        ('flight', 'string', lambda d: _str(d.get('flight'))),
+        ('icao', 'string', lambda d: _str(d.get('icao'))),
+        ('lon', 'float64', _lon),
+        ('lat', 'float64', _lat),
+        ('altitude', 'float32', lambda d: _float(d.get('altitude'))),
+        ('receivers', 'int16', lambda d: len(d.get('receivers') or ()) or None),
+        ('text', 'string', lambda d: _str(d.get('text'))),
+    ]),
+}
+
+formats = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError('the columnar archive needs pyarrow (pip install pyarrow)')
+
+def arrow_schema(kind):
+    require_pyarrow()
+    types = {'timestamp': pa.timestamp('ms', tz='UTC'), 'string': pa.string(), 'float64': pa.float64(),
+             'float32': pa.float32(), 'int16': pa.int16(), 'bool': pa.bool_()}
+    return pa.schema([pa.field(name, types[t]) for name, t, _ in schemas[kind][1]])
+
+def epoch(t):
+    return timegm(_utc(t).utctimetuple())
+
+def day_dir(outdir, kind, t):
+    return os.path.join(outdir, kind, _utc(t).strftime('date=%Y-%m-%d'))
+
+class ColumnBuffer(object):
+    '''rows of one kind, kept as one list per column'''
+    def __init__(self, kind):
+        self.columns = schemas[kind][1]
+        self.values = [[] for _ in self.columns]
+        self.rows = 0
+
+    def add(self, doc):
+        for (_, _, extract), col in zip(self.columns, self.values):
+            col.append(extract(doc))
+        self.rows += 1
+
+    def batch(self, schema):
+        arrays = [pa.array(col, type=field.type) for col, field in zip(self.values, schema)]
+        self.values = [[] for _ in self.columns]
+        self.rows = 0
+        return pa.RecordBatch.from_arrays(arrays, schema.names)
+
+class ArchiveFile(object):
+    '''one part file, written in row groups and renamed into place on close()'''
+    def __init__(self, outdir, kind, lo, fmt='parquet', compression='snappy'):
+        self.kind = kind
+        self.dir = day_dir(outdir, kind, lo)
+        self.lo = epoch(lo)
+        self.fmt = fmt
+        self.schema = arrow_schema(kind)
+        if not os.path.isdir(self.dir):
+            os.makedirs(self.dir)
+        self.tmp = os.path.join(self.dir, '.part-{}.{}.tmp'.format(self.lo, os.getpid()))
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(self.tmp, self.schema, compression=compression)
+        else:
+            self.sink = pa.OSFile(self.tmp, 'wb')
+            self.writer = pa.RecordBatchFileWriter(self.sink, self.schema)
+        self.rows = 0
+
+    def write(self, buf):
+        if not buf.rows:
+            return
+        n = buf.rows
+        batch = buf.batch(self.schema)
+        if self.fmt == 'parquet':
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.rows += n
+        rows_total.inc(self.kind, n=n)
+
+    def close(self, hi):
+        '''finish the file as covering [lo, hi), returning its name'''
+        self.writer.close()
+        if self.fmt != 'parquet':
+            self.sink.close()
+        fn = os.path.join(self.dir, 'part-{}-{}{}'.format(self.lo, epoch(hi), formats[self.fmt]))
+        n = 0
+        while os.path.exists(fn):
+            n += 1
+            fn = os.path.join(self.dir, 'part-{}-{}.{}{}'.format(self.lo, epoch(hi), n, formats[self.fmt]))
+        os.rename(self.tmp, fn)
+        files_total.inc(self.kind)
+        logging.info("wrote %d rows to %s", self.rows, fn)
+        return fn
+
+def read_watermark(outdir, kind):
+    '''time up to which `kind` has been exported, or None'''
+    try:
+        with open(os.path.join(outdir, kind, '_watermark')) as fd:
+            hi = json.load(fd)['hi']
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    # a part file renamed into place just before a crash extends the
+    # watermark without having been recorded in it
+    while True:
+        d = day_dir(outdir, kind, datetime.utcfromtimestamp(hi))
+        prefix = 'part-{}-'.format(hi)
+        done = [fn for fn in (os.listdir(d) if os.path.isdir(d) else []) if fn.startswith(prefix)]
+        if not done:
+            break
+        hi = int(done[0][len(prefix):].split('.')[0])
+    return datetime.utcfromtimestamp(hi)
+
+def write_watermark(outdir, kind, t):
+    if not os.path.isdir(os.path.join(outdir, kind)):
+        os.makedirs(os.path.join(outdir, kind))
+    fn = os.path.join(outdir, kind, '_watermark')
+    with open(fn + '.tmp', 'w') as fd:
+        json.dump({'hi': epoch(t), 'time': _utc(t).isoformat()}, fd)
+    os.rename(fn + '.tmp', fn)
+
+def days(start, end):
+    '''[(lo, hi)] covering [start, end) and split at midnight UTC'''
+    rv = []
+    lo = start
+    while lo < end:
+        hi = min(end, lo.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1))
+        rv.append((lo, hi))
+        lo = hi
+    return rv
+
+class ArchiveSink(object):
+    '''archive documents as a loader stores them
+
+    Rows are buffered per day and written out as a part file every `rows`
+    rows or `interval` seconds of data, whichever comes first, and by
+    flush() at shutdown. Unlike the exporter this keeps no watermark, so
+    don't run both for the same kind into the same directory.'''
+    def __init__(self, outdir, kind, fmt='parquet', rows=100000, interval=600, compression='snappy'):
+        require_pyarrow()
+        self.outdir = outdir
+        self.kind = kind
+        self.fmt = fmt
+        self.max_rows = rows
+        self.interval = interval
+        self.compression = compression
+        self.extract_time = schemas[kind][1][0][2]
+        self.days = {} # day -> [buffer, first time, last time]
+
+    def add(self, doc):
+        t = self.extract_time(doc)
+        day = t.date()
+        d = self.days.get(day)
+        if d is None:
+            d = self.days[day] = [ColumnBuffer(self.kind), t, t]
+        d[0].add(doc)
+        d[1] = min(d[1], t)
+        d[2] = max(d[2], t)
+        if d[0].rows >= self.max_rows or (d[2] - d[1]).total_seconds() >= self.interval:
+            self._write(day)
+
+    def _write(self, day):
+        buf, lo, hi = self.days.pop(day)
+        lo = lo.replace(microsecond=0)
+        f = ArchiveFile(self.outdir, self.kind, lo, self.fmt, self.compression)
+        f.write(buf)
+        f.close(hi.replace(microsecond=0) + timedelta(seconds=1))
+
+    def flush(self):
+        for day in sorted(self.days):
+            self._write(day)
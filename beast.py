@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Beast binary input (dump1090 port 30005) and ADS-B decoding. Frames are
+#
+#   0x1a, type, 6 byte 12MHz timestamp, 1 byte signal level, message
+#
+# where type '1' is Mode A/C (2 bytes), '2' Mode S short (7) and '3' Mode
+# S long (14), and 0x1a in the rest of the frame is sent twice. Only
+# extended squitters (DF17, and DF18 from non-transponder devices) with a
+# good CRC are decoded: identification, airborne and surface position
+# and airborne velocity. Each is turned into a dict shaped like an SBS1
+# line from csv.DictReader(..., fields), so the loader handles it exactly
+# as it would the text feed, plus the receive time as a datetime in
+# 'timestamp', the signal level in dBFS and the position's NIC.
+#
+# Receive times come from each frame's 12MHz counter, relative to the
+# first frame: that is anchored to the wall clock when reading a live feed
+# and to `start` when reading a recording, which has no other record of
+# the time. duration() measures a recording the same way, so that the
+# loader can put its last frame at the file's modification time. Each aircraft's messages get strictly increasing times, at
+# least 1ms apart, so that none of its positions share a timestamp and
+# overwrite each other when stored.
+#
+# Positions are Compact Position Reporting: one message only gives the
+# position within a zone of 6 degrees of latitude or so. An even and an
+# odd message received close together are decoded globally; otherwise the
+# aircraft's last known position, or the receiver's, is the reference for
+# local decoding, which is only valid within half a zone of it. Surface
+# positions always need a reference, since their zones are a quarter of
+# the size and the global solution is ambiguous.
+#
+# See "The 1090MHz Riddle", Junzi Sun, https://mode-s.org/decode/
+
+import struct
+import logging
+from math import acos, atan2, cos, degrees, floor, hypot, log10, pi, radians, sqrt
+from datetime import datetime, timedelta
+from dateutil.tz import tzutc
+
+import metrics
+
+frames_total = metrics.counter('skyshark_beast_frames_total', 'Beast frames read, by outcome', ['result'])
+
+frame_lengths = {'1': 2, '2': 7, '3': 14}
+utc = tzutc()
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        c = i << 16
+        for _ in range(8):
+            c = (c << 1) ^ 0xfff409 if c & 0x800000 else c << 1
+        table.append(c & 0xffffff)
+    return table
+
+crc_table = _crc_table()
+
+def crc(msg):
+    '''Mode S CRC-24 of a bytearray'''
+    c = 0
+    for b in msg:
+        c = ((c << 8) & 0xffffff) ^ crc_table[(c >> 16) ^ b]
+    return c
+
+class Framer(object):
+    '''splits a Beast byte stream into (type, timestamp, signal, message) frames'''
+    def __init__(self):
+        self.buf = b''
+
+    def feed(self, data):
+        buf = self.buf + data
+        n = len(buf)
+        frames = []
+        i = buf.find(b'\x1a')
+        keep = n
+        while 0 <= i < n - 1:
+            length = frame_lengths.get(buf[i + 1])
+            if length is None:
+                # a doubled 0x1a, or noise: look for the next frame start
+                i = buf.find(b'\x1a', i + 2)
+                continue
+            length += 7
+            start = i + 2
+            raw = buf[start:start + length]
+            if len(raw) < length:
+                keep = i
+                break
+            end = start + length
+            if b'\x1a' in raw:
+                raw, end = self._unescape(buf, start, length)
+                if raw is None:
+                    if end is None:
+                        keep = i
+                        break
+                    frames_total.inc('bad_escape')
+                    i = end
+                    continue
+            frames.append((buf[i + 1], struct.unpack('>Q', b'\0\0' + raw[:6])[0], ord(raw[6]), bytearray(raw[7:])))
+            i = buf.find(b'\x1a', end)
+        if keep < n:
+            self.buf = buf[keep:]
+        else:
+            # a frame start at the very end still needs its type byte
+            self.buf = buf[-1:] if i == n - 1 else b''
+        return frames
+
+    def _unescape(self, buf, start, length):
+        '''(frame, end) or (None, None) if incomplete or (None, next frame) if broken'''
+        out = []
+        k = start
+        n = len(buf)
+        while len(out) < length:
+            if k >= n:
+                return None, None
+            c = buf[k]
+            if c == b'\x1a':
+                if k + 1 >= n:
+                    return None, None
+                if buf[k + 1] != b'\x1a':
+                    return None, k
+                k += 1
+            out.append(c)
+            k += 1
+        return b''.join(out), k
+
+charset = '#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######'
+
+def nl(lat):
+    '''number of longitude zones at a latitude'''
+    lat = abs(lat)
+    if lat < 1e-9:
+        return 59
+    if lat > 87:
+        return 1
+    if lat == 87:
+        return 2
+    a = 1 - cos(pi / 30)
+    b = cos(radians(lat)) ** 2
+    return int(floor(2 * pi / acos(1 - a / b)))
+
+def cpr_global(even, odd, odd_newest, surface=False, ref=None):
+    '''(lat, lon) from an even and odd (lat_cpr, lon_cpr) pair, or None'''
+    span = 90.0 if surface else 360.0
+    lat_e, lon_e = even[0] / 131072.0, even[1] / 131072.0
+    lat_o, lon_o = odd[0] / 131072.0, odd[1] / 131072.0
+    j = int(floor(59 * lat_e - 60 * lat_o + 0.5))
+    rlat_e = span / 60 * (j % 60 + lat_e)
+    rlat_o = span / 59 * (j % 59 + lat_o)
+    if surface:
+        # the northern solution, or the southern one if nearer the reference
+        if ref is None:
+            return None
+        if abs(rlat_e - 90 - ref[0]) < abs(rlat_e - ref[0]):
+            rlat_e -= 90
+            rlat_o -= 90
+    else:
+        if rlat_e >= 270:
+            rlat_e -= 360
+        if rlat_o >= 270:
+            rlat_o -= 360
+    if nl(rlat_e) != nl(rlat_o):
+        return None # the pair straddles a zone boundary
+    lat = rlat_o if odd_newest else rlat_e
+    zones = nl(lat)
+    ni = max(zones - (1 if odd_newest else 0), 1)
+    m = int(floor(lon_e * (zones - 1) - lon_o * zones + 0.5))
+    lon = span / ni * (m % ni + (lon_o if odd_newest else lon_e))
+    if surface:
+        # four solutions 90 degrees apart
+        lon += 90 * round((ref[1] - lon) / 90.0)
+    if lon >= 180:
+        lon -= 360
+    elif lon < -180:
+        lon += 360
+    return lat, lon
+
+def cpr_local(cpr, odd, ref, surface=False):
+    '''(lat, lon) of one message relative to a reference within half a zone'''
+    span = 90.0 if surface else 360.0
+    lat_cpr, lon_cpr = cpr[0] / 131072.0, cpr[1] / 131072.0
+    dlat = span / (59 if odd else 60)
+    j = floor(ref[0] / dlat) + floor((ref[0] % dlat) / dlat - lat_cpr + 0.5)
+    lat = dlat * (j + lat_cpr)
+    dlon = span / max(nl(lat) - (1 if odd else 0), 1)
+    m = floor(ref[1] / dlon) + floor((ref[1] % dlon) / dlon - lon_cpr + 0.5)
+    lon = dlon * (m + lon_cpr)
+    return lat, lon
+
+def altitude(ac12):
+    '''feet from a 12 bit altitude code with the Q bit set, else None'''
+    if not ac12 & 0x10:
+        return None # Gillham coded, 100ft steps; not used by ADS-B in practice
+    return (((ac12 & 0xfe0) >> 1) | (ac12 & 0xf)) * 25 - 1000
+
+def ground_movement(mov):
+    '''knots from a surface position movement field, or None'''
+    for lo, base, step in [(124, 175, 0), (109, 100, 5), (94, 70, 2), (39, 15, 1), (13, 2, 0.5), (9, 1, 0.25), (2, 0.125, 0.125)]:
+        if mov >= lo:
+            return None if mov > 124 else base + (mov - lo) * step
+    return 0.0 if mov == 1 else None
+
+# NIC of each position type code, without the supplement bits
+nic_by_tc = {5: 11, 6: 10, 7: 8, 8: 0, 9: 11, 10: 10, 11: 8, 12: 7, 13: 6, 14: 5, 15: 4, 16: 2, 17: 1, 18: 0,
+             20: 11, 21: 10, 22: 0}
+
+def _fmt(v, spec='{:.0f}'):
+    return '' if v is None else spec.format(v)
+
+min_step = timedelta(milliseconds=1)
+
+class Clock(object):
+    '''receive times of frames from their 12MHz counter'''
+    def __init__(self, start=None, max_drift=1.0):
+        self.start = start # the time of the first frame of a recording, None for a live feed
+        self.max_drift = max_drift
+        self.base = None # (counter, time) the counter is measured from
+        self.last = None
+
+    def time(self, counter, now=None):
+        '''the time of a frame; now is the wall clock time, for live feeds'''
+        t = None
+        if counter and self.base is not None and counter >= self.base[0]:
+            t = self.base[1] + timedelta(microseconds=(counter - self.base[0]) / 12.0)
+            if now is not None and abs((t - now).total_seconds()) > self.max_drift:
+                t = None # drifted, or the receiver restarted
+        if t is None:
+            # (re)anchor: to the wall clock when live, else just after the last frame
+            if now is not None:
+                t = now
+            elif self.last is not None:
+                t = self.last + min_step
+            else:
+                t = self.start
+            if counter:
+                self.base = (counter, t)
+        if self.last is None or t > self.last:
+            self.last = t
+        return t
+
+def duration(fd, chunk=65536):
+    '''the time from the first frame of a recording to its last, as a Decoder's Clock measures it'''
+    clock = Clock(datetime(1970, 1, 1, tzinfo=utc))
+    framer = Framer()
+    while True:
+        data = fd.read(chunk)
+        if not data:
+            break
+        for ftype, mlat, _, _ in framer.feed(data):
+            if ftype == '3':
+                clock.time(mlat)
+    return clock.last - clock.start if clock.last is not None else timedelta(0)
+
+class Decoder(object):
+    '''turns Beast frames into SBS1-shaped messages, keeping the CPR state of each aircraft'''
+    def __init__(self, receiver=None, pair_window=10, surface_window=25, reference_age=600, start=None):
+        self.receiver = receiver # (lat, lon) for local decoding, if known
+        self.pair_window = pair_window
+        self.surface_window = surface_window
+        self.reference_age = reference_age
+        self.framer = Framer()
+        self.clock = Clock(start)
+        self.aircraft = {} # icao24 -> {'cpr': [even, odd], 'pos': (lat, lon, t), 'last': t}
+        self.decoded = 0
+
+    def feed(self, data, now=None):
+        '''messages from the next chunk of the stream'''
+        if self.clock.start is None:
+            now = now or datetime.now(utc)
+        rv = []
+        for ftype, mlat, signal, msg in self.framer.feed(data):
+            if ftype != '3':
+                frames_total.inc('not_extended_squitter')
+                continue
+            m = self.decode(msg, self.clock.time(mlat, now), signal)
+            if m is not None:
+                rv.append(m)
+        return rv
+
+    def messages(self, fd, chunk=65536):
+        '''every message in a file of Beast frames'''
+        while True:
+            data = fd.read(chunk)
+            if not data:
+                break
+            for m in self.feed(data):
+                yield m
+
+    def decode(self, msg, now, signal=None):
+        df = msg[0] >> 3
+        if df not in (17, 18):
+            frames_total.inc('not_extended_squitter')
+            return None
+        if crc(msg[:11]) != (msg[11] << 16 | msg[12] << 8 | msg[13]):
+            frames_total.inc('bad_crc')
+            return None
+        if df == 18 and (msg[0] & 7) not in (0, 1, 6):
+            frames_total.inc('unsupported')
+            return None
+        icao24 = '{:02X}{:02X}{:02X}'.format(msg[1], msg[2], msg[3])
+        ac = self.aircraft.setdefault(icao24, {'cpr': [None, None], 'pos': None, 'last': None})
+        if ac['last'] is not None and now < ac['last'] + min_step:
+            now = ac['last'] + min_step
+        ac['last'] = now
+        me = 0
+        for b in msg[4:11]:
+            me = me << 8 | b
+        tc = me >> 51
+
+        m = {'message_type': 'MSG', 'icao24': icao24, 'timestamp': now,
+             'session_id': '', 'aircraft_id': '', 'flight_id': '',
+             'gen_date': '', 'gen_time': '', 'log_date': '', 'log_time': '',
+             'callsign': '', 'altitude': '', 'ground_speed': '', 'track': '', 'lat': '', 'lon': '',
+             'vertical_rate': '', 'squawk': '', 'alert': '', 'emergency': '', 'spi': '', 'is_on_ground': ''}
+        if signal:
+            m['signal'] = round(20 * log10(signal / 255.0), 1)
+
+        if 1 <= tc <= 4:
+            m['transmission_type'] = '1'
+            m['callsign'] = ''.join(charset[(me >> s) & 0x3f] for s in range(42, -1, -6)).strip()
+        elif 5 <= tc <= 8 or 9 <= tc <= 18 or 20 <= tc <= 22:
+            if not self._position(m, icao24, me, tc, now):
+                frames_total.inc('no_position')
+                return None
+        elif tc == 19:
+            if not self._velocity(m, me):
+                frames_total.inc('no_velocity')
+                return None
+            m['transmission_type'] = '4'
+        else:
+            frames_total.inc('unsupported')
+            return None
+        frames_total.inc('decoded')
+        self.decoded += 1
+        if self.decoded % 10000 == 0:
+            self.expire(now)
+        return m
+
+    def _position(self, m, icao24, me, tc, now):
+        surface = tc <= 8
+        odd = (me >> 34) & 1
+        cpr = ((me >> 17) & 0x1ffff, me & 0x1ffff)
+        ac = self.aircraft[icao24]
+        ac['cpr'][odd] = (cpr, now, surface)
+        other = ac['cpr'][1 - odd]
+
+        last = ac['pos']
+        ref = None
+        if last is not None and (now - last[2]).total_seconds() < self.reference_age:
+            ref = last[:2]
+        elif self.receiver is not None:
+            ref = self.receiver
+
+        pos = None
+        window = self.surface_window if surface else self.pair_window
+        if other is not None and other[2] == surface and (now - other[1]).total_seconds() <= window:
+            even_cpr, odd_cpr = (other[0], cpr) if odd else (cpr, other[0])
+            pos = cpr_global(even_cpr, odd_cpr, odd, surface, ref)
+        if pos is None and ref is not None:
+            pos = cpr_local(cpr, odd, ref, surface)
+        if pos is None:
+            return False
+        ac['pos'] = (pos[0], pos[1], now)
+
+        m['lat'] = '{:.5f}'.format(pos[0])
+        m['lon'] = '{:.5f}'.format(pos[1])
+        m['nic'] = nic_by_tc.get(tc)
+        if surface:
+            m['transmission_type'] = '2'
+            m['is_on_ground'] = '-1'
+            m['ground_speed'] = _fmt(ground_movement((me >> 44) & 0x7f), '{:.3g}')
+            if (me >> 43) & 1:
+                m['track'] = _fmt(((me >> 36) & 0x7f) * 360 / 128.0, '{:.1f}')
+        else:
+            m['transmission_type'] = '3'
+            m['is_on_ground'] = '0'
+            ss = (me >> 49) & 3
+            m['alert'] = '-1' if ss in (1, 2) else '0'
+            m['spi'] = '-1' if ss == 3 else '0'
+            ac12 = (me >> 36) & 0xfff
+            if tc >= 20:
+                m['altitude'] = _fmt(ac12 * 3.28084) if ac12 else '' # GNSS height, meters
+            elif ac12:
+                m['altitude'] = _fmt(altitude(ac12))
+        return True
+
+    def _velocity(self, m, me):
+        st = (me >> 48) & 7
+        if st in (1, 2):
+            scale = 4 if st == 2 else 1
+            vew, vns = (me >> 32) & 0x3ff, (me >> 21) & 0x3ff
+            if vew and vns:
+                vx = (vew - 1) * scale * (-1 if (me >> 42) & 1 else 1)
+                vy = (vns - 1) * scale * (-1 if (me >> 31) & 1 else 1)
+                m['ground_speed'] = '{:.0f}'.format(hypot(vx, vy))
+                m['track'] = '{:.1f}'.format(degrees(atan2(vx, vy)) % 360)
+        elif st in (3, 4):
+            if (me >> 42) & 1:
+                m['heading'] = round(((me >> 32) & 0x3ff) * 360 / 1024.0, 1)
+            airspeed = (me >> 21) & 0x3ff
+            if airspeed:
+                m['airspeed'] = (airspeed - 1) * (4 if st == 4 else 1)
+        else:
+            return False
+        vr = (me >> 10) & 0x1ff
+        if vr:
+            m['vertical_rate'] = str((vr - 1) * 64 * (-1 if (me >> 19) & 1 else 1))
+        return True
+
+    def expire(self, now):
+        '''forget aircraft whose CPR state is too old to be any use'''
+        for icao24, ac in list(self.aircraft.items()):
+            times = [c[1] for c in ac['cpr'] if c is not None]
+            if ac['last'] is not None:
+                times.append(ac['last'])
+            if ac['pos'] is not None:
+                times.append(ac['pos'][2])
+            if not times or (now - max(times)).total_seconds() > self.reference_age:
+                del self.aircraft[icao24]
@@ -0,0 +1,401 @@
+INSERT INTO `airlines` (`id`, `iata`, `icao`, `airline`, `callsign`, `country`) VALUES
+(1, 'UA', 'UAL', 'United Airlines', 'UNITED', 'United States'),
+(2, 'AA', 'AAL', 'American Airlines', 'AMERICAN', 'United States'),
+(3, 'DL', 'DAL', 'Delta Air Lines', 'DELTA', 'United States'),
+(4, 'FX', 'FDX', 'Federal Express', 'FEDEX', 'United States'),
+(5, 'BA', 'BAW', 'British Airways', 'SPEEDBIRD', 'United Kingdom'),
+(6, 'AC', 'ACA', 'Air Canada', 'AIR CANADA', 'Canada'),
+(7, 'SK', 'SAS', 'Scandinavian Airlines', 'SCANDINAVIAN', 'Sweden'),
+(8, 'UP', 'UPS', 'United Parcel Service', 'UPS', 'USA'),
+(9, 'PY', 'YFO', 'Airline Gadshq', 'HICQFCK', 'Country Vaor'),
+(10, 'IT', 'OXJ', 'Airline Apaswi', 'PGHGCSM', 'Country Mgfb'),
+(11, 'JZ', 'PGP', 'Airline Syksgi', 'NRUPYHX', 'Country Yhym'),
+(12, 'CM', 'HSV', 'Airline Igpgti', 'OWZSDYN', 'Country Lhyp'),
+(13, 'GC', 'BJD', 'Airline Vzyfwf', 'VWSZELN', 'Country Amqe'),
+(14, 'QD', 'TAB', 'Airline Dzxalr', 'URBXOPI', 'Country Nyhv'),
+(15, 'LD', 'LEO', 'Airline Ojxqca', 'NFIDNUG', 'Country Zqbm'),
+(16, 'DN', 'HAC', 'Airline Nwlxmb', 'RLRIRPE', 'Country Jnhj'),
+(17, 'SW', 'MPE', 'Airline Boysyi', 'ZUJIPLD', 'Country Xrlz'),
+(18, 'AP', 'CJU', 'Airline Ggxhnl', 'FRFVZLR', 'Country Kapg'),
+(19, 'OA', 'TWQ', 'Airline Karhjx', 'AKJRKTR', 'Country Rxrw'),
+(20, 'EF', 'KBE', 'Airline Imefoi', 'TFOXTSW', 'Country Fcao'),
+(21, 'VV', 'OVU', 'Airline Sfhcsj', 'LGZNVQZ', 'Country Hdsu'),
+(22, 'XL', 'TJA', 'Airline Pybbwf', 'XJJRLEP', 'Country Uqqp'),
+(23, 'U2', 'BBH', 'Airline Yatczj', 'KRNIDVJ', 'Country Tazx'),
+(24, 'K8', 'ZKP', 'Airline Pzhter', 'LFHAMPH', 'Country Katy'),
+(25, 'QP', 'LSY', 'Airline Jpyoxw', 'EESQDLY', 'Country Hqac'),
+(26, 'Y0', 'BPL', 'Airline Rhwugw', 'XAHFSFP', 'Country Kjce'),
+(27, 'KS', 'DGK', 'Airline Fixqkp', 'TVOPKCV', 'Country Fkzf'),
+(28, 'KY', 'HYN', 'Airline Iggvwk', 'KBTOFWM', 'Country Kqea'),
+(29, 'RP', 'CMH', 'Airline Fgdput', 'KNXGAMF', 'Country Igdv'),
+(30, 'MK', 'UGY', 'Airline Bylvni', 'OHYTHYN', 'Country Kzmx'),
+(31, 'EF', 'VOC', 'Airline Onpxkb', 'FZNTKSR', 'Country Gndx'),
+(32, 'TU', 'EFG', 'Airline Jugxdo', 'YHMZGVU', 'Country Qsdz'),
+(33, 'V4', 'KCG', 'Airline Eismln', 'USIBUZR', 'Country Bfvn'),
+(34, 'LC', 'NUU', 'Airline Csubkk', 'AKWRDIS', 'Country Aczh'),
+(35, 'SD', 'LZV', 'Airline Faknow', 'POIGVAV', 'Country Fifm'),
+(36, 'PF', 'OYF', 'Airline Mxzrso', 'BUNHOGD', 'Country Uakc'),
+(37, 'SP', 'MZG', 'Airline Jqosqb', 'GFLFWDQ', 'Country Kxid'),
+(38, 'LG', 'CZL', 'Airline Xjbewj', 'POVQZYC', 'Country Kgof'),
+(39, 'G1', 'QTT', 'Airline Bngdjy', 'TFRWKPL', 'Country Wdcu'),
+(40, 'C4', 'JOT', 'Airline Ybxjsw', 'WMMXXOK', 'Country Brnm'),
+(41, 'WA', 'DKS', 'Airline Faeqtp', 'VFFOSUD', 'Country Fxjc'),
+(42, 'O3', 'LMV', 'Airline Mbulqf', 'YAIWEZO', 'Country Exmd'),
+(43, 'U2', 'ESE', 'Airline Cmkfct', 'FCQMSPZ', 'Country Xxni'),
+(44, 'NK', 'ERM', 'Airline Ugqnbf', 'DOLVOUW', 'Country Bjza'),
+(45, 'SD', 'ASW', 'Airline Ehsfpf', 'HHLLUQO', 'Country Zsul'),
+(46, 'HL', 'RWC', 'Airline Vzqdpx', 'SBOPFUO', 'Country Vygw'),
+(47, 'QQ', 'LMH', 'Airline Etvbgz', 'MMAPSFB', 'Country Qnaq'),
+(48, 'NH', 'QJY', 'Airline Ftavnr', 'XCIHBQK', 'Country Fjlj'),
+(49, 'NE', 'GJG', 'Airline Iaycgp', 'ULHRWXE', 'Country Wuwk'),
+(50, 'NV', 'EBF', 'Airline Mekwks', 'WEKRYHA', 'Country Sblx'),
+(51, 'BA', 'JTL', 'Airline Tnifmk', 'NIRCATQ', 'Country Rbey'),
+(52, 'Y2', 'JNR', 'Airline Caqoaz', 'APMBJRD', 'Country Wkdg'),
+(53, 'B3', 'WFG', 'Airline Qwmcss', 'VJOEJWH', 'Country Ujun'),
+(54, 'AC', 'SDF', 'Airline Xutuzq', 'GCOIMBF', 'Country Toai'),
+(55, 'A2', 'INI', 'Airline Njxico', 'LQRCSTC', 'Country Vqsg'),
+(56, 'V9', 'NXN', 'Airline Hyllqx', 'NNCELLV', 'Country Ccgu'),
+(57, 'A8', 'NOK', 'Airline Dtriai', 'HORCVJB', 'Country Yzmr'),
+(58, 'TZ', 'TMR', 'Airline Sujatp', 'PPJFVJV', 'Country Iafb'),
+(59, 'WA', 'WDJ', 'Airline Azucbz', 'KVMYUUT', 'Country Mxyo'),
+(60, 'LH', 'ZOJ', 'Airline Cwhrcr', 'LMMXCHD', 'Country Xskx'),
+(61, 'DC', 'WRB', 'Airline Fgqqdf', 'QOQZBRG', 'Country Aunc'),
+(62, 'OV', 'HRZ', 'Airline Kdzyht', 'MNJZYRJ', 'Country Xiyp'),
+(63, 'CH', 'BXX', 'Airline Ruinyq', 'OMSEKGL', 'Country Lymn'),
+(64, 'N0', 'GOK', 'Airline Rludbj', 'YUTDPFA', 'Country Ldui'),
+(65, 'K1', 'ACN', 'Airline Ckwxqg', 'EJYJPGY', 'Country Yslp'),
+(66, 'Q2', 'FXP', 'Airline Gestcj', 'MGJUCAP', 'Country Hefz'),
+(67, 'B0', 'CVP', 'Airline Mypgen', 'MNQUEMV', 'Country Psni'),
+(68, 'IF', 'XPW', 'Airline Yefvul', 'AGZCFXI', 'Country Ymgh'),
+(69, 'CP', 'BHK', 'Airline Yevhpq', 'BPUNUMB', 'Country Ofii'),
+(70, 'NR', 'WCK', 'Airline Fhjiqu', 'HVNYDRK', 'Country Xobr'),
+(71, 'DS', 'FSZ', 'Airline Euacxr', 'WVXAZGI', 'Country Avaz'),
+(72, 'Z7', 'ZGI', 'Airline Pjwbxv', 'IXRZLTO', 'Country Zjcj'),
+(73, 'C9', 'PFB', 'Airline Qsltiq', 'MBZTWDO', 'Country Jloe'),
+(74, 'OS', 'AYT', 'Airline Pomjwk', 'MDVYEGX', 'Country Doks'),
+(75, 'N6', 'AQJ', 'Airline Tgeyur', 'ADEOFQE', 'Country Qkar'),
+(76, 'IH', 'CKW', 'Airline Tfrlsq', 'DKZXSAZ', 'Country Dpvo'),
+(77, 'FS', 'WEV', 'Airline Zmiaey', 'XLFJGOY', 'Country Mfti'),
+(78, 'PB', 'DGP', 'Airline Csxkva', 'WJDHAZH', 'Country Fsxa'),
+(79, 'QN', 'NYZ', 'Airline Kldmzx', 'TYNQRXK', 'Country Nirp'),
+(80, 'V4', 'FGZ', 'Airline Yntxpq', 'YFHFPGX', 'Country Lpwn'),
+(81, 'WM', 'LAI', 'Airline Joljav', 'KORTXIE', 'Country Qgro'),
+(82, 'O5', 'KTE', 'Airline Qaowio', 'CTIRTNY', 'Country Nego'),
+(83, 'C0', 'LQK', 'Airline Pcjacl', 'RRDOGFJ', 'Country Jenb'),
+(84, 'T1', 'VLM', 'Airline Ipvpuh', 'FTZNDZY', 'Country Quyz'),
+(85, 'IW', 'MFZ', 'Airline Xcdtjj', 'HZIRRJO', 'Country Jkqh'),
+(86, 'AL', 'LNU', 'Airline Zzuroj', 'SAJESJC', 'Country Nkkb'),
+(87, 'KJ', 'NCN', 'Airline Bhrbdd', 'UMMSJTK', 'Country Ovlq'),
+(88, 'NH', 'HZH', 'Airline Fyxpez', 'KFIXAIW', 'Country Xbua'),
+(89, 'TI', 'RZT', 'Airline Xpvfxe', 'HLWAUMX', 'Country Qske'),
+(90, 'IX', 'REX', 'Airline Heamih', 'CJWLJRC', 'Country Fkpu'),
+(91, 'L1', 'RZD', 'Airline Erdnlw', 'LOFTVTH', 'Country Qwll'),
+(92, 'ZA', 'GLG', 'Airline Qgbgbn', 'UQQOKSU', 'Country Dvye'),
+(93, 'WO', 'BHG', 'Airline Sykzdq', 'BPYPSYO', 'Country Wwqy'),
+(94, 'LE', 'GKW', 'Airline Lefoed', 'PGKHJEF', 'Country Hizc'),
+(95, 'UT', 'NBJ', 'Airline Axumvp', 'TOTVIHW', 'Country Grxl'),
+(96, 'UQ', 'BGO', 'Airline Apquep', 'LHZAMKG', 'Country Cacq'),
+(97, 'SQ', 'THF', 'Airline Srjyvd', 'EJISDRG', 'Country Ihvj'),
+(98, 'WU', 'OZB', 'Airline Reaxgv', 'ICDOYUB', 'Country Okks'),
+(99, 'FS', 'CII', 'Airline Acvfoz', 'CXBKPUA', 'Country Iztw'),
+(100, 'OW', 'WDT', 'Airline Subbjd', 'VWLCMTS', 'Country Kzfz'),
+(101, 'UV', 'WGR', 'Airline Cwtlsh', 'GEHXPQA', 'Country Zurb'),
+(102, 'DD', 'ULG', 'Airline Nrccbr', 'HKUJWRW', 'Country Bkyr'),
+(103, 'WB', 'PWE', 'Airline Rcqbfq', 'UEUORBS', 'Country Noos'),
+(104, 'S5', 'LLG', 'Airline Jsgawt', 'YRGQGDT', 'Country Wrfi'),
+(105, 'D8', 'QNN', 'Airline Cthuvw', 'KJKHSHP', 'Country Klgs'),
+(106, 'N8', 'ZPP', 'Airline Zfdsdz', 'HIFIRWZ', 'Country Tpmy'),
+(107, 'VL', 'OVS', 'Airline Ypiphe', 'KBSQMXA', 'Country Hhvn'),
+(108, 'WE', 'LCY', 'Airline Cfrlqp', 'EHQYYJB', 'Country Pgzy'),
+(109, 'CT', 'DOJ', 'Airline Usabbx', 'FNBQUHY', 'Country Yhup'),
+(110, 'O3', 'JHH', 'Airline Jhhplq', 'OLDLJOG', 'Country Lkwc'),
+(111, 'PS', 'JCV', 'Airline Txudrw', 'DIYRDRE', 'Country Zuug'),
+(112, 'KX', 'XAT', 'Airline Pgdbtw', 'YPKOFPT', 'Country Wdeb'),
+(113, 'UJ', 'ZBI', 'Airline Kevbxl', 'JOPIUBC', 'Country Skxs'),
+(114, 'JA', 'CLB', 'Airline Okltyb', 'DDKFADF', 'Country Bcom'),
+(115, 'LL', 'IDS', 'Airline Eowass', 'QPGGMRT', 'Country Jhlp'),
+(116, 'JM', 'INI', 'Airline Fcwbkl', 'TWGIVUE', 'Country Fgue'),
+(117, 'N6', 'OKR', 'Airline Zmweoh', 'BBIDSUP', 'Country Arwe'),
+(118, 'UP', 'DMA', 'Airline Ujsoxz', 'KAKPBOU', 'Country Yeis'),
+(119, 'VL', 'KPW', 'Airline Vtelbc', 'ZNIGGOT', 'Country Gzbu'),
+(120, 'PV', 'CSB', 'Airline Awysui', 'PNAXEFB', 'Country Ufnb'),
+(121, 'BK', 'VNR', 'Airline Cjjfbe', 'HRVDDSE', 'Country Gohj'),
+(122, 'JK', 'KEH', 'Airline Aqgccz', 'OJMADOS', 'Country Msuv'),
+(123, 'UY', 'XDF', 'Airline Fsnhva', 'DGMDGWN', 'Country Hnnx'),
+(124, 'M2', 'IAU', 'Airline Cfhxnc', 'KLPZZNR', 'Country Xsjl'),
+(125, 'P7', 'GTY', 'Airline Ujnbrz', 'SLLGJGA', 'Country Ggqa'),
+(126, 'UF', 'WNV', 'Airline Rcahlu', 'SAQFTXR', 'Country Waes'),
+(127, 'T0', 'DZB', 'Airline Ymdetd', 'MDDEYLL', 'Country Cfdg'),
+(128, 'XU', 'KTT', 'Airline Yxrayk', 'LSXICTJ', 'Country Dthx'),
+(129, 'WA', 'LWZ', 'Airline Rrzgil', 'FJOMGPZ', 'Country Qakn'),
+(130, 'J8', 'QEV', 'Airline Khlxky', 'SURLXVE', 'Country Ndej'),
+(131, 'W9', 'API', 'Airline Cpukga', 'WYYPTDU', 'Country Dyes'),
+(132, 'NG', 'BPL', 'Airline Lqaiip', 'MBKHNKJ', 'Country Owfa'),
+(133, 'AA', 'WON', 'Airline Nlrmtn', 'EWNIIVX', 'Country Qegj'),
+(134, 'VE', 'RGW', 'Airline Bisopv', 'SIHIOKY', 'Country Eidu'),
+(135, 'KR', 'CPB', 'Airline Qgjeng', 'MFNGSJR', 'Country Jorz'),
+(136, 'EU', 'QOY', 'Airline Spedxv', 'ALWCJUI', 'Country Vrww'),
+(137, 'VD', 'BJD', 'Airline Fxxmcy', 'BWPFGLS', 'Country Tvuz'),
+(138, 'MC', 'MIF', 'Airline Whlwnv', 'WJYNVTV', 'Country Tykv'),
+(139, 'QX', 'PKY', 'Airline Svwznv', 'OTZNMCZ', 'Country Wdal'),
+(140, 'ZE', 'LPO', 'Airline Aockmc', 'MGGHCXH', 'Country Ymzr'),
+(141, 'XK', 'JHA', 'Airline Upfdmn', 'KNEGVPV', 'Country Gkxh'),
+(142, 'MM', 'ZJZ', 'Airline Fsxdfn', 'SQCSCBR', 'Country Myie'),
+(143, 'UR', 'QBB', 'Airline Ingnsx', 'IPBJRTY', 'Country Qxyn'),
+(144, 'EU', 'HZC', 'Airline Oswoiw', 'BAUOUGG', 'Country Rioo'),
+(145, 'TJ', 'TXB', 'Airline Gdujas', 'ISSNJJO', 'Country Myub'),
+(146, 'YX', 'XIC', 'Airline Fdvhdx', 'MLFKWMK', 'Country Redy'),
+(147, 'LQ', 'HDK', 'Airline Ywkopu', 'WGMIGKB', 'Country Pwyx'),
+(148, 'OG', 'ZVJ', 'Airline Fpxiym', 'DRRAZTZ', 'Country Uzap'),
+(149, 'BO', 'WIG', 'Airline Xyqehe', 'QGHXZMJ', 'Country Qxko'),
+(150, 'JN', 'NHG', 'Airline Zfcimb', 'MQZJMNK', 'Country Tpon'),
+(151, 'YM', 'RLY', 'Airline Tdhqrv', 'CZMTWSE', 'Country Vpnw'),
+(152, 'GZ', 'WXB', 'Airline Pzwuin', 'EYFDNND', 'Country Iwlx'),
+(153, 'NI', 'PDN', 'Airline Izyulk', 'ERASYQJ', 'Country Cjoc'),
+(154, 'H4', 'ZPD', 'Airline Rdbycn', 'JCMQJPO', 'Country Cjcc'),
+(155, 'WH', 'MCO', 'Airline Mkwtcf', 'NWZJMRS', 'Country Uasd'),
+(156, 'WB', 'XWJ', 'Airline Sqcfzt', 'XXBECRH', 'Country Ficd'),
+(157, 'D3', 'QEW', 'Airline Drfwqr', 'PNEQYOU', 'Country Aacj'),
+(158, 'HC', 'OTP', 'Airline Ymrwtt', 'VQLMCTA', 'Country Rwvl'),
+(159, 'CB', 'UJK', 'Airline Ygitjj', 'IMNCCWO', 'Country Cive'),
+(160, 'HO', 'HLN', 'Airline Liqorn', 'PXOCHNT', 'Country Bysa'),
+(161, 'QR', 'KTN', 'Airline Dlgkqp', 'AEFSOBI', 'Country Qysl'),
+(162, 'TK', 'PUV', 'Airline Glbrqn', 'DZHWGWT', 'Country Xeyp'),
+(163, 'F7', 'VLP', 'Airline Gvswrj', 'WEVBVNB', 'Country Cydr'),
+(164, 'XQ', 'SPH', 'Airline Ltqerr', 'EHUNEZA', 'Country Pkoh'),
+(165, 'VS', 'FZA', 'Airline Viudoj', 'MKUMKRI', 'Country Mgbn'),
+(166, 'SU', 'FCV', 'Airline Rdezzu', 'SKNDPYL', 'Country Evsw'),
+(167, 'VF', 'UIJ', 'Airline Jfhvlj', 'PFNDAQC', 'Country Ibhc'),
+(168, 'HG', 'UEV', 'Airline Agzdcp', 'YYSVBII', 'Country Xnjy'),
+(169, 'OF', 'WDN', 'Airline Rxlbqz', 'JCZBQIH', 'Country Ntdx'),
+(170, 'NL', 'CEW', 'Airline Xgugwe', 'MRQCYQA', 'Country Zgio'),
+(171, 'VG', 'UVB', 'Airline Xhpjzk', 'PVYYXAQ', 'Country Speh'),
+(172, 'MY', 'UUA', 'Airline Vjrjlk', 'GTMFMPH', 'Country Epwq'),
+(173, 'ZU', 'OBO', 'Airline Xvppuo', 'SGWXFHC', 'Country Seum'),
+(174, 'XS', 'PXK', 'Airline Tgyizb', 'GWIWXEC', 'Country Atlx'),
+(175, 'U8', 'SWS', 'Airline Rqmqef', 'LRSHJKQ', 'Country Bnoj'),
+(176, 'KD', 'IRA', 'Airline Qkwviy', 'VALIWNC', 'Country Vjta'),
+(177, 'CR', 'KCO', 'Airline Fjtjkg', 'VSCZIIQ', 'Country Tpmd'),
+(178, 'ZF', 'BHC', 'Airline Pnipdg', 'GLLXTXU', 'Country Bdgx'),
+(179, 'EV', 'DBF', 'Airline Znokjm', 'VWLDGBM', 'Country Ifyf'),
+(180, 'O2', 'DMV', 'Airline Aimobw', 'IPYWHJH', 'Country Ojmp'),
+(181, 'JS', 'RJL', 'Airline Ddljek', 'VGWFJVR', 'Country Zlcf'),
+(182, 'AY', 'RHC', 'Airline Jkebzn', 'CZHBLUK', 'Country Ebfv'),
+(183, 'U5', 'WME', 'Airline Gikzbl', 'GGKLMTE', 'Country Xlpr'),
+(184, 'OO', 'CPA', 'Airline Juohla', 'DUYDCSD', 'Country Jhrm'),
+(185, 'V9', 'FFZ', 'Airline Bourft', 'RQFSHTL', 'Country Snvt'),
+(186, 'GP', 'LLM', 'Airline Jpozcj', 'ANGDTEK', 'Country Uelk'),
+(187, 'ZV', 'YYH', 'Airline Sqrxde', 'GEPMPAI', 'Country Qvgq'),
+(188, 'UK', 'BFL', 'Airline Ngerld', 'WNGFKMU', 'Country Danx'),
+(189, 'WO', 'EDB', 'Airline Sbxlxs', 'DCOZGHV', 'Country Mbdm'),
+(190, 'A7', 'WOE', 'Airline Toehnw', 'OYMSWPD', 'Country Cnjj'),
+(191, 'IO', 'GHZ', 'Airline Xekuvr', 'GFNHVOT', 'Country Zljm'),
+(192, 'KZ', 'HDI', 'Airline Ugwixa', 'HMZGRQJ', 'Country Hjip'),
+(193, 'VJ', 'ZOO', 'Airline Rmgkec', 'EKXZAAU', 'Country Ctux'),
+(194, 'MK', 'QDZ', 'Airline Bwfgje', 'JFIGDDE', 'Country Kzdo'),
+(195, 'NA', 'WCZ', 'Airline Fqemqm', 'JBUMOOC', 'Country Fidx'),
+(196, 'LF', 'CBN', 'Airline Ldkgpy', 'TMRQOTE', 'Country Ulmq'),
+(197, 'GF', 'FUZ', 'Airline Wevjxc', 'IRKLEYU', 'Country Zydl'),
+(198, 'DN', 'YAH', 'Airline Dgefbf', 'ROWEPPL', 'Country Hnhw'),
+(199, 'KI', 'XHX', 'Airline Whdigj', 'JRRNWOD', 'Country Qvos'),
+(200, 'PB', 'HXV', 'Airline Swvdxc', 'MTPMDQZ', 'Country Mkfh'),
+(201, 'TJ', 'MSY', 'Airline Uqxayi', 'AJNILPZ', 'Country Gacd'),
+(202, 'B4', 'ODY', 'Airline Kexdyu', 'MFAFXYQ', 'Country Duzo'),
+(203, 'CX', 'OZI', 'Airline Bfsqyp', 'DHOPWTZ', 'Country Hccq'),
+(204, 'RJ', 'VIB', 'Airline Doitdn', 'YKYEVKP', 'Country Hwrg'),
+(205, 'PE', 'XVR', 'Airline Ngcjyj', 'NNOPDYY', 'Country Aupg'),
+(206, 'PF', 'NMG', 'Airline Gtpudz', 'XXPUZZZ', 'Country Cuqh'),
+(207, 'TE', 'SJH', 'Airline Vgyvus', 'RGPLNTL', 'Country Zfpo'),
+(208, 'H2', 'JQH', 'Airline Mdoifg', 'AIRBMLM', 'Country Yvgb'),
+(209, 'HP', 'CHW', 'Airline Tnxmrj', 'CITPYIW', 'Country Uiak'),
+(210, 'PG', 'BNE', 'Airline Rklalq', 'EYUHDXW', 'Country Rhvr'),
+(211, 'RT', 'ZSK', 'Airline Wibrjd', 'ZVGLOXJ', 'Country Vqos'),
+(212, 'KQ', 'HAO', 'Airline Oqbogi', 'MGBDBQP', 'Country Meky'),
+(213, 'UG', 'GRR', 'Airline Gpdqkr', 'EUJMBXA', 'Country Imat'),
+(214, 'L7', 'NJY', 'Airline Rqyuhi', 'FLVQVTZ', 'Country Icmu'),
+(215, 'WD', 'ZJN', 'Airline Mvvpan', 'QDVJCEV', 'Country Rlcw'),
+(216, 'EZ', 'NBZ', 'Airline Wzhpji', 'AFANNNO', 'Country Cyqu'),
+(217, 'QN', 'IJM', 'Airline Ljlhqa', 'GZFWLCY', 'Country Zweb'),
+(218, 'SK', 'SES', 'Airline Jwilet', 'TETBCUP', 'Country Ydbw'),
+(219, 'H4', 'DMV', 'Airline Alivbg', 'ABJGXDO', 'Country Jnxp'),
+(220, 'B7', 'RTZ', 'Airline Fvriih', 'WOHLEQL', 'Country Zkmv'),
+(221, 'LD', 'VXT', 'Airline Nvmexe', 'FUJCFIS', 'Country Mxuw'),
+(222, 'QJ', 'ZUG', 'Airline Zwpwkg', 'ZOMYZOW', 'Country Jdba'),
+(223, 'Q4', 'CTP', 'Airline Llikhy', 'SLRAPYE', 'Country Anmk'),
+(224, 'PS', 'APJ', 'Airline Ibcmur', 'WSRVEHS', 'Country Cakq'),
+(225, 'SH', 'VJE', 'Airline Bcyhxv', 'WUFWCOB', 'Country Ngkk'),
+(226, 'U9', 'OVL', 'Airline Tqigav', 'MSHMUCV', 'Country Fxvd'),
+(227, 'CC', 'YNU', 'Airline Zcomfh', 'HGVASAT', 'Country Yudk'),
+(228, 'P3', 'NRS', 'Airline Qjoptx', 'KSYDHBW', 'Country Lcgb'),
+(229, 'R6', 'KYV', 'Airline Sjkxny', 'YOIARYZ', 'Country Kgwt'),
+(230, 'EZ', 'SQI', 'Airline Vjwnrr', 'FAHKWDT', 'Country Aqui'),
+(231, 'IU', 'CDU', 'Airline Rmbsjq', 'YCJUZVS', 'Country Mmqh'),
+(232, 'EN', 'DQI', 'Airline Schqam', 'MSAMXZY', 'Country Kilw'),
+(233, 'SH', 'BKF', 'Airline Wggpag', 'DZDGWVK', 'Country Ckdo'),
+(234, 'PW', 'TYW', 'Airline Ylutpv', 'TVSCHYS', 'Country Malh'),
+(235, 'MJ', 'AZM', 'Airline Khaape', 'MZYLFKX', 'Country Nqro'),
+(236, 'XP', 'WSC', 'Airline Ptslya', 'ITLCBOQ', 'Country Zwin'),
+(237, 'PO', 'APA', 'Airline Jhwujp', 'GZREDVH', 'Country Evgm'),
+(238, 'VK', 'YBF', 'Airline Rdjyzp', 'BICPUJA', 'Country Fytj'),
+(239, 'AI', 'BTA', 'Airline Xdrosu', 'NNPKXWG', 'Country Cdkt'),
+(240, 'T1', 'DSE', 'Airline Gbthqk', 'AKPSTFM', 'Country Bhip'),
+(241, 'ZP', 'AFW', 'Airline Njipra', 'RMWKTEY', 'Country Qnzx'),
+(242, 'A9', 'PGV', 'Airline Farror', 'ARFSEHW', 'Country Rmek'),
+(243, 'LT', 'GRW', 'Airline Mhmthu', 'GYTOITE', 'Country Oscz'),
+(244, 'F1', 'EYM', 'Airline Dxiinb', 'QFEQEXA', 'Country Imcw'),
+(245, 'V3', 'WRU', 'Airline Kjxjxm', 'CELPCBJ', 'Country Oauh'),
+(246, 'CW', 'PAO', 'Airline Pzbtbz', 'TKTYPHH', 'Country Pdgw'),
+(247, 'BH', 'DJS', 'Airline Bhpllx', 'VMMVYFV', 'Country Drqz'),
+(248, 'BL', 'WTN', 'Airline Snxqte', 'TXSMEPE', 'Country Ofmg'),
+(249, 'OL', 'ZNA', 'Airline Bvusnz', 'MAYBWOA', 'Country Zmez'),
+(250, 'WW', 'UCB', 'Airline Aqxtvd', 'FAIOTRF', 'Country Cany'),
+(251, 'EA', 'ZXN', 'Airline Qzjxwe', 'AGJXOHB', 'Country Oyer'),
+(252, 'KA', 'SNP', 'Airline Aefiev', 'URYFNJQ', 'Country Htnc'),
+(253, 'RU', 'EIJ', 'Airline Wjqkca', 'VNANIFM', 'Country Ezst'),
+(254, 'MR', 'FNF', 'Airline Nixucm', 'GESOVOW', 'Country Oijw'),
+(255, 'VM', 'FLI', 'Airline Ryhthr', 'AGINRWM', 'Country Aoha'),
+(256, 'TP', 'GSX', 'Airline Cxzgxf', 'JMKDSES', 'Country Vzng'),
+(257, 'S6', 'JLO', 'Airline Xzxznr', 'BABTQIR', 'Country Bnyz'),
+(258, 'X4', 'PDX', 'Airline Ormhql', 'YPVSSDC', 'Country Hzip'),
+(259, 'U5', 'JDV', 'Airline Jnklnm', 'POSKHJQ', 'Country Hplw'),
+(260, 'AP', 'XGQ', 'Airline Ofptgh', 'MLGTNJL', 'Country Datg'),
+(261, 'JV', 'OHJ', 'Airline Nxhule', 'NKBCNWM', 'Country Ebcr'),
+(262, 'EZ', 'ZMT', 'Airline Abbeoq', 'MAPNUSU', 'Country Vjao'),
+(263, 'EM', 'IRO', 'Airline Uswgdw', 'RGDOGRM', 'Country Aniw'),
+(264, 'RL', 'BUV', 'Airline Ebxyss', 'PXIABWR', 'Country Iqui'),
+(265, 'PL', 'TFA', 'Airline Sehvza', 'PESLWYK', 'Country Hhaa'),
+(266, 'UU', 'HGA', 'Airline Piwrfi', 'LKXPZLY', 'Country Ajkv'),
+(267, 'TT', 'VBE', 'Airline Ziszvu', 'OVFJVUZ', 'Country Gldq'),
+(268, 'SL', 'BQN', 'Airline Fhiwoo', 'ZBDIRYU', 'Country Jnvp'),
+(269, 'O8', 'XTP', 'Airline Jogdqm', 'OLTWGMB', 'Country Kmia'),
+(270, 'YG', 'UWZ', 'Airline Rvpkiw', 'ARVNNMF', 'Country Cqri'),
+(271, 'KP', 'XGK', 'Airline Exhyan', 'TBOQOMM', 'Country Yycp'),
+(272, 'TC', 'QVS', 'Airline Amdbsq', 'EAMPTCJ', 'Country Jmpk'),
+(273, 'TS', 'DNZ', 'Airline Sfidom', 'AKRELXI', 'Country Cgzx'),
+(274, 'JF', 'VIW', 'Airline Nkugss', 'QIEECJG', 'Country Fxtl'),
+(275, 'X2', 'UYY', 'Airline Xwqfie', 'VPGQXOQ', 'Country Hbno'),
+(276, 'XF', 'MZH', 'Airline Karpmj', 'LDDAPDV', 'Country Kdac'),
+(277, 'YZ', 'DRT', 'Airline Ioubex', 'KAAWJPT', 'Country Qqhi'),
+(278, 'CB', 'OKF', 'Airline Otcxvr', 'LLBMEAM', 'Country Fafd'),
+(279, 'P1', 'EXN', 'Airline Fbeeqz', 'QQUQNNR', 'Country Qahl'),
+(280, 'H2', 'XGQ', 'Airline Fnfshk', 'HGAQYJF', 'Country Cusd'),
+(281, 'WL', 'SCP', 'Airline Thgvcl', 'VLXBRDK', 'Country Qxfe'),
+(282, 'LX', 'ZSF', 'Airline Jfpnoe', 'ZTJQURC', 'Country Kwvw'),
+(283, 'HE', 'JVN', 'Airline Owllys', 'KYFDUCG', 'Country Ayoj'),
+(284, 'RZ', 'AYV', 'Airline Eksbbu', 'OPZIYKO', 'Country Huah'),
+(285, 'MK', 'IXU', 'Airline Heukza', 'VFATTAO', 'Country Cgyb'),
+(286, 'Q2', 'DYK', 'Airline Uqgiqq', 'IHHFNPW', 'Country Dxln'),
+(287, 'MB', 'QAK', 'Airline Affgwg', 'UNWYSIQ', 'Country Cdao'),
+(288, 'I3', 'SXS', 'Airline Tqjobm', 'JJTRIAI', 'Country Afuu'),
+(289, 'JD', 'ICN', 'Airline Pluntf', 'HQDUYOJ', 'Country Uulh'),
+(290, 'ZK', 'LRC', 'Airline Isnzfg', 'LDMUWGA', 'Country Lkwy'),
+(291, 'ZS', 'SDH', 'Airline Ksevdp', 'JDJSBEP', 'Country Clcy'),
+(292, 'HK', 'MCB', 'Airline Zhnsge', 'MSEWPSL', 'Country Yrzs'),
+(293, 'OT', 'SAA', 'Airline Tsvldp', 'MDAXKWR', 'Country Bnwa'),
+(294, 'VI', 'FVD', 'Airline Jlmywj', 'BXJOGKV', 'Country Lhrl'),
+(295, 'RA', 'GIS', 'Airline Qygqwe', 'KYSSOFY', 'Country Jjxs'),
+(296, 'D7', 'KIL', 'Airline Dzhtoc', 'XZLBJPR', 'Country Nmas'),
+(297, 'QT', 'CAG', 'Airline Ojfdke', 'CUBIWIU', 'Country Duwp'),
+(298, 'HX', 'KBJ', 'Airline Emgrhf', 'CKGORJG', 'Country Dtca'),
+(299, 'TJ', 'IHI', 'Airline Nnnbws', 'KBMCKQX', 'Country Nuuc'),
+(300, 'G7', 'TJA', 'Airline Prcimx', 'MNJVALN', 'Country Hlvr'),
+(301, 'WI', 'KOA', 'Airline Zypgqs', 'AWAGKVD', 'Country Ensk'),
+(302, 'ST', 'YQJ', 'Airline Neqlyj', 'LXOFTGO', 'Country Iboq'),
+(303, 'EW', 'SFN', 'Airline Hbiqel', 'HTFYSGA', 'Country Tvkw'),
+(304, 'EJ', 'UYE', 'Airline Zbvude', 'YSJOEZQ', 'Country Vvzx'),
+(305, 'UD', 'WPH', 'Airline Rwseha', 'JIJSYRE', 'Country Drrp'),
+(306, 'C5', 'DNK', 'Airline Qwnabj', 'BVGACTQ', 'Country Knrz'),
+(307, 'ZS', 'FTD', 'Airline Dlrhqx', 'OXPODZU', 'Country Mysr'),
+(308, 'RE', 'DGQ', 'Airline Pesldt', 'UJXTVYH', 'Country Itod'),
+(309, 'ZY', 'GSX', 'Airline Mosnvy', 'EVXWBDI', 'Country Timj'),
+(310, 'ZD', 'ZTN', 'Airline Sindmg', 'AHCREOP', 'Country Unso'),
+(311, 'BX', 'ETY', 'Airline Ysoved', 'MTDMEZG', 'Country Bdut'),
+(312, 'AM', 'YVP', 'Airline Ytaoho', 'HWTDUEN', 'Country Gpkb'),
+(313, 'MO', 'ATO', 'Airline Ogxkfj', 'YOKAVDL', 'Country Awrn'),
+(314, 'FM', 'VXY', 'Airline Rkbjdt', 'SDKFJMH', 'Country Jubq'),
+(315, 'IV', 'SKY', 'Airline Qmmriy', 'HFADASA', 'Country Orki'),
+(316, 'G1', 'QVK', 'Airline Xpfguf', 'WTMWILF', 'Country Qqrm'),
+(317, 'BJ', 'JXI', 'Airline Jbyyto', 'OUFRQFC', 'Country Dpis'),
+(318, 'H5', 'XFO', 'Airline Ggcdyv', 'AJVNSOW', 'Country Sfkf'),
+(319, 'PN', 'MZU', 'Airline Wuajex', 'KTABYGC', 'Country Dapc'),
+(320, 'R3', 'QFH', 'Airline Jnmcuo', 'ZMMRQYG', 'Country Jhyn'),
+(321, 'RL', 'VEG', 'Airline Jarsoq', 'VZYJZXT', 'Country Rpwv'),
+(322, 'IQ', 'USQ', 'Airline Kwkxxu', 'SUBZXQE', 'Country Yeui'),
+(323, 'FQ', 'LFL', 'Airline Pvgmqz', 'XJEIQFI', 'Country Shld'),
+(324, 'E4', 'DVJ', 'Airline Chsygz', 'QRFZBFN', 'Country Ezvs'),
+(325, 'LM', 'WFN', 'Airline Wfvmra', 'CPHGVUK', 'Country Ibbx'),
+(326, 'QB', 'FOC', 'Airline Vqcrxk', 'HZRIVQI', 'Country Zjuq'),
+(327, 'TH', 'QTH', 'Airline Uizcau', 'INXITJF', 'Country Wpuy'),
+(328, 'UG', 'MNQ', 'Airline Lxhbxg', 'NRCYABR', 'Country Yqsx'),
+(329, 'QI', 'PWK', 'Airline Mgcfiy', 'AWTZVMQ', 'Country Oxsz'),
+(330, 'QL', 'ESF', 'Airline Mtqqpc', 'LDPHIFG', 'Country Uwmo'),
+(331, 'JT', 'JWH', 'Airline Cmpvjk', 'ZREFLMY', 'Country Aanc'),
+(332, 'BP', 'OFC', 'Airline Aasmes', 'MVOEJUP', 'Country Uotr'),
+(333, 'X2', 'JIE', 'Airline Hkgowx', 'VWZGWFE', 'Country Oauu'),
+(334, 'SS', 'YMV', 'Airline Dozsxc', 'PBHPLBF', 'Country Ciyr'),
+(335, 'OO', 'OPS', 'Airline Rqpznu', 'QDTJGDG', 'Country Upen'),
+(336, 'DE', 'BSZ', 'Airline Cqxkcd', 'MACZTWC', 'Country Xdkw'),
+(337, 'GB', 'UYO', 'Airline Iashjs', 'JKWAUBH', 'Country Ifiy'),
+(338, 'GG', 'RQL', 'Airline Ogetol', 'ZVAEIVC', 'Country Zudi'),
+(339, 'V9', 'WLT', 'Airline Aznimn', 'VXKQOWK', 'Country Tsvv'),
+(340, 'J4', 'UQO', 'Airline Zmnzge', 'GLBJRWK', 'Country Uxia'),
+(341, 'WQ', 'QXG', 'Airline Ryqcog', 'UKJFDIT', 'Country Uetm'),
+(342, 'HM', 'TEF', 'Airline Xlgbfr', 'JQVFHBP', 'Country Osxg'),
+(343, 'US', 'ZRC', 'Airline Konqov', 'FDICCAW', 'Country Yert'),
+(344, 'DH', 'CPJ', 'Airline Ufffso', 'HCNEPRV', 'Country Ubzt'),
+(345, 'CY', 'MWS', 'Airline Vcczcr', 'UJFKBUR', 'Country Nrgx'),
+(346, 'JY', 'LPG', 'Airline Njnogt', 'PVOJYGJ', 'Country Wdbq'),
+(347, 'M3', 'QWS', 'Airline Hhhsya', 'XSPKXRB', 'Country Jeen'),
+(348, 'RD', 'ITD', 'Airline Cizxql', 'NEBELKP', 'Country Jndy'),
+(349, 'ZF', 'SFZ', 'Airline Fehajn', 'JMOSVNP', 'Country Gskz'),
+(350, 'RP', 'RPS', 'Airline Ndtgps', 'WACTKLV', 'Country Lhru'),
+(351, 'A5', 'EGI', 'Airline Gzwxcl', 'FAYPXRX', 'Country Bgrg'),
+(352, 'CM', 'RRT', 'Airline Publqh', 'PUNYXBE', 'Country Ofra'),
+(353, 'BY', 'XKN', 'Airline Zbmvwt', 'WVZLLLP', 'Country Vuow'),
+(354, 'FN', 'PGB', 'Airline Azonjk', 'QWWVHJS', 'Country Kinl'),
+(355, 'FX', 'PLN', 'Airline Jageap', 'AQCEPCJ', 'Country Rwum'),
+(356, 'O6', 'EKI', 'Airline Dfuiwf', 'LJYXKPX', 'Country Suwj'),
+(357, 'FH', 'PMT', 'Airline Pgeaqj', 'CGAEUKG', 'Country Szka'),
+(358, 'ZT', 'YLC', 'Airline Tofznn', 'CUAZXDP', 'Country Qqmk'),
+(359, 'IG', 'NMT', 'Airline Szjyno', 'HBVVGGL', 'Country Uudh'),
+(360, 'ED', 'HVQ', 'Airline Uobyjr', 'MSHANST', 'Country Mjhd'),
+(361, 'HX', 'SNI', 'Airline Vnbkoa', 'WKYZXRL', 'Country Znzr'),
+(362, 'N1', 'AXJ', 'Airline Hgdpsc', 'CFIAUOC', 'Country Jfuh'),
+(363, 'GT', 'RQK', 'Airline Apgkxt', 'HIRCOUR', 'Country Kgzh'),
+(364, 'BU', 'YTL', 'Airline Shxcnk', 'EVBIJBX', 'Country Dqqz'),
+(365, 'T2', 'RWO', 'Airline Gieafl', 'BYBIWWJ', 'Country Gnil'),
+(366, 'X1', 'NXO', 'Airline Flyynd', 'KKQZFSV', 'Country Nvku'),
+(367, 'RI', 'WLK', 'Airline Dwkoeq', 'BQCOMAU', 'Country Vsym'),
+(368, 'JT', 'WIM', 'Airline Cwxjjb', 'LRQJWJH', 'Country Ncdv'),
+(369, 'VU', 'UQP', 'Airline Pnmfvh', 'XOBXBDX', 'Country Xnzd'),
+(370, 'WA', 'EOX', 'Airline Rmifsq', 'NAEWYAG', 'Country Lawg'),
+(371, 'ZW', 'WEL', 'Airline Hkoieu', 'HPBUAUR', 'Country Kkzc'),
+(372, 'YY', 'FHO', 'Airline Pzarqh', 'QURSILK', 'Country Meoa'),
+(373, 'HD', 'SHW', 'Airline Qxnqxb', 'HYYMXZA', 'Country Nnrw'),
+(374, 'EF', 'PFI', 'Airline Rjsbyh', 'DPAJCRB', 'Country Tabn'),
+(375, 'PP', 'TNJ', 'Airline Lrttxq', 'NVJDJJV', 'Country Jaqq'),
+(376, 'SG', 'YQQ', 'Airline Ftjpsp', 'TAWTQNT', 'Country Mhjm'),
+(377, 'Q2', 'BVB', 'Airline Clujhv', 'ZAGAGVV', 'Country Rkfd'),
+(378, 'AP', 'PYA', 'Airline Wooolf', 'DBOLVMI', 'Country Uiok'),
+(379, 'E8', 'UNL', 'Airline Lwlggz', 'RTLYZJY', 'Country Ylyq'),
+(380, 'MI', 'HBQ', 'Airline Liczdt', 'TODLJPG', 'Country Mziq'),
+(381, 'T9', 'JXK', 'Airline Tribpd', 'PAUFESV', 'Country Dwes'),
+(382, 'G7', 'PJQ', 'Airline Fpflqx', 'ZWYVIYE', 'Country Kqxj'),
+(383, 'RQ', 'EEZ', 'Airline Bdvdwa', 'OEIKTFN', 'Country Titb'),
+(384, 'C1', 'TAF', 'Airline Tmmxfe', 'DTRXACK', 'Country Ruri'),
+(385, 'B6', 'WML', 'Airline Xlypzk', 'YFXAIEL', 'Country Zwip'),
+(386, 'KJ', 'UIN', 'Airline Yyljlt', 'LDCOYDP', 'Country Pbqx'),
+(387, 'J6', 'COR', 'Airline Upzzzi', 'NYBVUOG', 'Country Ytvf'),
+(388, 'QP', 'JWV', 'Airline Zqvhee', 'XBBDIUO', 'Country Aftq'),
+(389, 'QD', 'AYX', 'Airline Fqegnh', 'WYAZRJH', 'Country Ipju'),
+(390, 'R0', 'XQE', 'Airline Vcadtr', 'NWSAQMA', 'Country Bgaj'),
+(391, 'O6', 'VGP', 'Airline Zljckb', 'RRPCNLV', 'Country Sphy'),
+(392, 'T3', 'BDA', 'Airline Znuabk', 'NYDWHHD', 'Country Hlfa'),
+(393, 'QZ', 'FUY', 'Airline Rndvwb', 'LTBZSPZ', 'Country Qwrt'),
+(394, 'QG', 'JMQ', 'Airline Wwwmzz', 'LBFOOYQ', 'Country Ycpg'),
+(395, 'RO', 'PPE', 'Airline Wlxrsk', 'EBNMJSN', 'Country Vclt'),
+(396, 'SG', 'OFA', 'Airline Vcyoni', 'CQJGOGN', 'Country Pvyg'),
+(397, 'OU', 'MMO', 'Airline Vfvshz', 'BQHIOXS', 'Country Gbdo'),
+(398, 'SW', 'AYW', 'Airline Iisvpl', 'KBVDPNU', 'Country Jwlh'),
+(399, 'B7', 'GAZ', 'Airline Foqewa', 'XJVELEH', 'Country Lygm'),
+(400, 'AR', 'JWU', 'Airline Dhcswe', 'APMRTCX', 'Country Fjya'),
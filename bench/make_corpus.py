@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Regenerate the synthetic benchmark corpora in this directory. The output
+# only depends on the seed, so the checked-in files can be reproduced.
+
+import os
+import gzip
+import json
+import random
+from datetime import datetime, timedelta
+
+here = os.path.dirname(os.path.abspath(__file__))
+rng = random.Random(20261019)
+t0 = datetime(2026, 10, 19, 12, 0, 0)
+epoch0 = 1792411200.0 # t0 as UTC seconds; the exact value doesn't matter
+
+airlines = [('UA', 'UAL', 'United Airlines', 'UNITED', 'United States'),
+            ('AA', 'AAL', 'American Airlines', 'AMERICAN', 'United States'),
+            ('DL', 'DAL', 'Delta Air Lines', 'DELTA', 'United States'),
+            ('FX', 'FDX', 'Federal Express', 'FEDEX', 'United States'),
+            ('BA', 'BAW', 'British Airways', 'SPEEDBIRD', 'United Kingdom'),
+            ('AC', 'ACA', 'Air Canada', 'AIR CANADA', 'Canada'),
+            ('SK', 'SAS', 'Scandinavian Airlines', 'SCANDINAVIAN', 'Sweden'),
+            ('UP', 'UPS', 'United Parcel Service', 'UPS', 'USA')]
+
+def open_corpus(fn):
+    '''the larger corpora are gzipped, with a fixed mtime so they are reproducible'''
+    if fn.endswith('.gz'):
+        return gzip.GzipFile(fn, 'wb', mtime=0)
+    return open(fn, 'w')
+
+def letters(n):
+    return ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(n))
+
+def make_airlines(fn, n=400):
+    with open_corpus(fn) as fd:
+        fd.write("INSERT INTO `airlines` (`id`, `iata`, `icao`, `airline`, `callsign`, `country`) VALUES\n")
+        rows = list(airlines)
+        while len(rows) < n:
+            rows.append((letters(1) + rng.choice('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'), letters(3),
+                         'Airline ' + letters(6).title(), letters(7), 'Country ' + letters(4).title()))
+        for i, r in enumerate(rows):
+            fd.write("({}, '{}', '{}', '{}', '{}', '{}'),\n".format(i + 1, *r))
+
+def make_airports(fn, n=1000):
+    cols = ['ident', 'type', 'name', 'elevation_ft', 'continent', 'iso_country', 'iso_region',
+            'municipality', 'gps_code', 'iata_code', 'local_code', 'coordinates']
+    with open_corpus(fn) as fd:
+        fd.write(','.join(cols) + '\n')
+        for i in range(n):
+            ident = 'K' + letters(3)
+            row = [ident, rng.choice(['small_airport', 'medium_airport', 'large_airport', 'heliport']),
+                   'Airport ' + letters(5).title(), str(rng.randint(0, 5000)) if rng.random() > 0.1 else '',
+                   'NA', 'US', 'US-' + letters(2), 'Town ' + letters(4).title(), ident,
+                   ident[1:] if rng.random() > 0.5 else '', '',
+                   '"{:.6f}, {:.6f}"'.format(rng.uniform(-125, -67), rng.uniform(25, 49))]
+            fd.write(','.join(row) + '\n')
+
+def make_sbs1(fn, n=20000, n_aircraft=200):
+    aircraft = []
+    for i in range(n_aircraft):
+        al = rng.choice(airlines)
+        aircraft.append({'icao24': '%06X' % rng.randint(0xA00000, 0xADF7C7),
+                         'callsign': '{}{}'.format(al[1], rng.randint(1, 9999)),
+                         'lat': rng.uniform(40.0, 44.0), 'lon': rng.uniform(-74.0, -69.0),
+                         'alt': rng.randint(0, 400) * 100, 'trk': rng.uniform(0, 360),
+                         'gs': rng.randint(120, 520)})
+    with open_corpus(fn) as fd:
+        fd.write('junk line, discarded by open_datafile()\n')
+        t = t0
+        for i in range(n):
+            t += timedelta(milliseconds=rng.randint(0, 40))
+            a = rng.choice(aircraft)
+            d = t.strftime('%Y/%m/%d')
+            tm = t.strftime('%H:%M:%S.%f')[:-3]
+            tt = rng.choice([1, 3, 3, 3, 3, 4, 4, 5, 7, 8])
+            f = ['MSG', str(tt), '1', '1', a['icao24'], '1', d, tm, d, tm] + [''] * 12
+            if tt == 1:
+                f[10] = a['callsign']
+            elif tt == 3:
+                a['lat'] += rng.uniform(-0.01, 0.01)
+                a['lon'] += rng.uniform(-0.01, 0.01)
+                f[11] = str(a['alt'])
+                f[14] = '%.5f' % a['lat']
+                f[15] = '%.5f' % a['lon']
+                f[18:22] = ['0', '0', '0', '0']
+            elif tt == 4:
+                f[12] = str(a['gs'])
+                f[13] = '%.1f' % a['trk']
+                f[16] = str(rng.choice([0, 0, 64, -64, 1024, -1024]))
+            elif tt in (5, 7):
+                f[11] = str(a['alt'])
+                f[18:22] = ['0', '0', '0', '0']
+            fd.write(','.join(f) + '\r\n')
+
+def acars_text(label, flight):
+    if label == 'SA':
+        return '0EV{:02d}{:02d}{:02d}V'.format(rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59))
+    if label == 'SQ':
+        return '02{:04d}N{:05d}WV136975/ARINC'.format(rng.randint(2500, 4900), rng.randint(6700, 12500))
+    if label == '5Z':
+        return rng.choice(['/B6 KBOS R22L', '/B6 EWR R4R', '/C3 OFF 1234', '/CG PDC PLEASE', '/WB ORD-SFO'])
+    if label == '15':
+        return '(2N{:05d}W{:06d}OFF1910261230{}(Z'.format(rng.randint(0, 89999), rng.randint(0, 179999), letters(4))
+    if label == '16' and flight.startswith('FX'):
+        return ('{:06d}/AUTPOS/LLD N{:06d} W{:07d}  /ALT {}/SAT -45  /WND 270045/TAT -20/TAS 450/CRZ 820  /FOB 123400\r\n'
+                '/DAT 261019/TIM 123456').format(rng.randint(0, 999999), rng.randint(250000, 490000), rng.randint(670000, 1250000), rng.randint(100, 400) * 100)
+    if label == '16':
+        return 'N {:.3f}/W {:.3f},{}'.format(rng.uniform(25, 49), rng.uniform(67, 125), rng.randint(10, 400) * 100)
+    if label == ':;':
+        return str(rng.choice([129125, 130025, 130450, 131550]))
+    words = ['POS', 'ETA', 'FOB', 'KBOS', 'KJFK', 'RWY', '22L', 'WX', 'REQ', 'ATIS', 'OK', 'DELAY', 'GATE']
+    return ' '.join(rng.choice(words) for _ in range(rng.randint(3, 30)))
+
+def make_acars(fn, n=5000):
+    labels = ['H1', 'H1', 'H1', '_d', 'Q0', 'SA', 'SQ', 'SQ', '5Z', '15', '16', '10', '11', ':;', '80', 'QA']
+    with open_corpus(fn) as fd:
+        ts = epoch0
+        for i in range(n):
+            ts += rng.uniform(0, 0.5)
+            label = rng.choice(labels)
+            al = rng.choice(airlines + [('N', '', '', '', '')])
+            flight = '{}{:04d}'.format(al[0], rng.randint(1, 9999)) if al[1] else 'N{}{}'.format(rng.randint(1, 999), letters(2))
+            msg = {'timestamp': round(ts, 3), 'station_id': 'bench', 'channel': rng.randint(0, 7),
+                   'freq': rng.choice([129.125, 130.025, 130.450, 131.550]), 'level': rng.randint(-40, -5),
+                   'error': rng.choice([0, 0, 0, 0, 1, 2]), 'mode': '2', 'label': label,
+                   'block_id': rng.choice('0123456789'), 'ack': rng.choice(['!', 'A', 'B']),
+                   'tail': '.N{}{}'.format(rng.randint(1, 999), letters(2)), 'flight': flight,
+                   'msgno': 'M{:02d}A'.format(rng.randint(0, 99)), 'text': acars_text(label, flight)}
+            fd.write(json.dumps(msg, sort_keys=True) + '\n')
+
+def make_master(fn, n=3000):
+    cols = ['N-NUMBER', 'SERIAL NUMBER', 'MFR MDL CODE', 'ENG MFR MDL', 'YEAR MFR', 'TYPE REGISTRANT', 'NAME',
+            'STREET', 'STREET2', 'CITY', 'STATE', 'ZIP CODE', 'REGION', 'COUNTY', 'COUNTRY', 'LAST ACTION DATE',
+            'CERT ISSUE DATE', 'CERTIFICATION', 'TYPE AIRCRAFT', 'TYPE ENGINE', 'STATUS CODE', 'MODE S CODE',
+            'FRACT OWNER', 'AIR WORTH DATE', 'OTHER NAMES(1)', 'OTHER NAMES(2)', 'OTHER NAMES(3)', 'OTHER NAMES(4)',
+            'OTHER NAMES(5)', 'EXPIRATION DATE', 'UNIQUE ID', 'KIT MFR', ' KIT MODEL', 'MODE S CODE HEX', '']
+    with open_corpus(fn) as fd:
+        fd.write('\xef\xbb\xbf' + ','.join(cols) + '\r\n')
+        for i in range(n):
+            code = rng.randint(0xA00000, 0xADF7C7)
+            row = ['{}{}'.format(rng.randint(1, 99999), letters(rng.randint(0, 2))).ljust(5),
+                   str(rng.randint(1, 99999)).ljust(30), '%07d' % rng.randint(0, 9999999), '%05d' % rng.randint(0, 99999),
+                   str(rng.randint(1940, 2026)), str(rng.randint(1, 8)), ('OWNER ' + letters(8)).ljust(50),
+                   ('%d MAIN ST' % rng.randint(1, 9999)).ljust(33), ' ' * 33, 'CITY'.ljust(18), letters(2),
+                   '%05d' % rng.randint(0, 99999), '1', '%03d' % rng.randint(1, 200), 'US',
+                   '2025%02d%02d' % (rng.randint(1, 12), rng.randint(1, 28)), '2019%02d%02d' % (rng.randint(1, 12), rng.randint(1, 28)),
+                   '1T', str(rng.randint(1, 9)), str(rng.randint(0, 11)), 'V', '%08o' % code, ' ',
+                   '2001%02d%02d' % (rng.randint(1, 12), rng.randint(1, 28)), '', '', '', '', '',
+                   '2028%02d%02d' % (rng.randint(1, 12), rng.randint(1, 28)), str(i + 1).rjust(8), '', '', '%06X' % code, '']
+            fd.write(','.join(row) + '\r\n')
+
+if __name__ == '__main__':
+    make_airlines(os.path.join(here, 'airlines.sql'))
+    make_airports(os.path.join(here, 'airport-codes.csv'))
+    make_sbs1(os.path.join(here, 'sbs1.txt.gz'))
+    make_acars(os.path.join(here, 'acars.json.gz'))
+    make_master(os.path.join(here, 'MASTER.txt.gz'))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Receiver coverage and message rate statistics, kept incrementally by the
+# ADS-B loader so that range plots and antenna comparisons don't need a
+# scan of adsb_positions. For each sensor with a known location, positions
+# are binned by bearing sector and altitude band, keeping the furthest
+# range and the number of positions in each bin. Per hour, the messages of
+# each transmission type and the number of aircraft heard are counted.
+# Both are written out every `interval` seconds of each sensor's data as
+# increments:
+#
+#   coverage        {_id: 'SENSOR/YYYY-MM-DD', sensor, day, location: [lon, lat],
+#                    max_range: {band: {sector: nm}}, positions: {band: {sector: n}}}
+#   coverage_rates  {_id: 'SENSOR/YYYY-MM-DDTHH', sensor, hour,
+#                    messages: {transmission type: n}, aircraft}
+#
+# so several loaders, or a restarted one, add to the same documents. Bands
+# are named by their lower altitude limit in feet, 'ground' for surface
+# positions, and sectors by their first bearing in degrees. The aircraft
+# count of an hour is a maximum rather than a sum, so it undercounts when
+# the loader restarts within the hour.
+#
+# Served on the loader's metrics port:
+#   /coverage?sensor=NAME&days=N     the range envelope of each band as GeoJSON,
+#                                    of the loader's own sensor by default
+
+import json
+from math import asin, atan2, cos, degrees, radians, sin, sqrt
+from datetime import datetime, timedelta
+
+import metrics
+from partitions import _utc
+
+sector_width = 5 # degrees
+bands = [0, 5000, 10000, 20000, 30000] # feet
+earth_radius = 3440.065 # nautical miles
+
+implausible = metrics.counter('skyshark_coverage_implausible_total', 'positions further from the sensor than any receiver could hear', ['sensor'])
+
+def range_bearing(lat1, lon1, lat2, lon2):
+    '''great circle distance in nm and initial bearing in degrees from point 1 to point 2'''
+    p1, p2 = radians(lat1), radians(lat2)
+    dlat, dlon = p2 - p1, radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(p1) * cos(p2) * sin(dlon / 2) ** 2
+    rng = 2 * earth_radius * asin(min(1.0, sqrt(a)))
+    brg = degrees(atan2(sin(dlon) * cos(p2), cos(p1) * sin(p2) - sin(p1) * cos(p2) * cos(dlon)))
+    return rng, brg % 360
+
+def destination(lat, lon, rng, brg):
+    '''(lat, lon) rng nm from a point along bearing brg'''
+    d = rng / earth_radius
+    p1, b = radians(lat), radians(brg)
+    p2 = asin(sin(p1) * cos(d) + cos(p1) * sin(d) * cos(b))
+    l2 = radians(lon) + atan2(sin(b) * sin(d) * cos(p1), cos(d) - sin(p1) * sin(p2))
+    return degrees(p2), (degrees(l2) + 540) % 360 - 180
+
+def band_of(altitude, on_ground=False):
+    if on_ground:
+        return 'ground'
+    if altitude is None:
+        return None
+    rv = bands[0]
+    for b in bands:
+        if altitude >= b:
+            rv = b
+    return str(rv)
+
+class SensorStats(object):
+    def __init__(self, name, location=None):
+        self.name = name
+        self.location = location # (lat, lon)
+        self.max_range = {} # (day, band, sector) -> nm, whole day
+        self.dirty = set() # bins of max_range changed since the last flush
+        self.positions = {} # (day, band, sector) -> n since the last flush
+        self.messages = {} # (hour, transmission type) -> n since the last flush
+        self.aircraft = {} # hour -> set of icao24
+        self.clock = None # newest message time, naive UTC
+        self.last_flush = None # clock at the last flush
+
+class CoverageStats(object):
+    '''per sensor coverage histograms and message rates, see above'''
+    def __init__(self, dbh, locations=None, default_sensor='local', interval=300, max_range=450):
+        self.dbh = dbh
+        self.default_sensor = default_sensor
+        self.interval = interval
+        self.max_range = max_range
+        self.sensors = {}
+        for name, loc in (locations or {}).items():
+            self.sensors[name] = SensorStats(name, loc)
+
+    def _sensor(self, name):
+        name = name or self.default_sensor
+        s = self.sensors.get(name)
+        if s is None:
+            s = self.sensors[name] = SensorStats(name)
+        return s
+
+    def message(self, sensor, transmission_type, icao24=None, timestamp=None):
+        '''count a message; timestamp defaults to that of the sensor's last position'''
+        s = self._sensor(sensor)
+        if timestamp is not None:
+            s.clock = _utc(timestamp)
+        if s.clock is None:
+            return
+        hour = s.clock.replace(minute=0, second=0, microsecond=0)
+        k = (hour, transmission_type)
+        s.messages[k] = s.messages.get(k, 0) + 1
+        if icao24:
+            s.aircraft.setdefault(hour, set()).add(icao24)
+        self._maybe_flush(s)
+
+    def position(self, sensor, rv):
+        '''bin a stored adsb_positions document by range, bearing and altitude'''
+        s = self._sensor(sensor)
+        if s.location is None or 'loc' not in rv:
+            return
+        band = band_of(rv.get('altitude'), rv.get('is_on_ground'))
+        if band is None:
+            return
+        lon, lat = rv['loc']['coordinates']
+        rng, brg = range_bearing(s.location[0], s.location[1], lat, lon)
+        if rng > self.max_range:
+            implausible.inc(s.name)
+            return
+        day = _utc(rv['timestamp']).date()
+        k = (day, band, int(brg // sector_width) * sector_width)
+        s.positions[k] = s.positions.get(k, 0) + 1
+        if rng > s.max_range.get(k, -1):
+            s.max_range[k] = rng
+            s.dirty.add(k)
+
+    def _maybe_flush(self, s):
+        # each sensor by its own clock: one replaying old data from a
+        # forwarder's spool mustn't make the others flush on every message
+        if s.last_flush is None:
+            s.last_flush = s.clock
+        elif abs((s.clock - s.last_flush).total_seconds()) >= self.interval:
+            self._flush_coverage(s)
+            self._flush_rates(s)
+            s.last_flush = s.clock
+
+    def flush(self):
+        '''write out the increments since the last flush'''
+        for s in self.sensors.values():
+            self._flush_coverage(s)
+            self._flush_rates(s)
+
+    def _flush_coverage(self, s):
+        updates = {}
+        for (day, band, sector), n in s.positions.items():
+            u = updates.setdefault(day, {'$inc': {}, '$max': {}})
+            u['$inc']['positions.{}.{}'.format(band, sector)] = n
+        for k in s.dirty:
+            day, band, sector = k
+            u = updates.setdefault(day, {'$inc': {}, '$max': {}})
+            u['$max']['max_range.{}.{}'.format(band, sector)] = round(s.max_range[k], 1)
+        for day, u in updates.items():
+            u['$set'] = {'sensor': s.name, 'day': datetime(day.year, day.month, day.day),
+                         'location': [s.location[1], s.location[0]]}
+            u = dict((op, v) for op, v in u.items() if v)
+            self.dbh['coverage'].update_one({'_id': '{}/{}'.format(s.name, day.isoformat())}, u, upsert=True)
+        s.positions = {}
+        s.dirty = set()
+        # yesterday's maxima are only needed until the day is over
+        if s.clock is not None:
+            today = s.clock.date()
+            s.max_range = dict((k, v) for k, v in s.max_range.items() if (today - k[0]).days <= 1)
+
+    def _flush_rates(self, s):
+        updates = {}
+        for (hour, tt), n in s.messages.items():
+            updates.setdefault(hour, {'$inc': {}})['$inc']['messages.' + (tt or 'unknown')] = n
+        for hour, u in updates.items():
+            u['$set'] = {'sensor': s.name, 'hour': hour}
+            if hour in s.aircraft:
+                u['$max'] = {'aircraft': len(s.aircraft[hour])}
+            self.dbh['coverage_rates'].update_one({'_id': '{}/{}'.format(s.name, hour.strftime('%Y-%m-%dT%H'))}, u, upsert=True)
+        s.messages = {}
+        if s.clock is not None:
+            s.aircraft = dict((h, a) for h, a in s.aircraft.items() if s.clock - h < timedelta(hours=2))
+
+def create_indexes(dbh):
+    dbh['coverage'].create_index([('sensor', 1), ('day', 1)])
+    dbh['coverage_rates'].create_index([('sensor', 1), ('hour', 1)])
+
+def envelope(dbh, sensor, since=None, until=None):
+    '''(location, {band: {sector: nm}}) of the furthest positions over a range of days'''
+    sel = {'sensor': sensor}
+    if since is not None or until is not None:
+        sel['day'] = {}
+        if since is not None:
+            sel['day']['$gte'] = since
+        if until is not None:
+            sel['day']['$lt'] = until
+    location = None
+    rv = {}
+    for doc in dbh['coverage'].find(sel, {'location': True, 'max_range': True}):
+        location = doc.get('location', location)
+        for band, sectors in doc.get('max_range', {}).items():
+            b = rv.setdefault(band, {})
+            for sector, rng in sectors.items():
+                b[int(sector)] = max(rng, b.get(int(sector), 0))
+    return location, rv
+
+def rates(dbh, sensor, since=None, until=None):
+    '''[(hour, {transmission type: n}, aircraft)] for a sensor'''
+    sel = {'sensor': sensor}
+    if since is not None or until is not None:
+        sel['hour'] = {}
+        if since is not None:
+            sel['hour']['$gte'] = since
+        if until is not None:
+            sel['hour']['$lt'] = until
+    return [(d['hour'], d.get('messages', {}), d.get('aircraft', 0))
+            for d in dbh['coverage_rates'].find(sel).sort('hour')]
+
+def http_coverage(dbh, default_sensor=None):
+    '''a metrics route returning a sensor's range envelope per altitude band as GeoJSON'''
+    def route(query):
+        sensor = query['sensor'][0] if 'sensor' in query else default_sensor
+        if sensor is None:
+            raise ValueError('sensor= is required')
+        days = float(query['days'][0]) if 'days' in query else 1
+        since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        location, env = envelope(dbh, sensor, since)
+        features = []
+        if location is None:
+            env = {}
+        for band in sorted(env, key=lambda b: -1 if b == 'ground' else int(b)):
+            ring = []
+            for sector in range(0, 360, sector_width):
+                rng = env[band].get(sector, 0)
+                for brg in (sector, sector + sector_width):
+                    lat, lon = destination(location[1], location[0], rng, brg)
+                    ring.append([round(lon, 5), round(lat, 5)])
+            ring.append(ring[0])
+            features.append({'type': 'Feature',
+                             'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                             'properties': {'sensor': sensor, 'band': band,
+                                            'max_range': max(env[band].values())}})
+        return 'application/json', json.dumps({'type': 'FeatureCollection', 'features': features})
+    return route
@@ -63,6 +63,8 @@ def decode_SQ(x):
     if d.pop('lat_hemi', 'N') == 'S':
         d['lat'] *= -1.0
     d['vdl2freq'] = int(d['vdl2freq'])/1000.0
+    if d['text'] is None: # nothing after the frequency, leave the text be
+        del d['text']
     x.update(d)
     return True
 
@@ -82,7 +84,8 @@ def decode_5Z(x):
 def decode_15(x):
     '''General Aviation Position Report'''
     rgx = r'[(]2(?P<lat>[NS]\d{5})(?P<lon>[EW]\d{6})(OFF(?P<d>\d{2})(?P<m>\d{2})(?P<y>\d{2})(?P<H>\d{2})(?P<M>\d{2}))?(?P<unknown>.*)[(]Z'
-    m = re.search(rgx, x['text'])
+    # without a (Z the .* runs to the end from every (2, quadratic in the length
+    m = re.search(rgx, x['text']) if '(Z' in x['text'] else None
     if m:
         d = m.groupdict()
         d['lat'] = fix_coord(d['lat'], 1e-3)
@@ -90,44 +93,50 @@ def decode_15(x):
         try:
             offtm = "20{}-{}-{} {}:{}:00".format(d.pop('y', None), d.pop('m', None), d.pop('d', None), d.pop('H', None), d.pop('M', None))
             d['offtm'] = arrow.get(offtm).datetime
-        except arrow.parser.ParserError:
+        except (arrow.parser.ParserError, ValueError): # no OFF time, or an impossible one
             pass
         x.update(d)
         return True
     else:
         return False
 
-def decode_16(x):
-    '''Decoder for either "Fedex Position Report-AUTPOS" or "General Aviation Weather Request"'''
+def decode_16_autpos(x):
+    '''Fedex Position Report-AUTPOS'''
+    m = re.search(r'(?P<something>\d+)/AUTPOS/LLD (?P<lat>[NS]\d+) (?P<lon>[WE]\d+)\s+/ALT (?P<altitude>\d+)/SAT (?P<sat>\S+)\s+/WND (?P<wind_dir>\d{3})(?P<wind_spd>\d{3})/TAT (?P<tat>\S+)/TAS (?P<tas>\d+)/CRZ (?P<crz>\d+)\s+/FOB (?P<fuel>\d+)\r\n/DAT (?P<mdate>\d+)/TIM (?P<mtime>\d+)', x['text'])
+    if m is None:
+        return False
+    d = m.groupdict()
+    d['datetime'] = arrow.get("{mdate} {mtime}".format(**d), "YYMMDD HHmmss").datetime
+    d['lat'] = fix_coord(d['lat'])
+    d['lon'] = fix_coord(d['lon'])
+    d['fuel'] = int(d['fuel'])
+    d['sat'] = int(d['sat'])
+    d['tas'] = int(d['tas'])
+    d['crz'] = int(d['crz'])
+    d['wind_spd'] = int(d['wind_spd'])
+    d['wind_dir'] = int(d['wind_dir'])
+    d.pop('mdate', '')
+    d.pop('mtime', '')
+    x.update(d)
+    return True
+
+def decode_16_weather(x):
+    '''General Aviation Weather Request'''
     d = {}
-    m = re.search(r'(?P<something>\d+)/AUTPOS/LLD (?P<lat>[NS]\d+) (?P<lon>[WE]\d+)\s+/ALT (?P<altitude>\d+)/SAT (?P<sat>\S+)\s+/WND (?P<wind_dir>\d{3})(?P<wind_spd>\d{3})/TAT (?P<tat>\S+)/TAS (?P<tas>\d+)/CRZ (?P<crz>\d+)\s+/FOB (?P<fuel>\d+)\r\n/DAT (?P<mdate>\d+)/TIM (?P<mtime>\d+)', x)
-    if m:
-        d.update(m.groupdict())
-        d['datetime'] = arrow.get("{mdate} {mtime}".format(**d), "YYMMDD HHmmss").datetime
-        d['lat'] = fix_coord(d['lat'])
-        d['lon'] = fix_coord(d['lon'])
-        d['fuel'] = int(d['fuel'])
-        d['sat'] = int(d['sat'])
-        d['tas'] = int(d['tas'])
-        d['crz'] = int(d['crz'])
-        d['wind_spd'] = int(d['wind_spd'])
-        d['wind_dir'] = int(d['wind_dir'])
-        d.pop('mdate', '')
-        d.pop('mtime', '')
-        return d
-    m = re.search(r'(?P<x>[NS])\s*(?P<lat>[0-9.]+)[/,](?P<y>[EW])\s*(?P<lon>[0-9.]+)(,(?P<altitude>\d+))?', x)
+    m = re.search(r'(?P<x>[NS])\s*(?P<lat>[0-9.]+)[/,](?P<y>[EW])\s*(?P<lon>[0-9.]+)(,(?P<altitude>\d+))?', x['text'])
     if m:
         d.update(m.groupdict())
-        x = 1.0 if d['x'] == 'N' else -1.0
-        y = 1.0 if d['y'] == 'E' else -1.0
-        d['lat'] = x * float(d['lat'])
-        d['lon'] = y * float(d['lon'])
+        ns = 1.0 if d['x'] == 'N' else -1.0
+        ew = 1.0 if d['y'] == 'E' else -1.0
+        d['lat'] = ns * float(d['lat'])
+        d['lon'] = ew * float(d['lon'])
         if d['altitude'] is None:
             d.pop('altitude', '')
         d.pop('x', '')
         d.pop('y', '')
-        return d
-    m = re.search(r'(?P<lat>[NS]\d+)(?P<lon>[EW]\d+)(?P<dep>[A-Z]{4})?(?P<arr>[A-Z]{4})?', x)
+        x.update(d)
+        return True
+    m = re.search(r'(?P<lat>[NS]\d+)(?P<lon>[EW]\d+)(?P<dep>[A-Z]{4})?(?P<arr>[A-Z]{4})?', x['text'])
     if m:
         d.update(m.groupdict())
         d['lat'] = fix_coord(d['lat'], 1e-3)
@@ -136,6 +145,27 @@ def decode_16(x):
             d.pop('arr', '')
         if d['dep'] is None:
             d.pop('dep', '')
-        return d
-    return d
+        x.update(d)
+        return True
+    return False
+
+def decode_16(x):
+    '''Decoder for either "Fedex Position Report-AUTPOS" or "General Aviation Weather Request"'''
+    return decode_16_autpos(x) or decode_16_weather(x)
+
+# Decoder dispatch used by skyshark_acars_loader.process_acars(). Where the
+# meaning of a label depends on the airline (see expn.label_airlines) the
+# (label, airline ICAO prefix) entry in airline_decoders takes precedence.
+label_decoders = {
+    ':;': decode_colonsemi,
+    'SA': decode_SA,
+    'SQ': decode_SQ,
+    '5Z': decode_5Z,
+    '15': decode_15,
+    '16': decode_16,
+}
 
+airline_decoders = {
+    ('16', 'FDX'): decode_16_autpos,
+    ('16', ''): decode_16_weather,
+}
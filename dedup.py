@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Cross-receiver duplicate detection for ACARS. With several receivers in
+# range of an aircraft the same message arrives once per receiver, differing
+# only in station_id, level, channel and error count. The first copy is
+# stored with a list of the receivers that heard it, and later copies within
+# the window are merged into that list instead of becoming new documents.
+
+import hashlib
+from collections import OrderedDict
+
+receiver_fields = ['station_id', 'level', 'channel', 'rxfreq', 'error', 'timestamp']
+
+def receiver(msg):
+    '''what one receiver contributes to a message'''
+    return dict((k, msg[k]) for k in receiver_fields if k in msg)
+
+def message_key(msg):
+    '''hash of the fields that are the same however the message was received
+
+    Works on the message as received, before process_acars() tidies and
+    decodes it.
+    '''
+    parts = [(msg.get(k) or '').replace('.', '').strip().upper() for k in ['tail', 'flight', 'label', 'msgno']]
+    parts.append(' '.join((msg.get('text') or '').split()))
+    return hashlib.sha1(u'\x00'.join(u'{}'.format(p) for p in parts).encode('utf-8')).digest()
+
+class Deduplicator(object):
+    def __init__(self, window=5.0, max_entries=100000):
+        self.window = window
+        self.max_entries = max_entries
+        # key -> (timestamp of first copy, what identifies the stored copy)
+        self.seen = OrderedDict()
+        self.newest = None
+
+    def __len__(self):
+        return len(self.seen)
+
+    def _expire(self):
+        while self.seen:
+            key, (ts, _) = next(iter(self.seen.items()))
+            if len(self.seen) <= self.max_entries and ts >= self.newest - self.window:
+                break
+            del self.seen[key]
+
+    def check(self, key, ts, selector):
+        '''the selector of an earlier copy of a message, or None if it's new
+
+        New messages are remembered under `selector`, which identifies the
+        document they are stored as.
+        '''
+        first = self.seen.get(key)
+        if first is not None and abs(ts - first[0]) <= self.window:
+            return first[1]
+        if first is not None:
+            del self.seen[key]
+        self.seen[key] = (ts, selector)
+        self.newest = ts if self.newest is None else max(self.newest, ts)
+        self._expire()
+        return None
+
+    def remember(self, key, selector):
+        '''identify the stored copy of a message by selector from now on, eg. by its _id once it's stored'''
+        if key in self.seen:
+            self.seen[key] = (self.seen[key][0], selector)
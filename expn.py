@@ -223,6 +223,24 @@ arinc620 = {
  }
 
 
+# Labels from arinc620 with more than one meaning, narrowed down by the
+# ICAO prefix of the operating airline. The '' entry applies when the
+# flight ID does not resolve to any airline, ie. general aviation.
+label_airlines = {
+    '10': {'BAW': ['British Airways ARR (ETA) Report', 'British Airways FST Report'],
+           'AAL': 'American Airlines/Eagle Frequency Change',
+           'EGF': 'American Airlines/Eagle Frequency Change',
+           'ENY': 'American Airlines/Eagle Frequency Change',
+           'FDX': 'Fedex ATIS Request Message'},
+    '11': {'FDX': 'Fedex In Range Arrival Report'},
+    '16': {'FDX': 'Fedex Position Report-AUTPOS',
+           '': 'General Aviation Weather Request'},
+    '4M': {'ACA': 'Air Canada Uplink to Cockpit Printer-specific message'},
+    '80': {'DAL': 'Delta/Canadian specific 3C03 position report format'},
+    '84': {'SAS': 'S.A.S. Free Text Message'},
+}
+
+
 # Label '5Z' is airline-defined. United Airlines seems to put a
 # code at the beginning of the text
 united_5z = {
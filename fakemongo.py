@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Just enough of the pymongo database/collection interface for the
+# loaders to run without a mongod, eg. for benchmarking. Documents are
+# kept in a dict keyed by the selector they were written with, so an
+# upsert costs about as much as a dict lookup; find() is a linear scan.
+
+import copy
+import itertools
+
+class FakeResult(object):
+    def __init__(self, **kwargs):
+        self.upserted_id = None
+        self.inserted_id = None
+        self.matched_count = 0
+        self.modified_count = 0
+        self.__dict__.update(kwargs)
+
+class FakeCursor(object):
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def count(self):
+        return len(self.docs)
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda d: d.get(key), reverse=(direction < 0))
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+def _matches(doc, selector):
+    for k, v in selector.items():
+        if get_path(doc, k) != v:
+            return False
+    return True
+
+def get_path(doc, path):
+    '''like mongo, numeric path components index into lists'''
+    for p in path.split('.'):
+        if isinstance(doc, dict):
+            doc = doc.get(p)
+        elif isinstance(doc, list) and p.isdigit() and int(p) < len(doc):
+            doc = doc[int(p)]
+        else:
+            return None
+    return doc
+
+def set_path(doc, path, value):
+    parts = path.split('.')
+    for p in parts[:-1]:
+        doc = doc.setdefault(p, {})
+    doc[parts[-1]] = value
+
+def project(doc, projection):
+    '''the fields of doc selected by a find() projection, as a new dict'''
+    if not projection:
+        return doc
+    if not any(projection.values()):
+        return dict((k, v) for k, v in doc.items() if k not in projection)
+    rv = {}
+    if projection.get('_id', True) and '_id' in doc:
+        rv['_id'] = doc['_id']
+    for k, want in projection.items():
+        if not want or k == '_id':
+            continue
+        v = get_path(doc, k)
+        if v is not None:
+            set_path(rv, k, v)
+    return rv
+
+def apply_update(doc, update, inserting=False, clone=copy.deepcopy):
+    '''apply a mongo update document (or replacement) to doc in place'''
+    if not any(k.startswith('$') for k in update):
+        _id = doc.get('_id')
+        doc.clear()
+        doc.update(clone(update))
+        if _id is not None:
+            doc['_id'] = _id
+        return
+
+    for op, fields in update.items():
+        for k, v in fields.items():
+            cur = get_path(doc, k)
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                set_path(doc, k, clone(v))
+            elif op == '$inc':
+                set_path(doc, k, (cur or 0) + v)
+            elif op == '$max':
+                set_path(doc, k, v if cur is None or v > cur else cur)
+            elif op == '$min':
+                set_path(doc, k, v if cur is None or v < cur else cur)
+            elif op in ('$push', '$addToSet'):
+                vals = v['$each'] if isinstance(v, dict) and '$each' in v else [v]
+                lst = cur if isinstance(cur, list) else []
+                for x in vals:
+                    if op == '$push' or x not in lst:
+                        lst.append(clone(x))
+                set_path(doc, k, lst)
+            elif op == '$unset':
+                parts = k.split('.')
+                parent = get_path(doc, '.'.join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+
+class FakeCollection(object):
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self.indexes = []
+        self._ids = itertools.count(1)
+
+    def _key(self, selector):
+        return tuple(sorted((k, repr(v)) for k, v in selector.items()))
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+        return kwargs.get('name', repr(keys))
+
+    def insert_one(self, doc):
+        if '_id' not in doc:
+            doc['_id'] = next(self._ids)
+        self.docs[self._key({'_id': doc['_id']})] = copy.deepcopy(doc)
+        return FakeResult(inserted_id=doc['_id'])
+
+    def insert(self, doc):
+        return self.insert_one(doc).inserted_id
+
+    def insert_many(self, docs, ordered=True):
+        ids = [self.insert_one(d).inserted_id for d in docs]
+        return FakeResult(inserted_ids=ids)
+
+    def update_one(self, selector, update, upsert=False):
+        key = self._key(selector)
+        doc = self.docs.get(key)
+        if doc is not None:
+            apply_update(doc, update)
+            return FakeResult(matched_count=1, modified_count=1)
+        if not upsert:
+            return FakeResult()
+        doc = copy.deepcopy(selector)
+        apply_update(doc, update, inserting=True)
+        doc.setdefault('_id', next(self._ids))
+        self.docs[key] = doc
+        return FakeResult(upserted_id=doc['_id'])
+
+    def update(self, selector, update, upsert=False):
+        return self.update_one(selector, update, upsert)
+
+    def bulk_write(self, requests, ordered=True):
+        '''pymongo InsertOne, UpdateOne and ReplaceOne requests'''
+        upserted = {}
+        for i, req in enumerate(requests):
+            if not hasattr(req, '_filter'):
+                self.insert_one(req._doc)
+                continue
+            r = self.update_one(req._filter, req._doc, req._upsert)
+            if r.upserted_id is not None:
+                upserted[i] = r.upserted_id
+        return FakeResult(upserted_ids=upserted)
+
+    def find(self, selector=None, projection=None):
+        selector = selector or {}
+        return FakeCursor([project(d, projection) for d in self.docs.values() if _matches(d, selector)])
+
+    def find_one(self, selector=None, projection=None):
+        for d in self.find(selector, projection):
+            return d
+        return None
+
+    def count(self, selector=None):
+        if not selector:
+            return len(self.docs)
+        return self.find(selector).count()
+
+    def delete_many(self, selector):
+        doomed = [k for k, d in self.docs.items() if _matches(d, selector)]
+        for k in doomed:
+            del self.docs[k]
+        return FakeResult(deleted_count=len(doomed))
+
+    def drop(self):
+        self.docs.clear()
+
+class NullCollection(FakeCollection):
+    '''accepts and discards all writes'''
+    def insert_one(self, doc):
+        return FakeResult()
+
+    def update_one(self, selector, update, upsert=False):
+        return FakeResult()
+
+class FakeDatabase(object):
+    collection_class = FakeCollection
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = self.collection_class(name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def collection_names(self):
+        return list(self._collections.keys())
+
+    def drop_collection(self, name):
+        self._collections.pop(name, None)
+
+    def command(self, cmd, *args, **kwargs):
+        return {'ok': 1.0, 'collections': len(self._collections)}
+
+class NullDatabase(FakeDatabase):
+    collection_class = NullCollection
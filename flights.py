@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Incremental flight segmentation. As the ADS-B loader stores positions,
+# each aircraft's track is cut into flights and summarized into one
+# document per flight in the `flights` collection:
+#
+#   {_id, icao24, callsign, registration, first_seen, last_seen,
+#    min_altitude, max_altitude, bbox: [W, S, E, N], points,
+#    origin, destination, closed}
+#
+# A flight ends when the aircraft is not heard from for `gap` seconds, when
+# it takes off again after having landed, or when its callsign changes.
+# Origin and destination are the nearest airport to the first and last
+# position, if the aircraft was low enough there to be arriving or
+# departing. Airports are read from airport_info once, into a grid kept in
+# memory, which also works on backends without geospatial queries. The
+# loader gives registrations from a table read once too, see
+# livestate.faa_registrations(), so starting and ending flights costs no
+# database queries on the ingest thread. Open flights are written every
+# `flush_every` points, so they can be queried before they end. The
+# simplified track of each flight is kept in `tracks` by simplify.py.
+
+import logging
+from math import cos, radians, ceil
+
+from stream import msg_position
+from simplify import TrackSimplifier, store_track
+from coverage import range_bearing
+from storage import PyMongoError
+
+airport_types = ['large_airport', 'medium_airport', 'small_airport']
+meters_per_nm = 1852.0
+
+class AirportIndex(object):
+    '''airports of airport_info in a grid of `cell` degree squares, for nearest airport lookups'''
+    def __init__(self, dbh, cell=0.25):
+        self.cell = cell
+        self.grid = {} # (lat cell, lon cell) -> [(lat, lon, ident)]
+        try:
+            for apt in dbh['airport_info'].find({}, {'_id': True, 'type': True, 'lat': True, 'lon': True}):
+                if apt.get('type') not in airport_types:
+                    continue
+                try:
+                    lat, lon = float(apt['lat']), float(apt['lon'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.grid.setdefault(self._cell(lat, lon), []).append((lat, lon, apt['_id']))
+        except PyMongoError as e:
+            logging.warning("no airports for flight origins and destinations: %s", e)
+        logging.info("indexed %d airports", sum(len(v) for v in self.grid.values()))
+
+    def _cell(self, lat, lon):
+        return int(lat // self.cell), int(lon // self.cell)
+
+    def nearest(self, lon, lat, max_distance=10000):
+        '''ident of the closest airport within max_distance meters, or None'''
+        max_nm = max_distance / meters_per_nm
+        dlat = int(ceil(max_distance / 111320.0 / self.cell))
+        dlon = int(ceil(max_distance / (111320.0 * max(cos(radians(lat)), 0.01)) / self.cell))
+        clat, clon = self._cell(lat, lon)
+        n = int(round(360 / self.cell))
+        best = None
+        for i in range(clat - dlat, clat + dlat + 1):
+            for j in range(clon - dlon, clon + dlon + 1):
+                # wrap around the antimeridian
+                j = (j + n // 2) % n - n // 2
+                for alat, alon, ident in self.grid.get((i, j), ()):
+                    d = range_bearing(lat, lon, alat, alon)[0]
+                    if d <= max_nm and (best is None or d < best[0]):
+                        best = (d, ident)
+        return best[1] if best is not None else None
+
+def create_indexes(dbh):
+    for k in ['icao24', 'callsign', 'registration', 'first_seen', 'last_seen', 'origin', 'destination']:
+        dbh['flights'].create_index(k)
+    dbh['flights'].create_index([('registration', 1), ('first_seen', -1)])
+    dbh['flights'].create_index([('icao24', 1), ('first_seen', -1)])
+
+class FlightBuilder(object):
+    def __init__(self, dbh, gap=1800, registration=None, low_altitude=5000, flush_every=100, airports=None):
+        self.dbh = dbh
+        self.airports = airports if airports is not None else AirportIndex(dbh)
+        self.gap = gap
+        self.registration = registration
+        self.low_altitude = low_altitude
+        self.flush_every = flush_every
+        self.open = {}
+        self.newest = None
+        self.since_sweep = 0
+
+    def _low(self, rv):
+        return rv.get('is_on_ground') or rv.get('altitude', self.low_altitude) < self.low_altitude
+
+    def _start(self, icao24, rv):
+        ts = rv['timestamp']
+        f = {'_id': '{}-{}'.format(icao24, ts.strftime('%Y%m%d%H%M%S')),
+             'icao24': icao24,
+             'callsign': (rv.get('callsign') or '').strip() or None,
+             'first_seen': ts,
+             'last_seen': ts,
+             'points': 0,
+             'closed': False,
+             'airborne': False,
+             'landed': False,
+             'track': TrackSimplifier()}
+        if self.registration is not None:
+            try:
+                f['registration'] = self.registration(icao24)
+            except Exception as e:
+                logging.debug("registration lookup for %s: %s", icao24, e)
+        pos = msg_position(rv)
+        if pos is not None and self._low(rv):
+            f['origin'] = self.airports.nearest(*pos)
+        self.open[icao24] = f
+        return f
+
+    def write(self, f):
+        doc = dict((k, v) for k, v in f.items() if k not in ['_id', 'airborne', 'landed', 'last_rv', 'unwritten', 'track'])
+        self.dbh['flights'].update_one({'_id': f['_id']}, {'$set': doc}, upsert=True)
+        store_track(self.dbh, f['_id'], f['track'])
+        f['unwritten'] = 0
+
+    def close(self, icao24):
+        f = self.open.pop(icao24, None)
+        if f is None:
+            return None
+        last = f.pop('last_rv', None)
+        if last is not None:
+            pos = msg_position(last)
+            if pos is not None and self._low(last):
+                f['destination'] = self.airports.nearest(*pos)
+        f['closed'] = True
+        f['track'].finish()
+        self.write(f)
+        return f
+
+    def add_ident(self, icao24, callsign):
+        '''a callsign change ends the flight'''
+        f = self.open.get(icao24)
+        if f is None:
+            return
+        if f['callsign'] is None:
+            f['callsign'] = callsign
+        elif f['callsign'] != callsign:
+            self.close(icao24)
+
+    def add_position(self, rv):
+        '''extend the aircraft's current flight with a position_record()'''
+        icao24 = rv['icao24'].strip().upper()
+        ts = rv['timestamp']
+        callsign = (rv.get('callsign') or '').strip() or None
+        f = self.open.get(icao24)
+        if f is not None:
+            if (ts - f['last_seen']).total_seconds() > self.gap:
+                self.close(icao24)
+                f = None
+            elif callsign and f['callsign'] and callsign != f['callsign']:
+                self.close(icao24)
+                f = None
+            elif f['landed'] and rv.get('is_on_ground') is False:
+                self.close(icao24) # took off again
+                f = None
+        if f is None:
+            f = self._start(icao24, rv)
+
+        if callsign and not f['callsign']:
+            f['callsign'] = callsign
+        f['last_seen'] = max(f['last_seen'], ts)
+        f['points'] += 1
+        if 'altitude' in rv:
+            f['min_altitude'] = min(f.get('min_altitude', rv['altitude']), rv['altitude'])
+            f['max_altitude'] = max(f.get('max_altitude', rv['altitude']), rv['altitude'])
+        pos = msg_position(rv)
+        if pos is not None:
+            lon, lat = pos
+            if 'bbox' not in f:
+                f['bbox'] = [lon, lat, lon, lat]
+            else:
+                b = f['bbox']
+                f['bbox'] = [min(b[0], lon), min(b[1], lat), max(b[2], lon), max(b[3], lat)]
+            f['last_rv'] = rv
+            f['track'].add(lon, lat, rv.get('altitude'), ts)
+        if rv.get('is_on_ground'):
+            f['landed'] = f['airborne']
+        else:
+            f['airborne'] = True
+
+        f['unwritten'] = f.get('unwritten', 0) + 1
+        if f['points'] == 1 or f['unwritten'] >= self.flush_every:
+            self.write(f)
+
+        self.newest = ts if self.newest is None else max(self.newest, ts)
+        self.since_sweep += 1
+        if self.since_sweep >= 1000:
+            self.sweep()
+        return f
+
+    def sweep(self):
+        '''close flights not heard from in `gap` seconds'''
+        self.since_sweep = 0
+        if self.newest is None:
+            return 0
+        idle = [k for k, f in self.open.items() if (self.newest - f['last_seen']).total_seconds() > self.gap]
+        for k in idle:
+            self.close(k)
+        return len(idle)
+
+    def flush(self):
+        '''write every open flight, eg. at shutdown'''
+        for f in self.open.values():
+            if f.get('unwritten'):
+                self.write(f)
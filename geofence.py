@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Streaming geofences. Fences are polygons with an optional altitude band,
+# loaded from a GeoJSON FeatureCollection:
+#
+#   {"type": "Feature", "geometry": {"type": "Polygon", ...},
+#    "properties": {"name": "KBOS 04R final", "min_altitude": 0, "max_altitude": 3000}}
+#
+# Every position is checked against the fences near it, and an event is
+# emitted when an aircraft enters or leaves one; positions that don't
+# change which fences an aircraft is in cost nothing beyond the check.
+# Fences are indexed in a grid of `cell` degree squares, so a position is
+# only tested against the few fences whose bounding box shares its cell.
+
+import json
+import logging
+from math import floor
+
+import metrics
+
+events_total = metrics.counter('skyshark_geofence_events_total', 'aircraft entering or leaving geofences', ['event'])
+checks = metrics.histogram('skyshark_geofence_candidates', 'fences tested per position', buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+
+def point_in_ring(x, y, ring):
+    '''even-odd rule; ring is a list of (x, y)'''
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+class Fence(object):
+    def __init__(self, name, polygons, min_altitude=None, max_altitude=None):
+        self.name = name
+        # [(exterior ring, [holes])]
+        self.polygons = [([tuple(p[:2]) for p in poly[0]], [[tuple(p[:2]) for p in h] for h in poly[1:]])
+                         for poly in polygons]
+        self.min_altitude = min_altitude
+        self.max_altitude = max_altitude
+        xs = [p[0] for ring, _ in self.polygons for p in ring]
+        ys = [p[1] for ring, _ in self.polygons for p in ring]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, lon, lat, altitude=None):
+        west, south, east, north = self.bbox
+        if not (west <= lon <= east and south <= lat <= north):
+            return False
+        if self.min_altitude is not None or self.max_altitude is not None:
+            if altitude is None:
+                return False
+            if self.min_altitude is not None and altitude < self.min_altitude:
+                return False
+            if self.max_altitude is not None and altitude > self.max_altitude:
+                return False
+        for ring, holes in self.polygons:
+            if point_in_ring(lon, lat, ring) and not any(point_in_ring(lon, lat, h) for h in holes):
+                return True
+        return False
+
+def load_fences(fn):
+    with open(fn) as fd:
+        doc = json.load(fd)
+    features = doc['features'] if doc.get('type') == 'FeatureCollection' else [doc]
+    fences = []
+    for i, feat in enumerate(features):
+        geom = feat['geometry']
+        props = feat.get('properties') or {}
+        if geom['type'] == 'Polygon':
+            polygons = [geom['coordinates']]
+        elif geom['type'] == 'MultiPolygon':
+            polygons = geom['coordinates']
+        else:
+            logging.warning("%s: skipping %s geofence %d", fn, geom['type'], i)
+            continue
+        fences.append(Fence(props.get('name', 'fence{}'.format(i)), polygons,
+                            props.get('min_altitude'), props.get('max_altitude')))
+    logging.info("loaded %d geofences from %s", len(fences), fn)
+    return fences
+
+class GeofenceEngine(object):
+    def __init__(self, fences, cell=0.1, expire=600, sinks=()):
+        self.cell = cell
+        self.expire_after = expire
+        self.sinks = list(sinks)
+        self.grid = {}
+        for fence in fences:
+            west, south, east, north = fence.bbox
+            for i in range(int(floor(west / cell)), int(floor(east / cell)) + 1):
+                for j in range(int(floor(south / cell)), int(floor(north / cell)) + 1):
+                    self.grid.setdefault((i, j), []).append(fence)
+        self.fences = fences
+        # aircraft -> (names of fences it's in, last time seen), only while in any
+        self.inside = {}
+        self.updates = 0
+
+    def fences_at(self, lon, lat, altitude=None):
+        candidates = self.grid.get((int(floor(lon / self.cell)), int(floor(lat / self.cell))), ())
+        checks.observe(len(candidates))
+        return set(f.name for f in candidates if f.contains(lon, lat, altitude))
+
+    def update(self, key, lon, lat, altitude=None, timestamp=None, **info):
+        '''note a position of aircraft `key`, returning enter and exit events'''
+        now = set()
+        if self.grid:
+            now = self.fences_at(lon, lat, altitude)
+        before = self.inside.get(key, (frozenset(), None))[0]
+        events = []
+        if now != before:
+            base = dict(info, aircraft=key, lon=lon, lat=lat, altitude=altitude, timestamp=timestamp)
+            for name in sorted(now - before):
+                events.append(dict(base, event='enter', fence=name))
+            for name in sorted(before - now):
+                events.append(dict(base, event='exit', fence=name))
+        if now:
+            self.inside[key] = (frozenset(now), timestamp)
+        else:
+            self.inside.pop(key, None)
+        self._emit(events)
+
+        self.updates += 1
+        if timestamp is not None and self.updates % 1000 == 0:
+            self.expire(timestamp)
+        return events
+
+    def expire(self, newest):
+        '''aircraft not heard from in a while are taken to have left their fences'''
+        events = []
+        for key, (names, seen) in list(self.inside.items()):
+            if seen is not None and (newest - seen).total_seconds() > self.expire_after:
+                del self.inside[key]
+                for name in sorted(names):
+                    events.append({'event': 'exit', 'fence': name, 'aircraft': key, 'timestamp': seen, 'lost': True})
+        self._emit(events)
+        return events
+
+    def _emit(self, events):
+        for e in events:
+            events_total.inc(e['event'])
+            logging.info("%s %s %s", e['aircraft'], e['event'], e['fence'])
+            for sink in self.sinks:
+                sink(e)
+
+def mongo_sink(dbh, coll='geofence_events'):
+    def sink(event):
+        dbh[coll].insert_one(dict(event))
+    return sink
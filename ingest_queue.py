@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Bounded queue between the network readers and the database writers of
+# the loaders, so a slow database causes a controlled loss of the least
+# valuable messages rather than a silently overflowing socket buffer or a
+# stalled TCP reader.
+#
+# Policies when the queue is full:
+#  - 'block': the producer waits for space (nothing is lost, input stalls)
+#  - 'drop-oldest': the oldest queued message is discarded
+#  - 'shed': the oldest message of the lowest priority class is
+#    discarded, or the new message if nothing queued is less valuable.
+#    The priority of a message comes from the priority function given to
+#    the queue; higher is more valuable.
+
+import logging
+import threading
+from collections import deque
+
+import metrics
+from replay import monotonic
+
+policies = ['block', 'drop-oldest', 'shed']
+
+depth = metrics.gauge('skyshark_queue_depth', 'messages waiting in the ingest queue', ['queue'])
+dropped = metrics.counter('skyshark_queue_dropped_total', 'messages discarded by the ingest queue', ['queue', 'priority'])
+batches = metrics.histogram('skyshark_queue_batch_size', 'messages taken from the ingest queue at once', ['queue'],
+                            buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+class IngestQueue(object):
+    def __init__(self, capacity, policy='block', priority=None, name='ingest', levels=4):
+        if policy not in policies:
+            raise ValueError('unknown queue policy {}'.format(policy))
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.priority = priority if priority is not None else (lambda item: 0)
+        self.name = name
+        # one FIFO per priority class, and one above them all for forced
+        # items; seq numbers restore arrival order
+        self.levels = [deque() for _ in range(levels + 1)]
+        self.size = 0
+        self.seq = 0
+        self.cond = threading.Condition(threading.Lock())
+        self.ndropped = 0
+        self.warned = None
+
+    def __len__(self):
+        return self.size
+
+    def _drop(self, level):
+        dropped.inc(self.name, str(level))
+        self.ndropped += 1
+        now = monotonic()
+        if self.warned is None or now - self.warned > 10:
+            self.warned = now
+            logging.warning("%s queue full (%s): %d messages dropped so far", self.name, self.policy, self.ndropped)
+
+    def put(self, item, force=False):
+        '''queue an item, returning False if it was discarded
+
+        Forced items (eg. control markers) never wait and are never dropped.
+        '''
+        level = 0 if self.policy != 'shed' else max(0, min(self.priority(item), len(self.levels) - 2))
+        if force:
+            level = len(self.levels) - 1
+        with self.cond:
+            while self.size >= self.capacity and not force:
+                if self.policy == 'block':
+                    self.cond.wait(1.0)
+                    continue
+                # the victim is the oldest item of the lowest class up to
+                # this one's; with drop-oldest, everything is class 0.
+                # Forced items are in a class of their own and never go
+                victim = None
+                for i in range(level + 1):
+                    if self.levels[i]:
+                        victim = i
+                        break
+                if victim is None:
+                    self._drop(level)
+                    return False
+                self.levels[victim].popleft()
+                self.size -= 1
+                self._drop(victim)
+                break
+            self.levels[level].append((self.seq, item))
+            self.seq += 1
+            self.size += 1
+            depth.set(self.size, self.name)
+            self.cond.notify_all()
+        return True
+
+    def _pop(self):
+        best = None
+        for q in self.levels:
+            if q and (best is None or q[0][0] < best[0][0]):
+                best = q
+        self.size -= 1
+        return best.popleft()[1]
+
+    def get_batch(self, max_items=100, timeout=1.0):
+        '''take up to max_items in arrival order, waiting up to timeout for the first one'''
+        deadline = monotonic() + timeout
+        with self.cond:
+            while self.size == 0:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return []
+                self.cond.wait(remaining)
+            rv = [self._pop() for _ in range(min(max_items, self.size))]
+            depth.set(self.size, self.name)
+            self.cond.notify_all()
+        batches.observe(len(rv), self.name)
+        return rv
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Reading recorded captures, compressed or not, for the loaders and the
+# replay tools. open_input() returns a file object whose data is read and
+# decompressed by a background thread, up to `readahead` chunks ahead of
+# the caller, so parsing on the main thread only waits when it has caught
+# up with the decompressor. The format is picked by the file's extension:
+#
+#   .gz     gzip, multi-member files included
+#   .bz2    bzip2. Files made by pbzip2 and lbzip2 are many independent
+#           streams, which are split apart at their headers and
+#           decompressed by a pool of `workers` threads; the C decompressor
+#           releases the GIL, so they really do run side by side. Streams of
+#           a plain bzip2 file are decompressed as they're read
+#   .xz     with the lzma module (backports.lzma on Python 2) if there is
+#           one, otherwise by an xz process
+#   .zst    with the zstandard module if there is one, otherwise by a zstd
+#           process
+#
+# Anything else is read as it is. Lines are returned as they are in the
+# file, \r\n included.
+
+import os
+import re
+import bz2
+import gzip
+import Queue
+import logging
+import threading
+import subprocess
+from cStringIO import StringIO
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from distutils.spawn import find_executable
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+chunk_size = 1 << 20
+# a bzip2 stream header: BZh, the block size, and the first block's magic
+bz2_stream_re = re.compile(r'BZh[1-9]1AY&SY')
+# streams bigger than this are decompressed as they're read rather than
+# held whole for a worker, which is every stream of a plain bzip2 file
+max_stream = 8 << 20
+compressed_exts = ['.gz', '.bz2', '.xz', '.zst', '.zstd']
+
+def base_name(fn):
+    '''fn without its compression extension, eg. to check what's inside'''
+    root, ext = os.path.splitext(fn)
+    return root if ext.lower() in compressed_exts else fn
+
+def is_compressed(fn):
+    return base_name(fn) != fn
+
+class _Ready(object):
+    '''a chunk already at hand, looking like a worker's AsyncResult'''
+    def __init__(self, data):
+        self.data = data
+
+    def ready(self):
+        return True
+
+    def wait(self, timeout=None):
+        pass
+
+    def get(self):
+        return self.data
+
+class _Failed(_Ready):
+    def get(self):
+        raise self.data
+
+def _read_chunks(fd):
+    try:
+        while True:
+            data = fd.read(chunk_size)
+            if not data:
+                return
+            yield _Ready(data)
+    finally:
+        fd.close()
+
+def _bz2_ended(d):
+    '''whether a BZ2Decompressor has seen the end of its stream'''
+    if getattr(d, 'eof', False) or d.unused_data:
+        return True
+    try:
+        d.decompress('')
+    except EOFError:
+        return True
+    return False
+
+def bunzip(data):
+    '''the contents of one or more whole bzip2 streams'''
+    out = []
+    while data.startswith('BZh'):
+        d = bz2.BZ2Decompressor()
+        out.append(d.decompress(data))
+        if not _bz2_ended(d):
+            raise EOFError('compressed file ended before the end-of-stream marker was reached')
+        data = d.unused_data
+    return ''.join(out)
+
+def _bz2_chunks(fd, pool):
+    buf = fd.read(chunk_size)
+    if buf and not buf.startswith('BZh'):
+        raise IOError('{}: not a bzip2 file'.format(fd.name))
+    eof = not buf
+    scanned = 1
+    while buf or not eof:
+        # the next stream starts at the next header after the one at buf[0]
+        m = bz2_stream_re.search(buf, scanned)
+        if m:
+            yield pool.apply_async(bunzip, (buf[:m.start()],))
+            buf = buf[m.start():]
+            scanned = 1
+        elif eof:
+            yield pool.apply_async(bunzip, (buf,))
+            buf = ''
+        elif len(buf) > max_stream:
+            # a big stream, decompress it here as it's read
+            d = bz2.BZ2Decompressor()
+            data = buf
+            while data:
+                yield _Ready(d.decompress(data))
+                if _bz2_ended(d):
+                    break
+                data = fd.read(chunk_size)
+            else:
+                raise EOFError('compressed file ended before the end-of-stream marker was reached')
+            buf = d.unused_data
+            scanned = 1
+        else:
+            scanned = max(1, len(buf) - 9)
+            data = fd.read(chunk_size)
+            eof = not data
+            buf += data
+    fd.close()
+
+def _process_chunks(cmd, fn):
+    '''the output of a decompressing command, which runs alongside the caller'''
+    with open(fn, 'rb') as fd:
+        p = subprocess.Popen(cmd, stdin=fd, stdout=subprocess.PIPE)
+    try:
+        for item in _read_chunks(p.stdout):
+            yield item
+    finally:
+        p.stdout.close()
+        if p.wait():
+            raise IOError('{} failed with status {}'.format(' '.join(cmd), p.returncode))
+
+def _zstd_reader(fd):
+    d = zstandard.ZstdDecompressor()
+    try:
+        return d.stream_reader(fd, read_across_frames=True)
+    except TypeError: # versions before 0.15 read every frame anyway
+        return d.stream_reader(fd)
+
+def _chunks(fn, pool):
+    '''_Ready or worker results of the decompressed contents of fn, in order'''
+    ext = os.path.splitext(fn)[1].lower()
+    if ext == '.gz':
+        return _read_chunks(gzip.open(fn, 'rb'))
+    if ext == '.bz2':
+        return _bz2_chunks(open(fn, 'rb'), pool)
+    if ext == '.xz':
+        if lzma is not None:
+            return _read_chunks(lzma.LZMAFile(fn))
+        return _process_chunks(['xz', '-dc'], fn)
+    if ext in ['.zst', '.zstd']:
+        if zstandard is not None:
+            return _read_chunks(_zstd_reader(open(fn, 'rb')))
+        return _process_chunks(['zstd', '-dc'], fn)
+    return _read_chunks(open(fn, 'rb'))
+
+class Readahead(object):
+    '''a read-only file object over the chunks of data made by a background thread'''
+    def __init__(self, name, chunks, readahead=8, pool=None):
+        self.name = name
+        self.pool = pool
+        self.queue = Queue.Queue(readahead)
+        self.closing = threading.Event()
+        self.done = False
+        self.buf = StringIO('')
+        t = threading.Thread(target=self._produce, args=(chunks,), name='readahead {}'.format(os.path.basename(name)))
+        t.daemon = True
+        t.start()
+
+    def _put(self, item):
+        while not self.closing.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def _produce(self, chunks):
+        try:
+            for item in chunks:
+                if not self._put(item):
+                    break
+        except Exception as e:
+            logging.debug("%s: %s", self.name, e)
+            self._put(_Failed(e))
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+            self._put(None)
+
+    def _next(self):
+        '''the next chunk, or an empty string at the end'''
+        while not self.done:
+            # timed waits, so that ^C gets through
+            try:
+                item = self.queue.get(timeout=1.0)
+            except Queue.Empty:
+                continue
+            if item is None:
+                self.done = True
+                break
+            while not item.ready():
+                item.wait(1.0)
+            data = item.get()
+            if data:
+                return data
+        return ''
+
+    def read(self, n=-1):
+        parts = []
+        while True:
+            data = self.buf.read() if n < 0 else self.buf.read(n)
+            if data:
+                parts.append(data)
+                n -= len(data)
+            if n == 0:
+                break
+            chunk = self._next()
+            if not chunk:
+                break
+            self.buf = StringIO(chunk)
+        return ''.join(parts)
+
+    def readline(self):
+        line = self.buf.readline()
+        while not line.endswith('\n'):
+            chunk = self._next()
+            if not chunk:
+                break
+            self.buf = StringIO(line + chunk)
+            line = self.buf.readline()
+        return line
+
+    def readlines(self):
+        return list(self)
+
+    def __iter__(self):
+        while True:
+            for line in self.buf:
+                if not line.endswith('\n'):
+                    # the rest of it is in the next chunk, see readline()
+                    self.buf = StringIO(line)
+                    break
+                yield line
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        self.closing.set()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.done = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_input(fn, readahead=8, workers=None):
+    '''open a capture for reading, decompressing it in the background'''
+    ext = os.path.splitext(fn)[1].lower()
+    if ext in ['.xz', '.zst', '.zstd'] and (lzma if ext == '.xz' else zstandard) is None:
+        tool = 'xz' if ext == '.xz' else 'zstd'
+        if find_executable(tool) is None:
+            raise IOError('{}: needs the {} module or the {} command'.format(fn, 'lzma' if ext == '.xz' else 'zstandard', tool))
+    open(fn, 'rb').close() # fail here rather than in the background if it can't be read
+    pool = None
+    if ext == '.bz2':
+        workers = workers or cpu_count()
+        pool = ThreadPool(workers)
+        # enough streams in hand to keep every worker busy
+        readahead = max(readahead, 2 * workers)
+    return Readahead(fn, _chunks(fn, pool), readahead, pool)
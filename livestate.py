@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# The current air picture, kept in memory by the ADS-B loader: one entry
+# per icao24 with its latest position, altitude, speed, track, squawk,
+# callsign and registration, plus its latest ACARS message when the loader
+# is subscribed to the ACARS loader's live stream. Aircraft not heard from
+# for a while are dropped.
+#
+# Served as JSON on the loader's metrics port:
+#   /aircraft                    every aircraft
+#   /aircraft?bbox=W,S,E,N       aircraft with a position inside the box
+#   /aircraft?icao24=A1B2C3      one aircraft
+
+import json
+import socket
+import logging
+import threading
+from time import sleep, time
+
+import metrics
+from replay import monotonic
+from stream import msg_position
+
+tracked = metrics.gauge('skyshark_live_aircraft', 'aircraft in the live state table')
+
+def faa_registration(dbh):
+    '''look up US registrations by icao24 in the FAA MASTER table'''
+    def lookup(icao24):
+        rec = dbh['MASTER'].find_one({'MODE_S_CODE_HEX': icao24}, {'N_NUMBER': True})
+        if rec is None or not rec.get('N_NUMBER'):
+            return None
+        return 'N' + rec['N_NUMBER']
+    return lookup
+
+def faa_registrations(dbh):
+    '''faa_registration() from the whole MASTER table read once, for lookups on the ingest thread'''
+    table = {}
+    try:
+        for rec in dbh['MASTER'].find({}, {'_id': False, 'MODE_S_CODE_HEX': True, 'N_NUMBER': True}):
+            if rec.get('MODE_S_CODE_HEX') and rec.get('N_NUMBER'):
+                table[rec['MODE_S_CODE_HEX']] = 'N' + rec['N_NUMBER']
+    except Exception as e:
+        logging.warning("no registrations: %s", e)
+    logging.info("read %d registrations", len(table))
+    return table.get
+
+def _isoformat(t):
+    return t.isoformat() if hasattr(t, 'isoformat') else t
+
+class LiveState(object):
+    def __init__(self, expire=300, registration=None):
+        self.expire_after = expire
+        self.registration = registration
+        self.aircraft = {}
+        self.by_tail = {}
+        self.lock = threading.Lock()
+        self.last_expiry = monotonic()
+        tracked.fn = lambda: len(self.aircraft)
+
+    def _lookup(self, icao24):
+        '''the registration of an aircraft not tracked yet; call without the lock, it may be a query'''
+        if self.registration is None or icao24.strip().upper() in self.aircraft:
+            return None
+        try:
+            return self.registration(icao24.strip().upper())
+        except Exception as e:
+            logging.debug("registration lookup for %s: %s", icao24, e)
+            return None
+
+    def _entry(self, icao24, reg=None):
+        '''the state of an aircraft, created with registration reg if it's new; call with the lock held'''
+        icao24 = icao24.strip().upper()
+        st = self.aircraft.get(icao24)
+        if st is None:
+            st = self.aircraft[icao24] = {'icao24': icao24, 'first_seen': time()}
+            if reg:
+                st['registration'] = reg
+                self.by_tail[reg] = icao24
+        st['seen'] = monotonic()
+        st['last_seen'] = time()
+        return st
+
+    def update_position(self, rv):
+        '''from a position_record()'''
+        reg = self._lookup(rv['icao24'])
+        with self.lock:
+            st = self._entry(rv['icao24'], reg)
+            for k in ['altitude', 'squawk', 'alert', 'emergency', 'spi', 'is_on_ground']:
+                if k in rv:
+                    st[k] = rv[k]
+            if rv.get('callsign'):
+                st['callsign'] = rv['callsign'].strip()
+            pos = msg_position(rv)
+            if pos is not None:
+                st['lon'], st['lat'] = pos
+                st['position_time'] = _isoformat(rv.get('timestamp'))
+        self._maybe_expire()
+
+    def update_velocity(self, message):
+        '''from an SBS1 MSG,4'''
+        reg = self._lookup(message['icao24'])
+        with self.lock:
+            st = self._entry(message['icao24'], reg)
+            for k in ['ground_speed', 'track', 'vertical_rate']:
+                try:
+                    st[k] = float(message[k])
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+    def update_ident(self, icao24, callsign):
+        reg = self._lookup(icao24)
+        with self.lock:
+            self._entry(icao24, reg)['callsign'] = callsign
+
+    def update_acars(self, msg):
+        '''attach an ACARS message to the aircraft with its registration, if we're tracking it'''
+        tail = (msg.get('tail') or '').replace('.', '').strip().upper()
+        with self.lock:
+            icao24 = self.by_tail.get(tail)
+            if icao24 is None or icao24 not in self.aircraft:
+                return False
+            st = self.aircraft[icao24]
+            st['acars_label'] = msg.get('label')
+            st['acars_time'] = msg.get('timestamp')
+            if msg.get('flight'):
+                st['acars_flight'] = msg['flight']
+        return True
+
+    def _maybe_expire(self):
+        now = monotonic()
+        if now - self.last_expiry > 10:
+            self.last_expiry = now
+            self.expire(now)
+
+    def expire(self, now=None):
+        now = monotonic() if now is None else now
+        with self.lock:
+            stale = [k for k, st in self.aircraft.items() if now - st['seen'] > self.expire_after]
+            for k in stale:
+                reg = self.aircraft.pop(k).get('registration')
+                if self.by_tail.get(reg) == k:
+                    del self.by_tail[reg]
+        return len(stale)
+
+    def snapshot(self, bbox=None, icao24=None):
+        '''copies of the tracked aircraft, optionally in a bounding box (W, S, E, N)'''
+        with self.lock:
+            if icao24 is not None:
+                found = self.aircraft.get(icao24.strip().upper())
+                states = [found] if found is not None else []
+            else:
+                states = list(self.aircraft.values())
+            rv = [dict(st) for st in states]
+        if bbox is not None:
+            west, south, east, north = bbox
+            rv = [st for st in rv if 'lon' in st and west <= st['lon'] <= east and south <= st['lat'] <= north]
+        for st in rv:
+            st.pop('seen')
+        return rv
+
+    def http_aircraft(self, query):
+        bbox = None
+        if 'bbox' in query:
+            bbox = [float(x) for x in query['bbox'][0].split(',')]
+            if len(bbox) != 4:
+                raise ValueError('bbox is W,S,E,N')
+        icao24 = query['icao24'][0] if 'icao24' in query else None
+        body = {'now': time(), 'aircraft': self.snapshot(bbox, icao24)}
+        return 'application/json', json.dumps(body, sort_keys=True)
+
+    def register(self, path='/aircraft'):
+        metrics.routes[path] = self.http_aircraft
+
+def follow_acars(state, host, port):
+    '''update state from an ACARS loader's live stream (-L), forever'''
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            sock.sendall(json.dumps({'type': 'acars'}).encode('utf-8') + b'\n')
+            logging.info("following ACARS from %s:%d", host, port)
+            for line in sock.makefile('rb'):
+                try:
+                    state.update_acars(json.loads(line))
+                except (ValueError, AttributeError):
+                    pass
+        except socket.error as e:
+            logging.warning("ACARS stream %s:%d: %s", host, port, e)
+        sleep(5)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Counters, gauges and histograms for the loaders, exposed over HTTP in
+# the Prometheus text format. Metrics are module level singletons created
+# with counter()/gauge()/histogram(); updating one is a dict update under
+# a lock, so it's cheap enough to do for every message.
+#
+#   received = metrics.counter('skyshark_messages_received_total', 'messages read', ['source'])
+#   received.inc('udp')
+#   with metrics.histogram('skyshark_db_write_seconds', 'db write latency', ['collection']).time('acars'):
+#       ...
+#   metrics.serve(9100)
+
+import logging
+import threading
+
+from replay import monotonic
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urlparse import parse_qs
+except ImportError: # python3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs
+
+registry = {}
+_registry_lock = threading.Lock()
+
+# other read-only endpoints served alongside /metrics: path -> fn(query)
+# returning (content type, body). query is a dict of lists, as from parse_qs
+routes = {}
+
+# seconds, suitable for database writes and per-message processing
+default_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _text(v):
+    '''v as unicode; byte strings are taken to be UTF-8'''
+    if isinstance(v, bytes):
+        return v.decode('utf-8', 'replace')
+    return u'{}'.format(v)
+
+def _labelstr(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return u''
+    return u'{' + u','.join(u'{}="{}"'.format(k, _text(v).replace(u'\\', u'\\\\').replace(u'"', u'\\"')) for k, v in pairs) + u'}'
+
+class Metric(object):
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [u'# HELP {} {}'.format(self.name, _text(self.help)), u'# TYPE {} {}'.format(self.name, self.kind)]
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        # sorted once rendered: label values may mix unicode and byte strings
+        return sorted(u'{}{} {}'.format(self.name, _labelstr(self.labels, k), v) for k, v in items)
+
+    def get(self, *labelvalues):
+        return self.values.get(labelvalues, 0)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labelvalues, **kwargs):
+        n = kwargs.get('n', 1)
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + n
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), fn=None):
+        Metric.__init__(self, name, help, labels)
+        self.fn = fn
+
+    def set(self, value, *labelvalues):
+        with self.lock:
+            self.values[labelvalues] = value
+
+    def samples(self):
+        if self.fn is not None:
+            try:
+                self.set(self.fn())
+            except Exception as e:
+                logging.debug("gauge %s: %s", self.name, e)
+        return Metric.samples(self)
+
+class _Timer(object):
+    def __init__(self, hist, labelvalues):
+        self.hist = hist
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.t0 = monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(monotonic() - self.t0, *self.labelvalues)
+        return False
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=default_buckets):
+        Metric.__init__(self, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        with self.lock:
+            h = self.values.get(labelvalues)
+            if h is None:
+                h = self.values[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    h[0][i] += 1
+                    break
+            h[1] += value
+            h[2] += 1
+
+    def time(self, *labelvalues):
+        '''context manager observing the time spent in its block'''
+        return _Timer(self, labelvalues)
+
+    def samples(self):
+        rv = []
+        with self.lock:
+            items = [(k, ([c for c in v[0]], v[1], v[2])) for k, v in self.values.items()]
+        items.sort(key=lambda item: _labelstr(self.labels, item[0]))
+        for k, (counts, total, n) in items:
+            cumulative = 0
+            for b, c in zip(self.buckets, counts):
+                cumulative += c
+                rv.append(u'{}_bucket{} {}'.format(self.name, _labelstr(self.labels, k, ('le', b)), cumulative))
+            rv.append(u'{}_bucket{} {}'.format(self.name, _labelstr(self.labels, k, ('le', '+Inf')), n))
+            rv.append(u'{}_sum{} {}'.format(self.name, _labelstr(self.labels, k), total))
+            rv.append(u'{}_count{} {}'.format(self.name, _labelstr(self.labels, k), n))
+        return rv
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        if name not in registry:
+            registry[name] = cls(name, *args, **kwargs)
+        return registry[name]
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+def gauge(name, help, labels=(), fn=None):
+    g = _register(Gauge, name, help, labels)
+    if fn is not None:
+        g.fn = fn
+    return g
+
+def histogram(name, help, labels=(), buckets=default_buckets):
+    return _register(Histogram, name, help, labels, buckets)
+
+def exposition():
+    '''all metrics in the Prometheus text format, as unicode'''
+    lines = []
+    with _registry_lock:
+        metrics = [registry[k] for k in sorted(registry)]
+    for m in metrics:
+        lines.extend(m.header())
+        lines.extend(m.samples())
+    return u'\n'.join(lines) + u'\n'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path in ('/', '/metrics'):
+            content_type, body = 'text/plain; version=0.0.4', exposition()
+        elif path in routes:
+            try:
+                content_type, body = routes[path](parse_qs(query))
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+        else:
+            self.send_error(404)
+            return
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logging.debug("metrics http: " + fmt, *args)
+
+def serve(port, bind='localhost'):
+    '''serve /metrics and any routes from a background thread'''
+    server = HTTPServer((bind, port), MetricsHandler)
+    t = threading.Thread(target=server.serve_forever)
+    t.daemon = True
+    t.start()
+    logging.info("serving metrics on %s:%d", bind, port)
+    return server
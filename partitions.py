@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Time-partitioned collections. Instead of one ever-growing collection, a
+# loader started with -P day|week writes each document into a collection
+# for the period its timestamp falls in, named after the base collection,
+# the period and the first day of the period:
+#
+#   adsb_positions_d20240315    one day
+#   acars_w20240311             the week starting Monday 2024-03-11
+#
+# Old data is removed by dropping whole partitions (skyshark_retention.py)
+# rather than with delete_many(). find() queries only the partitions that
+# overlap the requested time range, plus the unpartitioned base collection
+# so that data written before partitioning was enabled is still found.
+
+import re
+import logging
+from datetime import datetime, timedelta
+
+periods = {'d': timedelta(days=1), 'w': timedelta(days=7)}
+period_names = {'day': 'd', 'week': 'w'}
+
+def _utc(ts):
+    '''a naive UTC datetime from a datetime or seconds since the epoch'''
+    if isinstance(ts, datetime):
+        if ts.tzinfo is not None:
+            ts = ts.replace(tzinfo=None) - ts.utcoffset()
+        return ts
+    return datetime.utcfromtimestamp(float(ts))
+
+def period_start(ts, period):
+    day = _utc(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'w':
+        day -= timedelta(days=day.weekday())
+    return day
+
+def partition_name(base, ts, period):
+    return '{}_{}{}'.format(base, period, period_start(ts, period).strftime('%Y%m%d'))
+
+def partitions(dbh, base):
+    '''[(name, start, end)] of the partitions of `base`, oldest first'''
+    rx = re.compile('^{}_([dw])(\\d{{8}})$'.format(re.escape(base)))
+    rv = []
+    for name in dbh.collection_names():
+        m = rx.match(name)
+        if m:
+            start = datetime.strptime(m.group(2), '%Y%m%d')
+            rv.append((name, start, start + periods[m.group(1)]))
+    return sorted(rv, key=lambda p: p[1])
+
+class Partitioner(object):
+    '''routes documents to the partition for their timestamp, creating indexes on new ones'''
+    def __init__(self, dbh, base, period, create_indexes=None):
+        self.dbh = dbh
+        self.base = base
+        self.period = period_names.get(period, period)
+        if self.period not in periods:
+            raise ValueError('unknown partition period {}'.format(period))
+        self.create_indexes = create_indexes
+        self.ready = set()
+        # the current partition, cached since nearly every write goes there
+        self.current = (None, None, None)
+
+    def collection(self, ts):
+        t = _utc(ts)
+        start, end, coll = self.current
+        if start is not None and start <= t < end:
+            return coll
+        name = partition_name(self.base, t, self.period)
+        coll = self.dbh[name]
+        if name not in self.ready:
+            if self.create_indexes is not None:
+                logging.info("new partition %s", name)
+                self.create_indexes(coll)
+            self.ready.add(name)
+        start = period_start(t, self.period)
+        self.current = (start, start + periods[self.period], coll)
+        return coll
+
+def find(dbh, base, start=None, end=None, selector=None, time_field='timestamp', projection=None):
+    '''documents of `base` with start <= time_field < end, from the partitions that can hold them'''
+    sel = dict(selector or {})
+    rng = {}
+    if start is not None:
+        rng['$gte'] = start
+    if end is not None:
+        rng['$lt'] = end
+    if rng:
+        sel[time_field] = rng
+
+    names = [base] if base in dbh.collection_names() else []
+    t0 = _utc(start) if start is not None else None
+    t1 = _utc(end) if end is not None else None
+    for name, p0, p1 in partitions(dbh, base):
+        if (t1 is None or p0 < t1) and (t0 is None or p1 > t0):
+            names.append(name)
+    for name in names:
+        for doc in dbh[name].find(sel, projection):
+            yield doc
+
+def earliest(dbh, base, time_field='timestamp'):
+    '''the oldest time_field in `base` and its partitions, or None'''
+    names = [base] if base in dbh.collection_names() else []
+    names += [name for name, _, _ in partitions(dbh, base)]
+    rv = None
+    for name in names:
+        for doc in dbh[name].find({}, {time_field: True}).sort(time_field, 1).limit(1):
+            t = _utc(doc[time_field])
+            rv = t if rv is None else min(rv, t)
+    return rv
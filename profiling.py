@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# In-process profiling for the loader daemons, so a running (daemonized)
+# loader can be profiled without restarting it under an external tool.
+#
+# Two modes:
+#  - 'sample' interrupts the process with SIGPROF every few milliseconds of
+#    CPU time and records the stack of every thread. The report is in the
+#    collapsed format understood by flamegraph.pl and speedscope.
+#  - 'cprofile' runs cProfile on the main thread and writes a .pstats dump
+#    plus a text summary sorted by cumulative time.
+#
+# A profile runs for a fixed window or until it is toggled off again with
+# SIGUSR2, eg. "kill -USR2 $(cat /tmp/skyshark_acars_loader.pid)".
+#
+# span() times a block into the skyshark_stage_seconds histogram; the
+# loaders use it around their parse, decode and write stages.
+
+import os
+import sys
+import atexit
+import signal
+import logging
+import cProfile
+import pstats
+from time import strftime
+
+import metrics
+from replay import monotonic
+
+stages = metrics.histogram('skyshark_stage_seconds', 'time spent per message in each ingest stage', ['stage'])
+
+def span(stage):
+    '''context manager timing a block as one observation of `stage`'''
+    return stages.time(stage)
+
+def timed_iter(iterable, stage):
+    '''yield from iterable, timing each step as `stage`'''
+    it = iter(iterable)
+    while True:
+        t0 = monotonic()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        stages.observe(monotonic() - t0, stage)
+        yield item
+
+def _frame_name(frame):
+    return '{}:{}'.format(os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+
+def collapse(frame):
+    '''a stack as "outermost;...;innermost"'''
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class Profiler(object):
+    def __init__(self, name, mode='sample', outdir='/tmp', interval=0.005):
+        self.name = name
+        self.mode = mode
+        self.outdir = outdir
+        self.interval = interval
+        self.running = False
+        self.samples = {}
+        self.profile = None
+        self.started = None
+
+    def _sample(self, signum, frame):
+        if not self.running:
+            return # a SIGPROF that was already pending when we stopped
+        main = frame
+        for ident, f in sys._current_frames().items():
+            # the main thread is running this handler; use the frame it interrupted
+            stack = collapse(main if f is sys._getframe() else f)
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def _deadline(self, signum, frame):
+        if self.running:
+            self.stop()
+
+    def start(self, seconds=None):
+        if self.running:
+            return
+        self.running = True
+        self.started = monotonic()
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.samples = {}
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.siginterrupt(signal.SIGPROF, False)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        if seconds:
+            signal.signal(signal.SIGALRM, self._deadline)
+            signal.siginterrupt(signal.SIGALRM, False)
+            signal.setitimer(signal.ITIMER_REAL, seconds)
+        logging.warning("%s profiling started%s", self.mode, ' for {}s'.format(seconds) if seconds else '')
+
+    def stop(self):
+        '''stop profiling and write the report, returning its file name'''
+        if not self.running:
+            return None
+        self.running = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        base = os.path.join(self.outdir, '{}.{}.{}'.format(self.name, os.getpid(), strftime('%Y%m%d-%H%M%S')))
+        elapsed = monotonic() - self.started
+
+        if self.mode == 'cprofile':
+            self.profile.disable()
+            self.profile.dump_stats(base + '.pstats')
+            with open(base + '.txt', 'w') as fd:
+                st = pstats.Stats(self.profile, stream=fd)
+                st.sort_stats('cumulative').print_stats(50)
+            self.profile = None
+            rv = base + '.pstats'
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            with open(base + '.collapsed', 'w') as fd:
+                for stack, n in sorted(self.samples.items()):
+                    fd.write('{} {}\n'.format(stack, n))
+            rv = base + '.collapsed'
+        logging.warning("profiled %.1fs, report in %s", elapsed, rv)
+        return rv
+
+    def toggle(self, seconds=None):
+        if self.running:
+            self.stop()
+        else:
+            self.start(seconds)
+
+def install(name, mode='sample', outdir='/tmp', window=None, start=False, signum=signal.SIGUSR2):
+    '''set up a profiler that `signum` toggles on and off, optionally starting it now'''
+    prof = Profiler(name, mode, outdir)
+
+    def handler(s, frame):
+        prof.toggle(window)
+
+    signal.signal(signum, handler)
+    signal.siginterrupt(signum, False)
+    atexit.register(prof.stop)
+    if start:
+        prof.start(window)
+    return prof
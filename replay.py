@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Pacing for the replay tools. Messages are scheduled against an absolute
+# timeline anchored when the replay starts, so sleep() overshoot and
+# processing time never accumulate over a long capture.
+
+import sys
+import logging
+import warnings
+import random
+from time import sleep
+
+def _clock_gettime():
+    '''monotonic() from clock_gettime(CLOCK_MONOTONIC) through ctypes, for python2'''
+    import ctypes
+    import ctypes.util
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    clock_id = 6 if sys.platform == 'darwin' else 1 # CLOCK_MONOTONIC
+    lib = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    if not hasattr(lib, 'clock_gettime'): # glibc before 2.17
+        lib = ctypes.CDLL(ctypes.util.find_library('rt'), use_errno=True)
+    clock_gettime = lib.clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def monotonic():
+        ts = timespec() # not shared, the call releases the GIL
+        if clock_gettime(clock_id, ctypes.byref(ts)):
+            errno = ctypes.get_errno()
+            raise OSError(errno, 'clock_gettime failed')
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+    monotonic()
+    return monotonic
+
+# seconds from an arbitrary start which never goes backwards, for timing
+# and pacing that an NTP step mustn't upset
+try:
+    from time import monotonic
+except ImportError: # python2
+    try:
+        from monotonic import monotonic
+    except ImportError:
+        try:
+            monotonic = _clock_gettime()
+        except (OSError, AttributeError, TypeError):
+            from time import time as monotonic
+            warnings.warn('no monotonic clock, timing uses the wall clock (pip install monotonic)')
+
+def percentile(values, pct):
+    '''nearest-rank percentile of an already sorted list'''
+    if not values:
+        return 0.0
+    i = int(round(pct / 100.0 * (len(values) - 1)))
+    return values[max(0, min(i, len(values) - 1))]
+
+class ReplayStats(object):
+    '''Track achieved rate and lateness of a replay'''
+
+    def __init__(self, requested_rate=None, samples=100000):
+        self.requested_rate = requested_rate
+        self.samples = samples
+        self.lateness = []
+        self.sent = 0
+        self.batches = 0
+        self.start = None
+        self.end = None
+        self.capture_span = 0.0
+        self._rng = random.Random(0)
+
+    def record(self, late):
+        '''remember how late a message was sent, reservoir sampling beyond self.samples'''
+        self.sent += 1
+        if len(self.lateness) < self.samples:
+            self.lateness.append(late)
+        else:
+            i = self._rng.randint(0, self.sent - 1)
+            if i < self.samples:
+                self.lateness[i] = late
+
+    def report(self):
+        elapsed = (self.end or monotonic()) - (self.start or monotonic())
+        achieved = self.sent / elapsed if elapsed > 0 else 0.0
+        requested = self.requested_rate
+        if requested is None and self.capture_span > 0:
+            requested = self.sent / self.capture_span
+        late = sorted(self.lateness)
+        rv = {'sent': self.sent, 'batches': self.batches, 'elapsed': elapsed,
+              'achieved_rate': achieved, 'requested_rate': requested,
+              'late_p50': percentile(late, 50), 'late_p90': percentile(late, 90),
+              'late_p99': percentile(late, 99), 'late_max': late[-1] if late else 0.0}
+        return rv
+
+    def log_report(self):
+        r = self.report()
+        logging.warning("sent %d messages in %.3fs (%d batches): %.1f msg/s achieved, %s msg/s requested",
+                        r['sent'], r['elapsed'], r['batches'], r['achieved_rate'],
+                        'unlimited' if r['requested_rate'] is None else '%.1f' % r['requested_rate'])
+        logging.warning("lateness p50=%.6fs p90=%.6fs p99=%.6fs max=%.6fs",
+                        r['late_p50'], r['late_p90'], r['late_p99'], r['late_max'])
+        return r
+
+def paced(events, rate=1.0, mps=None, quick=False, max_batch=64, stats=None):
+    '''Schedule (timestamp, payload) events and yield lists of payloads that are due.
+
+    By default the capture timestamps are replayed at `rate` times real
+    time. If `mps` is given the timestamps are ignored and messages are
+    released at that many per second. If `quick` is set there's no pacing
+    at all. A timestamp of None, or one earlier than its predecessor, is
+    sent immediately after the previous message rather than being turned
+    into a sleep.
+
+    When the replay falls behind, every message that is already due is
+    handed back in one list (up to `max_batch`) so the caller can send
+    them back to back without consulting the clock in between.
+    '''
+    if stats is None:
+        stats = ReplayStats(mps)
+    start = None
+    first_ts = None
+    last_ts = None
+    n = 0
+    batch = []
+    targets = []
+
+    def flush():
+        now = monotonic()
+        for t in targets:
+            stats.record(max(0.0, now - t))
+        stats.batches += 1
+        return batch[:]
+
+    for ts, payload in events:
+        if start is None:
+            start = stats.start = monotonic()
+
+        if quick:
+            target = start
+        elif mps:
+            target = start + n / float(mps)
+        else:
+            if ts is None or (last_ts is not None and ts < last_ts):
+                ts = last_ts
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts
+            target = start + ((ts - first_ts) / rate if ts is not None else 0.0)
+            stats.capture_span = (last_ts - first_ts) / rate if last_ts is not None else 0.0
+        n += 1
+
+        delay = target - monotonic()
+        if delay > 0 and batch:
+            yield flush()
+            del batch[:]
+            del targets[:]
+            delay = target - monotonic()
+        if delay > 0:
+            sleep(delay)
+
+        batch.append(payload)
+        targets.append(target)
+        if len(batch) >= max_batch:
+            yield flush()
+            del batch[:]
+            del targets[:]
+
+    if batch:
+        yield flush()
+    stats.end = monotonic()
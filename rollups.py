@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Traffic statistics kept by the loaders as they store messages, so that
+# dashboards read a few small documents rather than aggregating over acars
+# and adsb_positions. Counters are kept in memory and written every
+# `interval` seconds of data as $inc upserts into `rollups`:
+#
+#   {_id: 'KIND|KEY|START', kind, key, period: 'hour'|'day', start, n}
+#
+#   acars_label     messages per label per hour
+#   acars_station   messages per receiving station_id per hour, counting
+#                   copies merged by the deduplicator
+#   acars_airline   messages per airline ICAO prefix per day
+#   acars_flight    messages per flight per day
+#   adsb_positions  positions per hour, key 'all'
+#   adsb_airline    positions per callsign prefix per day
+#
+# Distinct aircraft are counted with HyperLogLog sketches of 2**precision
+# registers per hour, written as $max of each register that grew:
+#
+#   {_id: 'KIND|all|START', kind, key: 'all', period: 'hour', start, r: {register: rank}}
+#
+#   acars_aircraft  tails heard on ACARS
+#   adsb_aircraft   icao24s with a position
+#
+# Because every write is an increment or a maximum, several loaders and
+# restarts add up correctly, and the sketches of any set of hours merge
+# into an estimate, within about 3%, of the aircraft heard in all of them.
+# skyshark_rollup_backfill.py builds rollups from already stored data.
+
+import struct
+from math import log
+from hashlib import md5
+from datetime import timedelta
+
+from partitions import _utc
+
+precision = 10
+
+def _start(t, period):
+    if period == 'day':
+        return t.replace(hour=0, minute=0, second=0, microsecond=0)
+    return t.replace(minute=0, second=0, microsecond=0)
+
+def _key(kind, key, period, start):
+    return '{}|{}|{}'.format(kind, key, start.strftime('%Y%m%d%H' if period == 'hour' else '%Y%m%d'))
+
+def hll_register(value, p=precision):
+    '''(register, rank) of a value in a HyperLogLog sketch of 2**p registers'''
+    h = struct.unpack('>Q', md5(value.encode('utf-8')).digest()[:8])[0]
+    w = h & ((1 << (64 - p)) - 1)
+    return h >> (64 - p), (64 - p) - w.bit_length() + 1
+
+def hll_estimate(registers, p=precision):
+    '''distinct values counted by a {register: rank} sketch'''
+    m = 1 << p
+    alpha = 0.7213 / (1 + 1.079 / m)
+    zeros = m - len(registers)
+    e = alpha * m * m / (zeros + sum(2.0 ** -r for r in registers.values()))
+    if e <= 2.5 * m and zeros:
+        e = m * log(float(m) / zeros)
+    return int(round(e))
+
+class Rollups(object):
+    '''in-memory rollup counters and sketches, written out every interval seconds of data'''
+    def __init__(self, dbh, interval=300, coll='rollups'):
+        self.dbh = dbh
+        self.interval = interval
+        self.coll = coll
+        self.counts = {} # (kind, key, period, start) -> n since the last flush
+        self.sketches = {} # (kind, start) -> {register: rank}
+        self.dirty = {} # (kind, start) -> set of registers grown since the last flush
+        self.last_flush = None
+        self.newest = None
+
+    def count(self, kind, key, t, period='hour', n=1):
+        k = (kind, key, period, _start(t, period))
+        self.counts[k] = self.counts.get(k, 0) + n
+
+    def distinct(self, kind, value, t):
+        k = (kind, _start(t, 'hour'))
+        regs = self.sketches.setdefault(k, {})
+        i, rank = hll_register(value)
+        if rank > regs.get(i, 0):
+            regs[i] = rank
+            self.dirty.setdefault(k, set()).add(i)
+
+    def tick(self, t):
+        '''note the time of the newest message, flushing if it's been long enough'''
+        # only the newest time moves the clock on, so old messages from a
+        # forwarder's spool, interleaved with live ones, don't cause flushes
+        if self.newest is not None and t <= self.newest:
+            return
+        self.newest = t
+        if self.last_flush is None:
+            self.last_flush = t
+        elif (t - self.last_flush).total_seconds() >= self.interval:
+            self.flush()
+            self.last_flush = t
+
+    def flush(self):
+        coll = self.dbh[self.coll]
+        for (kind, key, period, start), n in self.counts.items():
+            coll.update_one({'_id': _key(kind, key, period, start)},
+                            {'$set': {'kind': kind, 'key': key, 'period': period, 'start': start},
+                             '$inc': {'n': n}}, upsert=True)
+        self.counts = {}
+        for (kind, start), grown in self.dirty.items():
+            regs = self.sketches[(kind, start)]
+            coll.update_one({'_id': _key(kind, 'all', 'hour', start)},
+                            {'$set': {'kind': kind, 'key': 'all', 'period': 'hour', 'start': start},
+                             '$max': dict(('r.{}'.format(i), regs[i]) for i in grown)}, upsert=True)
+        self.dirty = {}
+        # sketches of hours long past only take memory; late messages still
+        # merge correctly since the registers are written with $max
+        if self.newest is not None:
+            horizon = self.newest - timedelta(hours=2)
+            self.sketches = dict((k, v) for k, v in self.sketches.items() if k[1] >= horizon)
+
+def acars_rollup(r, msg, merged=False):
+    '''count a processed ACARS message, or another receiver's copy of one'''
+    t = _utc(msg['date'])
+    if msg.get('station_id'):
+        r.count('acars_station', msg['station_id'], t)
+    if not merged:
+        r.count('acars_label', msg.get('label', ''), t)
+        if msg.get('icao'):
+            r.count('acars_airline', msg['icao'], t, 'day')
+        if msg.get('flight'):
+            r.count('acars_flight', msg['flight'], t, 'day')
+        if msg.get('tail'):
+            r.distinct('acars_aircraft', msg['tail'], t)
+    r.tick(t)
+
+def position_rollup(r, rv):
+    '''count a stored adsb_positions document'''
+    t = _utc(rv['timestamp'])
+    r.count('adsb_positions', 'all', t)
+    prefix = (rv.get('callsign') or '')[:3]
+    if len(prefix) == 3 and prefix.isalpha():
+        r.count('adsb_airline', prefix, t, 'day')
+    r.distinct('adsb_aircraft', rv['icao24'], t)
+    r.tick(t)
+
+def create_indexes(dbh, coll='rollups'):
+    dbh[coll].create_index([('kind', 1), ('start', 1)])
+
+def _selector(kind, since, until, key=None):
+    sel = {'kind': kind}
+    if key is not None:
+        sel['key'] = key
+    if since is not None or until is not None:
+        sel['start'] = {}
+        if since is not None:
+            sel['start']['$gte'] = since
+        if until is not None:
+            sel['start']['$lt'] = until
+    return sel
+
+def series(dbh, kind, since=None, until=None, key=None, coll='rollups'):
+    '''[(start, key, n)] of a counter, oldest first'''
+    return [(d['start'], d['key'], d.get('n', 0)) for d in
+            dbh[coll].find(_selector(kind, since, until, key), {'start': True, 'key': True, 'n': True}).sort('start')]
+
+def totals(dbh, kind, since=None, until=None, coll='rollups'):
+    '''{key: n} of a counter over a time range'''
+    rv = {}
+    for start, key, n in series(dbh, kind, since, until, coll=coll):
+        rv[key] = rv.get(key, 0) + n
+    return rv
+
+def top(dbh, kind, since=None, until=None, n=10, coll='rollups'):
+    '''the n (key, count) of a counter with the highest counts'''
+    return sorted(totals(dbh, kind, since, until, coll).items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+def unique(dbh, kind, since=None, until=None, coll='rollups'):
+    '''estimated distinct aircraft over a time range'''
+    regs = {}
+    for d in dbh[coll].find(_selector(kind, since, until), {'r': True}):
+        for i, rank in d.get('r', {}).items():
+            if rank > regs.get(i, 0):
+                regs[i] = rank
+    return hll_estimate(regs)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Columnar parsing of SBS1 files for backfills (skyshark_adsb_loader.py
+# --batch). Lines are read in chunks of `rows`, split by the csv module
+# and turned into one NumPy array per field, so that filtering on the
+# transmission type and converting times, coordinates and altitudes is a
+# handful of array operations per chunk instead of dateutil and float()
+# per line. Callsigns are looked up in the ident cache with a join on a
+# sorted array of icao24s. The loader writes out each chunk's documents
+# in bulk. Needs numpy.
+#
+# Unlike the line at a time path, the idents of a chunk are all applied
+# before its positions are resolved, so a position can get a callsign
+# from an ident heard a little after it.
+#
+# Flights, coverage and rollups are not kept under --batch: they are
+# updated a position at a time and, flights above all, cost more than the
+# rest of a chunk put together. Rollups can be rebuilt afterwards with
+# skyshark_rollup_backfill.py. Against the line path with its defaults,
+# bench/sbs1.txt.gz loads about 10x faster with no database, which was the
+# aim, but only about 3.5x faster into SQLite, where the per position
+# upserts are most of what's left. With flights, coverage and rollups off
+# on both sides it's 7.4x and 3x.
+
+import csv
+from datetime import datetime
+from dateutil.tz import tzlocal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ident_type = '1'
+position_types = ['2', '3']
+flag_fields = ['alert', 'emergency', 'spi', 'is_on_ground']
+month_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('batch ingest needs numpy (pip install numpy)')
+
+def chunks(fd, fields, rows=100000):
+    '''dicts of field -> array for every `rows` well formed lines of fd'''
+    require_numpy()
+    reader = csv.reader(fd)
+    while True:
+        block = []
+        for row in reader:
+            if len(row) == len(fields):
+                block.append(row)
+                if len(block) >= rows:
+                    break
+        if not block:
+            return
+        yield dict(zip(fields, (np.array(c) for c in zip(*block))))
+        if len(block) < rows:
+            return
+
+def lines(chunk, fields):
+    '''the rows of a chunk as csv.DictReader gives them, for the line at a time path'''
+    for row in zip(*[chunk[f].tolist() for f in fields]):
+        yield dict(zip(fields, row))
+
+def _digits(col, width):
+    '''fixed width strings as an (n, width) array of digit values, NUL padded'''
+    b = np.frombuffer(col.astype('S{}'.format(width)).tobytes(), dtype=np.uint8).reshape(-1, width).astype(np.int64)
+    return b - ord('0')
+
+def timestamps(dates, times, tz=None):
+    '''naive UTC datetime64[ms] of SBS1 local date and time columns, and a mask of the parseable rows'''
+    d = _digits(dates, 10) # YYYY/MM/DD
+    t = _digits(times, 12) # HH:MM:SS.fff, maybe without the fraction
+    ok = (np.char.str_len(dates) == 10) & (np.char.str_len(times) >= 8) & (np.char.str_len(times) <= 12)
+    ok &= ((d[:, [0, 1, 2, 3, 5, 6, 8, 9]] >= 0) & (d[:, [0, 1, 2, 3, 5, 6, 8, 9]] <= 9)).all(axis=1)
+    ok &= ((t[:, [0, 1, 3, 4, 6, 7]] >= 0) & (t[:, [0, 1, 3, 4, 6, 7]] <= 9)).all(axis=1)
+    y = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+    m = d[:, 5] * 10 + d[:, 6]
+    day = d[:, 8] * 10 + d[:, 9]
+    leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+    ok &= (m >= 1) & (m <= 12) & (day >= 1)
+    ok &= day <= np.array(month_days)[np.clip(m - 1, 0, 11)] + ((m == 2) & leap)
+    # days since the epoch of a proleptic Gregorian date, Hinnant's days_from_civil
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * np.where(m > 2, m - 3, m + 9) + 2) // 5 + day - 1
+    days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+    frac = np.clip(t[:, 9:12], 0, 9) # missing milliseconds are NULs
+    ms = ((days * 24 + t[:, 0] * 10 + t[:, 1]) * 60 + t[:, 3] * 10 + t[:, 4]) * 60 + t[:, 6] * 10 + t[:, 7]
+    ms = ms * 1000 + frac[:, 0] * 100 + frac[:, 1] * 10 + frac[:, 2]
+
+    # the times are local: find the UTC offset once per hour in the chunk
+    tz = tz or tzlocal()
+    hours, inverse = np.unique(ms[ok] // 3600000, return_inverse=True)
+    offsets = np.array([tz.utcoffset(datetime.utcfromtimestamp(h * 3600)).total_seconds() * 1000 for h in hours.tolist()], dtype=np.int64)
+    utc = ms.copy()
+    utc[ok] -= offsets[inverse] if len(hours) else 0
+    return utc.astype('M8[ms]'), ok
+
+def floats(col):
+    '''floats of a string column, NaN where it is empty or garbage'''
+    try:
+        return np.where(col == b'', b'nan', col).astype(np.float64)
+    except ValueError:
+        rv = np.empty(len(col))
+        for i, s in enumerate(col.tolist()):
+            try:
+                rv[i] = float(s)
+            except ValueError:
+                rv[i] = np.nan
+        return rv
+
+def resolve_callsigns(icao24, callsigns, icao_cache):
+    '''the callsign column with known idents filled in from the cache, like resolve_icao()'''
+    if not icao_cache:
+        return callsigns
+    keys = np.array(sorted(icao_cache))
+    vals = np.array([icao_cache[k]['callsign'] for k in keys.tolist()])
+    lookup = np.char.upper(np.char.strip(icao24))
+    idx = np.clip(np.searchsorted(keys, lookup), 0, len(keys) - 1)
+    return np.where(keys[idx] == lookup, vals[idx], callsigns)
+
+def ident_messages(chunk, when, ok):
+    '''the identification messages of a chunk, shaped for process_ident()'''
+    sel = np.nonzero((chunk['transmission_type'] == ident_type) & ok)[0]
+    times = when[sel].astype(object).tolist()
+    return [{'transmission_type': ident_type, 'icao24': i, 'callsign': c, 'timestamp': t}
+            for i, c, t in zip(chunk['icao24'][sel].tolist(), chunk['callsign'][sel].tolist(), times)]
+
+def position_docs(chunk, when, ok, icao_cache):
+    '''adsb_positions documents of the position reports of a chunk, as position_record() makes them'''
+    tt = chunk['transmission_type']
+    sel = np.nonzero(((tt == position_types[0]) | (tt == position_types[1])) & ok)[0]
+    if not len(sel):
+        return []
+    icao24 = chunk['icao24'][sel]
+    callsign = resolve_callsigns(icao24, chunk['callsign'][sel], icao_cache).tolist()
+    altitude = floats(chunk['altitude'][sel])
+    lat = floats(chunk['lat'][sel])
+    lon = floats(chunk['lon'][sel])
+    has_alt = ~np.isnan(altitude)
+    has_loc = ~(np.isnan(lat) | np.isnan(lon))
+    squawk = chunk['squawk'][sel]
+    has_squawk = np.char.isdigit(squawk)
+    squawk = np.where(has_squawk, squawk, b'0').astype(np.int64)
+    flags = [((chunk[f][sel] != b'') & (chunk[f][sel] != b'0')).tolist() for f in flag_fields]
+    times = when[sel].astype(object).tolist()
+
+    rv = []
+    columns = zip(icao24.tolist(), times, callsign, altitude.tolist(), has_alt.tolist(), lon.tolist(), lat.tolist(),
+                  has_loc.tolist(), squawk.tolist(), has_squawk.tolist(), *flags)
+    for i, t, cs, alt, ha, x, y, hl, sq, hs, alert, emergency, spi, ground in columns:
+        doc = {'icao24': i, 'timestamp': t, 'callsign': cs,
+               'alert': alert, 'emergency': emergency, 'spi': spi, 'is_on_ground': ground}
+        if ha:
+            doc['altitude'] = alt
+        if hl:
+            doc['loc'] = {'type': 'Point', 'coordinates': [x, y]}
+        if hs:
+            doc['squawk'] = sq
+        rv.append(doc)
+    return rv
+
+def count_types(chunk):
+    '''{transmission type: messages} of a chunk'''
+    types, counts = np.unique(chunk['transmission_type'], return_counts=True)
+    return dict(zip(types.tolist(), counts.tolist()))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Multi-resolution flight tracks for map rendering. Each flight's positions
+# are simplified as they arrive at several tolerances, and the kept points
+# of each level are appended to the flight's document in `tracks`:
+#
+#   {_id: flight id, levels: {'0': [[lon, lat, altitude, time], ...], ...},
+#    counts: {'0': n, ...}}
+#
+# Simplification is streaming sleeve fitting (Zhao & Saalfeld): from the
+# last kept point, every following point narrows the range of directions a
+# line could take and still pass within the tolerance of all of them; the
+# point before the first one outside that range is kept. This costs O(1)
+# per point and level, where Douglas-Peucker needs the whole track and
+# has to be rerun as it grows, and gives the same guarantee that every
+# dropped point is within the tolerance of the simplified line.
+#
+# find_tracks() picks, per flight, the coarsest level that is still finer
+# than a pixel at the requested zoom, and coarser ones if needed to stay
+# under max_points.
+
+import json
+from math import asin, atan2, cos, hypot, pi, radians
+from datetime import datetime
+from calendar import timegm
+
+# tolerances in degrees of latitude, about 20m, 100m, 500m, 2km and 10km
+tolerances = [0.0002, 0.001, 0.005, 0.02, 0.1]
+
+def _wrap(a):
+    while a > pi:
+        a -= 2 * pi
+    while a <= -pi:
+        a += 2 * pi
+    return a
+
+class Sleeve(object):
+    '''streaming simplification of one track at one tolerance'''
+    def __init__(self, tolerance):
+        self.tol = tolerance
+        self.anchor = None
+        self.last = None
+        self.ref = None
+        self.lo = self.hi = 0.0
+        self.kept = []
+
+    def add(self, p):
+        '''p is (lon, lat, ...)'''
+        if self.anchor is None:
+            self.anchor = self.last = p
+            self.kept.append(p)
+            return
+        dx = (p[0] - self.anchor[0]) * cos(radians(self.anchor[1]))
+        dy = p[1] - self.anchor[1]
+        d = hypot(dx, dy)
+        if d <= self.tol:
+            self.last = p
+            return
+        a = atan2(dy, dx)
+        w = asin(self.tol / d)
+        if self.ref is None:
+            self.ref, self.lo, self.hi = a, -w, w
+        else:
+            rel = _wrap(a - self.ref)
+            if not self.lo <= rel <= self.hi:
+                # p can't be on a line through all points so far: keep the
+                # previous point and start a new sleeve there
+                self.anchor = self.last
+                self.kept.append(self.last)
+                self.ref = None
+                self.add(p)
+                return
+            self.lo = max(self.lo, rel - w)
+            self.hi = min(self.hi, rel + w)
+        self.last = p
+
+    def finish(self):
+        if self.last is not None and self.last is not self.anchor:
+            self.kept.append(self.last)
+            self.anchor = self.last
+            self.ref = None
+
+    def take(self):
+        '''kept points not taken before'''
+        rv, self.kept = self.kept, []
+        return rv
+
+class TrackSimplifier(object):
+    def __init__(self, tolerances=tolerances):
+        self.levels = [Sleeve(t) for t in tolerances]
+
+    def add(self, lon, lat, altitude=None, t=None):
+        p = [lon, lat, altitude, t]
+        for s in self.levels:
+            s.add(p)
+
+    def finish(self):
+        for s in self.levels:
+            s.finish()
+
+    def update(self):
+        '''a mongo update appending what was kept since the last one, or None'''
+        push, inc = {}, {}
+        for i, s in enumerate(self.levels):
+            pts = s.take()
+            if pts:
+                push['levels.{}'.format(i)] = {'$each': pts}
+                inc['counts.{}'.format(i)] = len(pts)
+        if not push:
+            return None
+        return {'$push': push, '$inc': inc}
+
+def store_track(dbh, flight_id, simplifier):
+    update = simplifier.update()
+    if update is not None:
+        dbh['tracks'].update_one({'_id': flight_id}, update, upsert=True)
+
+def choose_level(counts, zoom=None, max_points=500):
+    '''index of the level to draw a track with, given its per-level point counts'''
+    level = 0
+    if zoom is not None:
+        per_pixel = 360.0 / (256 * 2 ** zoom)
+        for i, t in enumerate(tolerances):
+            if t <= per_pixel:
+                level = i
+    while level < len(tolerances) - 1 and counts.get(str(level), 0) > max_points:
+        level += 1
+    return level
+
+def find_tracks(dbh, bbox=None, icao24=None, since=None, until=None, zoom=None, max_points=500, limit=1000):
+    '''[(flight, level, points)] for flights matching the query'''
+    sel = {}
+    if icao24:
+        sel['icao24'] = icao24.strip().upper()
+    if since is not None:
+        sel['last_seen'] = {'$gte': since}
+    if until is not None:
+        sel['first_seen'] = {'$lte': until}
+    if bbox is not None:
+        west, south, east, north = bbox
+        sel['bbox.0'] = {'$lte': east}
+        sel['bbox.1'] = {'$lte': north}
+        sel['bbox.2'] = {'$gte': west}
+        sel['bbox.3'] = {'$gte': south}
+    flights = list(dbh['flights'].find(sel).limit(limit))
+    if not flights:
+        return []
+
+    counts = dict((t['_id'], t.get('counts', {})) for t in
+                  dbh['tracks'].find({'_id': {'$in': [f['_id'] for f in flights]}}, {'counts': True}))
+    chosen = [(f, choose_level(counts[f['_id']], zoom, max_points)) for f in flights if f['_id'] in counts]
+    if not chosen:
+        return []
+
+    # one query for all the points, fetching only the levels that were chosen
+    projection = dict(('levels.{}'.format(level), True) for _, level in chosen)
+    levels = dict((t['_id'], t.get('levels', {})) for t in
+                  dbh['tracks'].find({'_id': {'$in': [f['_id'] for f, _ in chosen]}}, projection))
+    return [(f, level, levels.get(f['_id'], {}).get(str(level), [])) for f, level in chosen]
+
+def _timestamp(s):
+    '''seconds since the epoch or an ISO date, as a datetime'''
+    try:
+        return datetime.utcfromtimestamp(float(s))
+    except ValueError:
+        return datetime.strptime(s[:19], '%Y-%m-%dT%H:%M:%S')
+
+def _epoch(t):
+    return timegm(t.utctimetuple()) if hasattr(t, 'utctimetuple') else t
+
+def http_tracks(dbh):
+    '''a metrics route returning matching tracks as GeoJSON'''
+    def route(query):
+        q = dict((k, v[0]) for k, v in query.items())
+        bbox = [float(x) for x in q['bbox'].split(',')] if 'bbox' in q else None
+        if bbox is not None and len(bbox) != 4:
+            raise ValueError('bbox is W,S,E,N')
+        tracks = find_tracks(dbh, bbox, q.get('icao24'),
+                             _timestamp(q['since']) if 'since' in q else None,
+                             _timestamp(q['until']) if 'until' in q else None,
+                             int(q['zoom']) if 'zoom' in q else None,
+                             int(q.get('max_points', 500)))
+        features = []
+        for f, level, points in tracks:
+            features.append({'type': 'Feature',
+                             'geometry': {'type': 'LineString', 'coordinates': [p[:2] for p in points]},
+                             'properties': {'flight': f['_id'], 'icao24': f['icao24'], 'callsign': f.get('callsign'),
+                                            'level': level, 'altitudes': [p[2] for p in points],
+                                            'times': [_epoch(p[3]) for p in points]}})
+        return 'application/json', json.dumps({'type': 'FeatureCollection', 'features': features})
+    return route
@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 # vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
 
-import pymongo
 import logging
 import argparse
 import socket
+import threading
 import config
 import json
 import arrow
@@ -12,24 +12,56 @@ from daemonize import Daemonize
 
 from expn import *
 import decoders
+import metrics
+import profiling
+import spool
+import stream
+import geofence
+import partitions
+import storage
+import archive
+import textindex
+import rollups
+import inputs
+from profiling import span
+from airlines import airline_resolver, resolve_flight
+from dedup import Deduplicator, message_key, receiver
+from ingest_queue import IngestQueue, policies
 args = None
+geofences = None # geofence.GeofenceEngine
+acars_partitions = None # partitions.Partitioner, if messages are partitioned by time
+archive_sink = None # archive.ArchiveSink
+text_index = None # textindex.TextIndex
+rollup_counters = None # rollups.Rollups
 
-def dbConnect(db='mongodb://localhost:27017/', check_index=True):
+received = metrics.counter('skyshark_acars_received_total', 'ACARS messages read', ['source'])
+dropped = metrics.counter('skyshark_acars_dropped_total', 'ACARS messages not stored', ['reason'])
+labels = metrics.counter('skyshark_acars_labels_total', 'ACARS messages processed, by label', ['label'])
+merged = metrics.counter('skyshark_acars_merged_total', 'copies of ACARS messages from other receivers merged into the first')
+db_write = metrics.histogram('skyshark_db_write_seconds', 'database write latency', ['collection'])
+
+def acars_indexes(coll):
+    cols = ['rxfreq', 'country', 'callsign', 'block_id', 'date', 'mode', 'level', 'reg',
+            'errors', 'tail', 'flight', 'label', 'ack', 'expn', 'icao', 'msgno', 'iata',
+            'station_id']
+    for c in cols:
+        coll.create_index(c)
+    coll.create_index([ ('coordinates', storage.GEOSPHERE) ])
+    coll.create_index('receivers.station_id')
+    coll.create_index([ ('timestamp',1), ('label',1), ('error',1), ('level',1), ('channel',1), ('rxfreq',1), ('msgno',1), ('ack',1), ('block_id',1), ('tail',1), ('flight',1), ], name='dedup', unique=True)
+
+def dbConnect(db='mongodb://localhost:27017/', check_index=True, text_index=False):
     '''connect to database, and optionally verify the indexes'''
-    mc = pymongo.MongoClient(db, connectTimeoutMS=3000, serverSelectionTimeoutMS=3000)
-    dbh = mc['skyshark']
+    dbh = storage.connect(db, connectTimeoutMS=3000, serverSelectionTimeoutMS=3000)
     dbh.command('dbStats') # explode if auth was wrong :)
     logging.debug("connected to %s", db)
 
     if check_index is True:
         logging.debug("checking indexes")
-        cols = ['rxfreq', 'country', 'callsign', 'block_id', 'date', 'mode', 'level', 'reg',
-                'errors', 'tail', 'flight', 'label', 'ack', 'expn', 'icao', 'msgno', 'iata',
-                'station_id']
-        for c in cols:
-            dbh['acars'].create_index(c)
-        dbh['acars'].create_index([ ('coordinates', pymongo.GEOSPHERE) ])
-        dbh['acars'].create_index([ ('timestamp',1), ('label',1), ('error',1), ('level',1), ('channel',1), ('rxfreq',1), ('msgno',1), ('ack',1), ('block_id',1), ('tail',1), ('flight',1), ], name='dedup', unique=True)
+        acars_indexes(dbh['acars'])
+        if text_index:
+            textindex.create_indexes(dbh)
+        rollups.create_indexes(dbh)
 
     return dbh
 
@@ -44,11 +76,12 @@ def log_config(lvl):
         logging.basicConfig(format=logging_format, level=logging.WARN)
 
 
-def process_acars(msg):
+def process_acars(msg, airlines=None):
     '''Dispatcher for message parsers, fixups, etc.'''
     try:
         # don't even try process excessively errored messages
         if msg['error'] > config.acars_max_errors:
+            dropped.inc('errors')
             return False
     except (NameError, KeyError):
         pass
@@ -56,6 +89,7 @@ def process_acars(msg):
     try:
         # It's not corrupt, but is it one to drop?
         if msg['label'] in config.acars_ignored_labels:
+            dropped.inc('ignored_label')
             return False
     except NameError:
         pass
@@ -80,51 +114,179 @@ def process_acars(msg):
         pass
 
     msg['label'] = msg['label'].upper()
+    labels.inc(msg['label'])
     msg['expn'] = arinc620.get(msg['label'], 'unknown_{}'.format(msg['label']))
+
+    # Labels with several meanings are narrowed down by the operating
+    # airline. This is just dict lookups; the resolver is built at startup.
+    airline = resolve_flight(airlines, msg.get('flight'))
+    if airline is not None:
+        for k, v in airline.items():
+            msg.setdefault(k, v)
+    # '' is general aviation, no airline at all. An airline known only by
+    # its IATA code has no prefix, and gets the generic meanings
+    prefix = (airline.get('icao') or None) if airline is not None else ''
+    if msg['label'] in label_airlines:
+        msg['expn'] = label_airlines[msg['label']].get(prefix, msg['expn'])
+
     if len(msg['expn']) == 1:
         msg['expn'] = msg['expn'][0]
 
-    if False:
-        pass
-    elif msg['label'] == ':;':
-        decoders.decode_colonsemi(msg)
-    elif msg['label'] == 'SA':
-        decoders.decode_SA(msg)
-    elif msg['label'] == 'SQ':
-        decoders.decode_SQ(msg)
-    elif msg['label'] == '5Z':
-        decoders.decode_5Z(msg)
-    elif msg['label'] == '15':
-        decoders.decode_15(msg)
+    decoder = decoders.airline_decoders.get((msg['label'], prefix)) or decoders.label_decoders.get(msg['label'])
+    if decoder is not None:
+        decoder(msg)
     return True
 
 
-def line_handler(dbh, line):
+def acars_selector(parsed):
+    return {'timestamp': parsed['timestamp'],
+        'channel': parsed['channel'],
+        'rxfreq': parsed['rxfreq'],
+        'label': parsed['label'],
+        'error': parsed['error'],
+        'level': parsed['level'],
+        'flight': parsed.get('flight', None),
+        'tail': parsed.get('tail', None),
+    }
+
+def acars_collection(dbh, timestamp):
+    if acars_partitions is not None:
+        return acars_partitions.collection(timestamp)
+    return dbh.acars
+
+def store_acars(dbh, parsed):
+    sel = acars_selector(parsed)
+    coll = acars_collection(dbh, parsed['timestamp'])
+    with db_write.time('acars'):
+        rv = coll.update_one(sel, {'$set': parsed}, upsert=True)
+    if archive_sink is not None:
+        archive_sink.add(parsed)
+    if text_index is not None and rv.upserted_id is not None:
+        text_index.add(coll.name, rv.upserted_id, parsed)
+    return rv
+
+def flush_sinks():
+    '''write out whatever the archive, text index and rollups are holding, before exiting'''
+    if archive_sink is not None:
+        archive_sink.flush()
+    if text_index is not None:
+        text_index.flush()
+    if rollup_counters is not None:
+        rollup_counters.flush()
+
+def stored_selector(parsed, rv):
+    '''what finds the document a message was just stored as, for merging later copies into'''
+    if rv.upserted_id is not None:
+        return {'_id': rv.upserted_id, 'timestamp': parsed['timestamp']}
+    return acars_selector(parsed)
+
+def merge_acars(dbh, first, parsed):
+    '''record another receiver of an already stored message, returning whether it was found'''
+    with db_write.time('acars'):
+        rv = acars_collection(dbh, first['timestamp']).update_one(first, {'$push': {'receivers': receiver(parsed)}})
+    return rv.matched_count > 0
+
+# labels kept ahead of everything else when the ingest queue sheds load
+position_labels = ['15', '16', '17', '30', '47', '58', '80', 'SQ']
+
+def acars_priority(msg):
+    '''queue shedding class: emergencies > position reports > other > ignored'''
+    label = msg.get('label', '').upper()
     try:
-        parsed = json.loads(line)
-        if process_acars(parsed) is False:
+        if msg['error'] > config.acars_max_errors:
+            return 0
+    except (AttributeError, KeyError, TypeError):
+        pass
+    if label in getattr(config, 'acars_ignored_labels', []):
+        return 0
+    if label == '00':
+        return 3
+    if label in position_labels:
+        return 2
+    return 1
+
+def message_handler(dbh, parsed, airlines=None, dedup=None):
+    try:
+        if dedup is not None:
+            key = message_key(parsed)
+        with span('acars_decode'):
+            keep = process_acars(parsed, airlines)
+        if keep is False:
             return None
         logging.debug("%s", parsed)
-        sel = {'timestamp': parsed['timestamp'],
-            'channel': parsed['channel'],
-            'rxfreq': parsed['channel'],
-            'label': parsed['label'],
-            'error': parsed['error'],
-            'level': parsed['level'],
-            'flight': parsed.get('flight', None),
-            'tail': parsed.get('tail', None),
-        }
-        res = dbh.acars.update_one(sel, {'$set': parsed}, upsert=True)
-    except pymongo.errors.DuplicateKeyError:
-        pass
-    except pymongo.errors.WriteError, e: # What.everrrrrrrr...
+        if dedup is not None:
+            first = dedup.check(key, float(parsed['timestamp']), acars_selector(parsed))
+            if first is not None:
+                with span('acars_write'):
+                    found = merge_acars(dbh, first, parsed)
+                if found:
+                    merged.inc()
+                    if rollup_counters is not None:
+                        rollups.acars_rollup(rollup_counters, parsed, merged=True)
+                    return None
+                # the first copy is gone, eg. the database was restarted;
+                # store this one in its place
+                logging.info("first copy of a %s message from %s not found, storing this one", parsed['label'], parsed.get('station_id'))
+            parsed['receivers'] = [receiver(parsed)]
+        with span('acars_write'):
+            rv = store_acars(dbh, parsed)
+        if dedup is not None:
+            dedup.remember(key, stored_selector(parsed, rv))
+        if rollup_counters is not None:
+            rollups.acars_rollup(rollup_counters, parsed)
+        stream.publish('acars', parsed)
+        if geofences is not None:
+            check_geofences(parsed)
+    except storage.DuplicateKeyError:
+        dropped.inc('duplicate')
+    except storage.WriteError, e: # What.everrrrrrrr...
+        dropped.inc('db_error')
         logging.info("MongoDB exception: %s", e)
         logging.info("%s", parsed)
     except KeyboardInterrupt:
         logging.info("Caught ^C - shutting down" )
+        flush_sinks()
         exit(0)
+    except ValueError, e:
+        dropped.inc('parse_error')
+        logging.debug("PARSE ERROR: '%s'", e)
+
+def check_geofences(parsed):
+    '''feed a position decoded from an ACARS message to the geofences'''
+    pos = stream.msg_position(parsed)
+    if pos is None:
+        return
+    try:
+        altitude = float(parsed['altitude'])
+    except (KeyError, TypeError, ValueError):
+        altitude = None
+    key = parsed.get('tail') or parsed.get('flight')
+    if key:
+        geofences.update(key, pos[0], pos[1], altitude, parsed['date'], flight=parsed.get('flight'), source='acars')
+
+def parse_line(line):
+    '''decode one line of acarsdec JSON, or None if it's garbage'''
+    try:
+        with span('acars_parse'):
+            return json.loads(line)
     except ValueError, e:  # Invalid JSON
+        dropped.inc('parse_error')
         logging.debug("PARSE ERROR: '%s'", e)
+        return None
+
+def line_handler(dbh, line, airlines=None, dedup=None):
+    parsed = parse_line(line)
+    if parsed is not None:
+        message_handler(dbh, parsed, airlines, dedup)
+
+def udp_reader(s, q):
+    '''receive datagrams into the queue as fast as they arrive'''
+    while True:
+        line = s.recv(1024)
+        received.inc('udp')
+        parsed = parse_line(line)
+        if parsed is not None:
+            q.put(parsed)
 
 def main():
     '''Wrapper main(), just enough to decide to daemonize or not'''
@@ -134,10 +296,24 @@ def main():
     parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-b', '--bind', dest='bind', type=str, metavar='IP', default='localhost', help='hostname or IP address to listen on')
     parser.add_argument('-p', '--port', dest='port', type=int, metavar='PORT', default=5555, help='port to listen on')
-    parser.add_argument('-f', '--file', dest='file', type=str, metavar='FILE', default=None, help='Read file instead of doing network I/O')
+    parser.add_argument('-F', '--forwarded', dest='forwarded', type=int, metavar='PORT', default=None, help='also accept messages from skyshark_forwarder.py on this TCP port')
+    parser.add_argument('-f', '--file', dest='file', type=str, metavar='FILE', default=None, help='Read file instead of doing network I/O, optionally compressed (.gz, .bz2, .xz, .zst)')
     parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
     parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
     parser.add_argument('-d', '--daemon', dest='daemon', action='store_true', default=False, help='detach from controlling terminal')
+    parser.add_argument('-M', '--metrics', dest='metrics', type=int, metavar='PORT', default=None, help='serve Prometheus metrics on this port')
+    parser.add_argument('-L', '--live', dest='live', type=int, metavar='PORT', default=None, help='publish a live JSON feed of stored messages on this port')
+    parser.add_argument('-P', '--partition', dest='partition', choices=['day', 'week'], default=None, help='store messages in a collection per day or week')
+    parser.add_argument('-A', '--archive', dest='archive', metavar='DIR', default=None, help='also write messages to Parquet files in this directory')
+    parser.add_argument('-T', '--text-index', dest='text_index', action='store_true', default=False, help='index message text for skyshark_search.py')
+    parser.add_argument('--rollup-interval', dest='rollup_interval', type=float, metavar='SECONDS', default=300, help='write traffic statistics to the rollups collection this often, 0 to not keep them')
+    parser.add_argument('-G', '--geofences', dest='geofences', metavar='FILE', default=None, help='GeoJSON polygons to report aircraft entering and leaving')
+    parser.add_argument('-D', '--dedup', dest='dedup', type=float, metavar='SECONDS', default=5.0, help='merge copies of a message from several receivers arriving within this window, 0 to store them all')
+    parser.add_argument('-Q', '--queue', dest='queue', type=int, metavar='N', default=10000, help='messages buffered between the socket and the database')
+    parser.add_argument('--queue-policy', dest='queue_policy', choices=policies, default='shed', help='what to do when the queue is full')
+    parser.add_argument('--profile', dest='profile', type=float, metavar='SECONDS', default=None, help='profile for this long after startup. SIGUSR2 toggles profiling at any time')
+    parser.add_argument('--profile-mode', dest='profile_mode', choices=['sample', 'cprofile'], default='sample', help='sampling profiler (all threads, flame graph output) or cProfile (main thread)')
+    parser.add_argument('--profile-dir', dest='profile_dir', metavar='DIR', default='/tmp', help='where to write profiles')
     args = parser.parse_args()
 
     if args.daemon:
@@ -149,22 +325,42 @@ def main():
         skyshark_acars_loader()
 
 def skyshark_acars_loader():
-    global args
+    global args, geofences, acars_partitions, archive_sink, text_index, rollup_counters
 
     log_config(args.verbose)
+    if args.metrics:
+        metrics.serve(args.metrics)
+    if args.live:
+        stream.serve(args.live)
+    profiling.install('skyshark_acars_loader', args.profile_mode, args.profile_dir, args.profile, start=bool(args.profile))
     if args.db is None:
         try:
             args.db = config.mongo_url
         except AttributeError:
             pass
-    dbh = dbConnect(args.db)
+    dbh = dbConnect(args.db, text_index=args.text_index)
+    if args.partition:
+        acars_partitions = partitions.Partitioner(dbh, 'acars', args.partition, acars_indexes)
+    if args.archive:
+        archive_sink = archive.ArchiveSink(args.archive, 'acars')
+    if args.text_index:
+        text_index = textindex.TextIndex(dbh, textindex.known_airports(dbh))
+    if args.rollup_interval:
+        rollup_counters = rollups.Rollups(dbh, args.rollup_interval)
+    airlines = airline_resolver(dbh)
+    dedup = Deduplicator(args.dedup) if args.dedup else None
+    if args.geofences:
+        geofences = geofence.GeofenceEngine(geofence.load_fences(args.geofences),
+                                            sinks=[geofence.mongo_sink(dbh), lambda e: stream.publish('geofence', e)])
 
     if args.file:
         logging.info("Using file input")
-        with open(args.file, 'rU') as fd:
+        with inputs.open_input(args.file) as fd:
             for line in fd:
-                line_handler(dbh, line)
+                received.inc('file')
+                line_handler(dbh, line, airlines, dedup)
         logging.info("EOF - exiting")
+        flush_sinks()
         exit(0)
 
     # network stuff
@@ -172,9 +368,33 @@ def skyshark_acars_loader():
     logging.info("listening on %s:%d (%s)", ip, args.port, args.bind)
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
     s.bind((ip, args.port))
-    while True:
-        line = s.recv(1024)
-        line_handler(dbh, line)
+
+    # the socket is drained by its own thread so a slow database fills the
+    # queue, where the shedding policy decides what to lose, rather than the
+    # kernel's socket buffer, which loses at random
+    q = IngestQueue(args.queue, args.queue_policy, acars_priority, 'acars')
+    t = threading.Thread(target=udp_reader, args=(s, q))
+    t.daemon = True
+    t.start()
+
+    if args.forwarded:
+        def forwarded(sensor, lines):
+            for line in lines:
+                received.inc('forwarded')
+                parsed = parse_line(line)
+                if parsed is not None:
+                    q.put(parsed)
+        spool.serve(args.forwarded, ip, 'acars', forwarded)
+    try:
+        while True:
+            for parsed in q.get_batch():
+                message_handler(dbh, parsed, airlines, dedup)
+            if text_index is not None:
+                text_index.idle()
+    except KeyboardInterrupt:
+        logging.info("Caught ^C - shutting down" )
+        flush_sinks()
+        exit(0)
 
 if __name__ == '__main__':
     main()
@@ -7,15 +7,32 @@ from dateutil.parser import parse as dateparser
 from dateutil.tz import tzlocal
 from time import sleep
 from daemonize import Daemonize
-import pymongo
 import logging
-import bz2
-import gzip
 import argparse
 import socket
 import cPickle
-from os.path import realpath
+import threading
+from os.path import realpath, getmtime
+from datetime import datetime
 import config
+import metrics
+import profiling
+import spool
+import stream
+import livestate
+import flights
+import simplify
+import geofence
+import partitions
+import storage
+import archive
+import beast
+import coverage
+import rollups
+import inputs
+import sbs_batch
+from profiling import span, timed_iter
+from ingest_queue import IngestQueue, policies
 
 # http://woodair.net/SBS/Article/Barebones42_Socket_Data.htm
 # https://github.com/wiseman/node-sbs1
@@ -29,18 +46,39 @@ msg_types = {1:'ES_IDENT_AND_CATEGORY', 2: 'ES_SURFACE_POS', 3:'ES_AIRBORNE_POS'
         7:'AIR_TO_AIR', 8:'ALL_CALL_REPLY'}
 
 args = None
+live = None # livestate.LiveState, when the air picture is being served
+flight_builder = None # flights.FlightBuilder
+geofences = None # geofence.GeofenceEngine
+position_partitions = None # partitions.Partitioner, if positions are partitioned by time
+archive_sink = None # archive.ArchiveSink
+coverage_stats = None # coverage.CoverageStats
+rollup_counters = None # rollups.Rollups
+registration_table = None # livestate.faa_registrations(), shared by flights and the live state
+
+received = metrics.counter('skyshark_sbs_received_total', 'SBS1 lines read', ['source'])
+handled = metrics.counter('skyshark_sbs_messages_total', 'SBS1 messages handled, by transmission type', ['type'])
+dropped = metrics.counter('skyshark_sbs_dropped_total', 'SBS1 messages not stored', ['reason'])
+reconnects = metrics.counter('skyshark_sbs_reconnects_total', 'connections made to the SBS1 server')
+db_write = metrics.histogram('skyshark_db_write_seconds', 'database write latency', ['collection'])
 
 def timefix(date_or_datetime_str, time_str=''):
     '''convert date and time formats into a datetime()'''
     return dateparser(date_or_datetime_str + ' ' + time_str).replace(tzinfo=tzlocal())
 
+def message_time(message):
+    '''when a message was generated; decoded Beast frames already carry a datetime'''
+    if 'timestamp' in message:
+        return message['timestamp']
+    return timefix(message['gen_date'], message['gen_time'])
+
 def resolve_icao(icao_cache_dict, message):
     '''inject the callsign into a position report'''
     icao = message['icao24'].strip().upper()
     if icao in icao_cache_dict: # and (icao_cache_dict[icao]['lastseen'] > icao_cache_dict[icao]['firstseen']):
         message['callsign'] = icao_cache_dict[icao]['callsign']
 
-def process_position(message, dbh):
+def position_record(message):
+    '''build an adsb_positions document from an SBS1 position report'''
     rv = { 'icao24': message['icao24']}
     if len(message['squawk']):
         try:
@@ -57,11 +95,40 @@ def process_position(message, dbh):
     if len(message['lat']) and len(message['lon']):
         rv['loc'] = {'type':'Point', 'coordinates': [float(message['lon']),float(message['lat'])]}
     
-    rv['timestamp'] = timefix(message['gen_date'], message['gen_time'])
+    rv['timestamp'] = message_time(message)
     rv['callsign'] = message['callsign'] # populated by resolve_icao() 
+    for field in ['signal', 'nic']:
+        if message.get(field) is not None:
+            rv[field] = message[field]
+    return rv
 
+def store_position(dbh, rv):
     selector = {'icao24': rv['icao24'], 'timestamp': rv['timestamp']}
-    dbh['adsb_positions'].update(selector, rv, upsert=True)
+    coll = position_partitions.collection(rv['timestamp']) if position_partitions is not None else dbh['adsb_positions']
+    with db_write.time('adsb_positions'):
+        coll.update(selector, rv, upsert=True)
+    if archive_sink is not None:
+        archive_sink.add(rv)
+
+def store_positions(dbh, docs):
+    '''store_position() for a list of documents, in one bulk write per collection'''
+    colls = {}
+    for rv in docs:
+        coll = position_partitions.collection(rv['timestamp']) if position_partitions is not None else dbh['adsb_positions']
+        colls.setdefault(coll.name, (coll, []))[1].append(rv)
+    for coll, batch in colls.values():
+        with db_write.time('adsb_positions'):
+            coll.bulk_write([storage.ReplaceOne({'icao24': rv['icao24'], 'timestamp': rv['timestamp']}, rv, upsert=True)
+                             for rv in batch], ordered=False)
+    if archive_sink is not None:
+        for rv in docs:
+            archive_sink.add(rv)
+
+def process_position(message, dbh):
+    with span('sbs_decode'):
+        rv = position_record(message)
+    with span('sbs_write'):
+        store_position(dbh, rv)
     return rv
 
 def process_ident(icao_cache_dict, dbh, line):
@@ -73,7 +140,7 @@ def process_ident(icao_cache_dict, dbh, line):
         return None
     
     icao24 = line['icao24'].strip().upper()
-    message_time = timefix(line['gen_date'], line['gen_time'])
+    seen = message_time(line)
     callsign = line['callsign'].strip().upper() # or '*NONE*'
     if len(callsign) == 0 or re.search('[^0-9A-Z]', callsign):
         return None #reject line noise
@@ -82,7 +149,7 @@ def process_ident(icao_cache_dict, dbh, line):
         # only update the lastseen time if we've seen this mapping before, thus
         # we don't stash a single corrupt mapping (or the mapping needs to be
         # corrupted the same way twice in a row)
-        icao_cache_dict[icao24]['lastseen'] = message_time
+        icao_cache_dict[icao24]['lastseen'] = seen
         if 'idents' not in icao_cache_dict[icao24]:
             icao_cache_dict[icao24]['idents'] = 0
         icao_cache_dict[icao24]['idents'] = icao_cache_dict[icao24]['idents'] + 1
@@ -90,42 +157,126 @@ def process_ident(icao_cache_dict, dbh, line):
         icao_cache_dict[icao24] = {
             'icao24': icao24,
             'callsign': callsign,
-            'lastseen': message_time,
-            'firstseen':message_time,
+            'lastseen': seen,
+            'firstseen': seen,
             'idents': 1}
     
-    selector = {'icao24': icao24, 'callsign': callsign }
-    dbh['adsb_ident'].update(selector, {'$set': icao_cache_dict[icao24]}, upsert=True)
+    with span('sbs_write'):
+        store_ident(dbh, icao_cache_dict[icao24])
     return "{0} => {1}".format(icao24, callsign)
 
+def store_ident(dbh, ident):
+    selector = {'icao24': ident['icao24'], 'callsign': ident['callsign'] }
+    with db_write.time('adsb_ident'):
+        dbh['adsb_ident'].update(selector, {'$set': ident}, upsert=True)
+
 def handle_line(icao_cache, dbh, message):
+    handled.inc(message['transmission_type'])
+    if coverage_stats is not None and message['transmission_type'] not in ['2', '3']:
+        coverage_stats.message(message.get('sensor'), message['transmission_type'], message['icao24'].strip().upper())
     if message['transmission_type'] == '1':
-        process_ident(icao_cache, dbh, message)
+        if process_ident(icao_cache, dbh, message) is None:
+            dropped.inc('bad_ident')
+        else:
+            icao24 = message['icao24'].strip().upper()
+            if live is not None:
+                live.update_ident(icao24, icao_cache[icao24]['callsign'])
+            if flight_builder is not None:
+                flight_builder.add_ident(icao24, icao_cache[icao24]['callsign'])
     elif message['transmission_type'] in ['2', '3']:
         resolve_icao(icao_cache, message)
-        process_position(message, dbh)
+        rv = process_position(message, dbh)
+        stream.publish('position', rv)
+        if coverage_stats is not None:
+            coverage_stats.message(message.get('sensor'), message['transmission_type'], rv['icao24'], rv['timestamp'])
+            coverage_stats.position(message.get('sensor'), rv)
+        if rollup_counters is not None:
+            rollups.position_rollup(rollup_counters, rv)
+        if live is not None:
+            live.update_position(rv)
+        if flight_builder is not None:
+            flight_builder.add_position(rv)
+        if geofences is not None and 'loc' in rv:
+            lon, lat = rv['loc']['coordinates']
+            geofences.update(rv['icao24'], lon, lat, rv.get('altitude'), rv['timestamp'], callsign=rv['callsign'], source='adsb')
     else:
-        pass
+        if live is not None and message['transmission_type'] == '4':
+            live.update_velocity(message)
+        dropped.inc('ignored_type')
+
+def handle_batch(icao_cache, dbh, chunk):
+    '''handle_line() for a chunk of columns from sbs_batch.chunks()
+
+    Positions are stored and passed on to geofences, but not to the live
+    air picture or stream, which are no use for old data. Flights, coverage
+    and rollups are off under --batch, see main(); velocities are ignored.'''
+    counts = sbs_batch.count_types(chunk)
+    for tt, n in counts.items():
+        handled.inc(tt, n=n)
+    dropped.inc('ignored_type', n=sum(n for tt, n in counts.items() if tt not in ['1', '2', '3']))
+    with span('sbs_decode'):
+        when, ok = sbs_batch.timestamps(chunk['gen_date'], chunk['gen_time'])
+    if not ok.all():
+        dropped.inc('bad_time', n=int((~ok).sum()))
+
+    for line in sbs_batch.ident_messages(chunk, when, ok):
+        if process_ident(icao_cache, dbh, line) is None:
+            dropped.inc('bad_ident')
+
+    with span('sbs_decode'):
+        docs = sbs_batch.position_docs(chunk, when, ok, icao_cache)
+    with span('sbs_write'):
+        store_positions(dbh, docs)
+    if geofences is not None:
+        for rv in docs:
+            if 'loc' in rv:
+                lon, lat = rv['loc']['coordinates']
+                geofences.update(rv['icao24'], lon, lat, rv.get('altitude'), rv['timestamp'], callsign=rv['callsign'], source='adsb')
+    return len(docs)
+
+def sbs_priority(message):
+    '''queue shedding class: emergencies > idents > positions > everything else'''
+    tt = message.get('transmission_type')
+    if tt in ['2', '3']:
+        if message.get('squawk') in ['7500', '7600', '7700'] or message.get('alert') not in [None, '', '0'] \
+                or message.get('emergency') not in [None, '', '0']:
+            return 3
+        return 1
+    if tt == '1':
+        return 2
+    return 0
+
+def position_indexes(coll):
+    coll.create_index('icao24')
+    coll.create_index('squawk')
+    coll.create_index('callsign')
+    coll.create_index('timestamp')
+    coll.create_index([('loc', storage.GEOSPHERE)])
+    coll.create_index([('loc', storage.GEOSPHERE), ('altitude', 1)])
+    coll.create_index('altitude')
+
+def registrations(dbh):
+    '''the registration lookup, reading the MASTER table the first time'''
+    global registration_table
+    if registration_table is None:
+        registration_table = livestate.faa_registrations(dbh)
+    return registration_table
 
 def dbConnect(db='mongodb://localhost:27017/', check_index=True):
     '''connect to database, and optionally verify the indexes'''
-    mc = pymongo.MongoClient(db)
-    dbh = mc['skyshark']
+    dbh = storage.connect(db)
     _ = dbh.command('dbStats') # explode if auth was wrong :)
 
     if check_index is True:
         logging.debug("checking indexes")
-        dbh['adsb_positions'].create_index('icao24')
-        dbh['adsb_positions'].create_index('squawk')
-        dbh['adsb_positions'].create_index('callsign')
-        dbh['adsb_positions'].create_index('timestamp')
-        dbh['adsb_positions'].create_index([('loc', pymongo.GEOSPHERE)])
-        dbh['adsb_positions'].create_index([('loc', pymongo.GEOSPHERE), ('altitude', 1)])
-        dbh['adsb_positions'].create_index('altitude')
+        position_indexes(dbh['adsb_positions'])
         dbh['adsb_ident'].create_index('icao24')
         dbh['adsb_ident'].create_index('callsign')
         dbh['adsb_ident'].create_index('lastseen')
         dbh['adsb_ident'].create_index([('icao24', 1), ('callsign', 1)], unique=True)
+        flights.create_indexes(dbh)
+        coverage.create_indexes(dbh)
+        rollups.create_indexes(dbh)
 
     return dbh
 
@@ -144,35 +295,143 @@ def do_argparse():
 
     parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-c', '--cache', dest='cache', metavar='FILE', default=None, help='used as the pickle of persistent ICAO mappings')
-    parser.add_argument('-s', '--sbs', dest='server', metavar='SERVER', default='localhost', help='SBS1 server for streaming live results. Not used if files given.')
-    parser.add_argument('-p', '--port', dest='port', metavar='PORT', default=30003, help='SBS1 port')
+    parser.add_argument('-s', '--sbs', dest='server', metavar='SERVER', default=None, help='SBS1 server for streaming live results, localhost unless -F is given. Not used if files given.')
+    parser.add_argument('-p', '--port', dest='port', type=int, metavar='PORT', default=None, help='SBS1 port, or Beast port with -B (default: 30003, or 30005 with -B)')
+    parser.add_argument('-B', '--beast', dest='beast', action='store_true', default=False, help='read Beast binary frames from the server instead of SBS1, decoding positions ourselves')
+    parser.add_argument('--start', dest='start', metavar='YYYY-MM-DDTHH:MM:SS', default=None, help='UTC time of the first frame of .beast files, which have no other record of it (default: the file\'s modification time, less the length of the recording)')
+    parser.add_argument('--receiver', dest='receiver', metavar='LAT,LON', default=None, help='receiver location, used to decode single Beast positions and for coverage statistics')
+    parser.add_argument('--sensor', dest='sensor', metavar='NAME', default=socket.gethostname(), help='name of the receiver of -s and files, for coverage statistics')
+    parser.add_argument('--sensor-location', dest='sensor_locations', metavar='NAME=LAT,LON', action='append', default=[], help='location of a forwarding sensor, may be repeated')
+    parser.add_argument('--coverage-interval', dest='coverage_interval', type=float, metavar='SECONDS', default=300, help='write coverage statistics this often, 0 to not keep them')
+    parser.add_argument('-F', '--forwarded', dest='forwarded', type=int, metavar='PORT', default=None, help='accept SBS1 from skyshark_forwarder.py on this port')
+    parser.add_argument('-b', '--bind', dest='bind', metavar='IP', default='0.0.0.0', help='address for -F to listen on')
     parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
     parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
     parser.add_argument('-d', '--daemon', dest='daemon', action='store_true', default=False, help='detach from controlling terminal')
+    parser.add_argument('-M', '--metrics', dest='metrics', type=int, metavar='PORT', default=None, help='serve Prometheus metrics, the /aircraft air picture and /tracks on this port')
+    parser.add_argument('-P', '--partition', dest='partition', choices=['day', 'week'], default=None, help='store positions in a collection per day or week')
+    parser.add_argument('-A', '--archive', dest='archive', metavar='DIR', default=None, help='also write positions to Parquet files in this directory')
+    parser.add_argument('-g', '--flight-gap', dest='flight_gap', type=float, metavar='MINUTES', default=30, help='silence that ends a flight in the flights collection, 0 to not build flights')
+    parser.add_argument('-G', '--geofences', dest='geofences', metavar='FILE', default=None, help='GeoJSON polygons to report aircraft entering and leaving')
+    parser.add_argument('--rollup-interval', dest='rollup_interval', type=float, metavar='SECONDS', default=300, help='write traffic statistics to the rollups collection this often, 0 to not keep them')
+    parser.add_argument('--expire', dest='expire', type=float, metavar='SECONDS', default=300, help='with -M, drop aircraft from the /aircraft air picture after this long unheard')
+    parser.add_argument('--acars-stream', dest='acars_stream', metavar='HOST:PORT', default=None, help='with -M, add the latest ACARS message of each aircraft from this ACARS loader -L feed')
+    parser.add_argument('-L', '--live', dest='live', type=int, metavar='PORT', default=None, help='publish a live JSON feed of stored messages on this port')
+    parser.add_argument('-Q', '--queue', dest='queue', type=int, metavar='N', default=10000, help='messages buffered between the SBS1 reader and the database')
+    parser.add_argument('--queue-policy', dest='queue_policy', choices=policies, default='shed', help='what to do when the queue is full')
+    parser.add_argument('--profile', dest='profile', type=float, metavar='SECONDS', default=None, help='profile for this long after startup. SIGUSR2 toggles profiling at any time')
+    parser.add_argument('--profile-mode', dest='profile_mode', choices=['sample', 'cprofile'], default='sample', help='sampling profiler (all threads, flame graph output) or cProfile (main thread)')
+    parser.add_argument('--profile-dir', dest='profile_dir', metavar='DIR', default='/tmp', help='where to write profiles')
+    parser.add_argument('--batch', dest='batch', type=int, metavar='ROWS', default=None, help='load SBS1 files this many lines at a time with numpy, for backfills. Velocities are skipped, the live feeds not updated, and flights, coverage and rollups not kept; rebuild rollups afterwards with skyshark_rollup_backfill.py')
     parser.add_argument(dest='files', metavar='FILE', nargs='*', help='If specified, load data from files rather than live streaming')
     args = parser.parse_args()
+    if args.port is None:
+        args.port = 30005 if args.beast else 30003
+    if args.receiver:
+        args.receiver = parse_location(parser, args.receiver)
+    if args.start:
+        try:
+            args.start = dateparser(args.start).replace(tzinfo=beast.utc)
+        except ValueError:
+            parser.error('--start must be YYYY-MM-DDTHH:MM:SS')
+    locations = {}
+    for loc in args.sensor_locations:
+        name, _, loc = loc.partition('=')
+        locations[name] = parse_location(parser, loc)
+    args.sensor_locations = locations
     return args
 
-def do_network_io(icao_cache, dbh, args):
+def parse_location(parser, s):
+    try:
+        rv = tuple(float(x) for x in s.split(','))
+        assert len(rv) == 2
+    except (ValueError, AssertionError):
+        parser.error('locations must be LAT,LON')
+    return rv
+
+# marks the end of a connection in the ingest queue
+EOF = object()
+
+def network_reader(q, args):
+    '''read the SBS1 stream into the queue, reconnecting as needed'''
     while True:
         c = (args.server, args.port)
         logging.debug("connecting to %s:%d", args.server, args.port)
-        fd = socket.create_connection(c).makefile('r')
+        try:
+            fd = socket.create_connection(c).makefile('r')
+        except socket.error as e:
+            logging.warning("connecting to %s:%d: %s", args.server, args.port, e)
+            sleep(1)
+            continue
+        reconnects.inc()
         reader = csv.DictReader(fd, fields)
         try:
-            for line in reader:
-                logging.debug("%s", line)
-                handle_line(icao_cache, dbh, line)
-        except KeyboardInterrupt:
-            logging.info("Caught ^C - saving cache and exiting")
-            save_icao_cache(args, icao_cache)
-            return
+            for line in timed_iter(reader, 'sbs_read'):
+                received.inc('network')
+                q.put(line)
+        except (csv.Error, socket.error) as e:
+            logging.warning("reading from %s:%d: %s", args.server, args.port, e)
+        q.put(EOF, force=True)
+        logging.info("network EOF - reconnecting")
+        sleep(1)
 
-        # Ran out of lines to read. Save the cache, wait a sec, and try reconnect.
-        save_icao_cache(args, icao_cache)
+def beast_reader(q, args):
+    '''decode the Beast stream into the queue, reconnecting as needed'''
+    while True:
+        c = (args.server, args.port)
+        logging.debug("connecting to %s:%d", args.server, args.port)
+        try:
+            sock = socket.create_connection(c)
+        except socket.error as e:
+            logging.warning("connecting to %s:%d: %s", args.server, args.port, e)
+            sleep(1)
+            continue
+        reconnects.inc()
+        decoder = beast.Decoder(args.receiver)
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                with span('beast_decode'):
+                    messages = decoder.feed(data)
+                for m in messages:
+                    received.inc('network')
+                    q.put(m)
+        except socket.error as e:
+            logging.warning("reading from %s:%d: %s", args.server, args.port, e)
+        sock.close()
+        q.put(EOF, force=True)
         logging.info("network EOF - reconnecting")
         sleep(1)
 
+def do_network_io(icao_cache, dbh, args):
+    q = IngestQueue(args.queue, args.queue_policy, sbs_priority, 'sbs')
+    if args.forwarded:
+        def forwarded(sensor, lines):
+            for line in csv.DictReader(lines, fields):
+                received.inc('forwarded')
+                line['sensor'] = sensor
+                q.put(line)
+        spool.serve(args.forwarded, args.bind, 'sbs', forwarded)
+    if args.server or not args.forwarded:
+        args.server = args.server or 'localhost'
+        t = threading.Thread(target=beast_reader if args.beast else network_reader, args=(q, args))
+        t.daemon = True
+        t.start()
+    try:
+        while True:
+            for line in q.get_batch():
+                if line is EOF:
+                    # save the cache between connections, as before
+                    save_icao_cache(args, icao_cache)
+                    continue
+                logging.debug("%s", line)
+                handle_line(icao_cache, dbh, line)
+    except KeyboardInterrupt:
+        logging.info("Caught ^C - saving cache and exiting")
+        save_icao_cache(args, icao_cache)
+
 def load_icao_cache(args):
     if args.cache is None:
         return {}
@@ -194,24 +453,55 @@ def save_icao_cache(args, icao_cache):
             cPickle.dump(icao_cache, fd, 2)
             logging.info( "dumped %d entries to cache", len(icao_cache.keys()))
 
-def open_datafile(f):
+def open_datafile(f, receiver=None, start=None):
     '''Automatically handle compressed files'''
     
-    if f.lower().endswith('.bz2'):
-        fd = bz2.BZ2File(f, 'r')
-    elif f.lower().endswith('.gz'):
-        fd = gzip.open(f)
-    elif f.lower().endswith('.csv'):
-        fd = open(f, 'rU')
-    elif f.lower().endswith('.txt'):
-        fd = open(f, 'rU')
-    else:
+    if '.beast' in f.lower():
+        # Beast frames, possibly compressed: .beast, .beast.gz, .beast.bz2, ...
+        if start is None:
+            # the file was last written when the recording ended
+            with inputs.open_input(f) as fd:
+                start = datetime.fromtimestamp(getmtime(f), beast.utc) - beast.duration(fd)
+        return beast.Decoder(receiver, start=start).messages(inputs.open_input(f))
+    fd = open_textfile(f)
+    if fd is None:
+        return None
+    return csv.DictReader(fd, fields)
+
+def open_textfile(f):
+    '''the lines of an SBS1 file, compressed or not'''
+    if not inputs.is_compressed(f) and not f.lower().endswith(('.csv', '.txt')):
         logging.error("not sure what to do with file %s", f)
         return None
 
+    fd = inputs.open_input(f)
     fd.readline() # throw first line away in case it's got junk in it
-    reader = csv.DictReader(fd, fields)
-    return reader
+    return fd
+
+def load_batches(icao_cache, dbh, fd, f):
+    '''load an SBS1 file with handle_batch(), returning the lines read'''
+    nr = 0
+    for chunk in sbs_batch.chunks(fd, fields, args.batch):
+        n = len(chunk['transmission_type'])
+        received.inc('file', n=n)
+        try:
+            handle_batch(icao_cache, dbh, chunk)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            # a line at a time instead, so that only the bad lines are lost;
+            # what the batch did store is stored again, which is harmless
+            logging.warning("%s: loading %d lines one at a time: %s", f, n, e)
+            for line in sbs_batch.lines(chunk, fields):
+                try:
+                    handle_line(icao_cache, dbh, line)
+                except KeyboardInterrupt:
+                    raise
+                except Exception:
+                    dropped.inc('error')
+        nr += n
+        logging.debug("processed %d lines from %s", nr, f)
+    return nr
 
 def do_file_io(icao_cache, dbh, args):
     n = len(args.files)
@@ -221,24 +511,30 @@ def do_file_io(icao_cache, dbh, args):
         m += 1
         try:
             logging.info("Processing file: %s (%d/%d)", f, m, n)
-            reader = open_datafile(f)
-            if reader is None:
-                continue
             nr = 0
             if dbh.loaded.find({'_id': f}).count():
                 logging.debug("file already loaded")
                 continue
-            for line in reader:
-                try:
-                    handle_line(icao_cache, dbh, line)
-                except KeyboardInterrupt:
-                    raise KeyboardInterrupt()
-                except Exception:
-                    pass
-                    # continue ? abort file?
-                nr += 1
-                if nr % 50000 == 0:
-                    logging.debug("processed %d lines from %s", nr, f)
+            # opening starts decompressing in the background, so check first
+            batch = args.batch and '.beast' not in f.lower()
+            reader = open_textfile(f) if batch else open_datafile(f, args.receiver, args.start)
+            if reader is None:
+                continue
+            if batch:
+                nr = load_batches(icao_cache, dbh, reader, f)
+            else:
+                for line in timed_iter(reader, 'sbs_read'):
+                    received.inc('file')
+                    try:
+                        handle_line(icao_cache, dbh, line)
+                    except KeyboardInterrupt:
+                        raise KeyboardInterrupt()
+                    except Exception:
+                        dropped.inc('error')
+                        # continue ? abort file?
+                    nr += 1
+                    if nr % 50000 == 0:
+                        logging.debug("processed %d lines from %s", nr, f)
         except csv.Error: # probably EOF or truncated file. keep calm and carry on
             pass
         except EOFError:
@@ -265,22 +561,69 @@ def main():
 
 
 def skyshark_adsb_loader():
-    global args
+    global args, live, flight_builder, geofences, position_partitions, archive_sink, coverage_stats, rollup_counters
 
     log_config(args.verbose)
+    if args.metrics:
+        metrics.serve(args.metrics)
+    if args.live:
+        stream.serve(args.live)
+    profiling.install('skyshark_adsb_loader', args.profile_mode, args.profile_dir, args.profile, start=bool(args.profile))
     if args.db is None:
         args.db = config.mongo_url
     dbh = dbConnect(args.db)
+    if args.partition:
+        position_partitions = partitions.Partitioner(dbh, 'adsb_positions', args.partition, position_indexes)
+    if args.archive:
+        archive_sink = archive.ArchiveSink(args.archive, 'adsb_positions')
+
+    if args.geofences:
+        geofences = geofence.GeofenceEngine(geofence.load_fences(args.geofences),
+                                            sinks=[geofence.mongo_sink(dbh), lambda e: stream.publish('geofence', e)])
+    if args.batch and (args.flight_gap or args.coverage_interval or args.rollup_interval):
+        # per position, these cost more than the rest of a batch put together
+        logging.info("not building flights, coverage or rollups with --batch")
+        args.flight_gap = args.coverage_interval = args.rollup_interval = 0
+    if args.flight_gap:
+        flight_builder = flights.FlightBuilder(dbh, args.flight_gap * 60, registrations(dbh))
+    if args.coverage_interval:
+        locations = dict(args.sensor_locations)
+        if args.receiver:
+            locations[args.sensor] = args.receiver
+        coverage_stats = coverage.CoverageStats(dbh, locations, args.sensor, args.coverage_interval)
+    if args.rollup_interval:
+        rollup_counters = rollups.Rollups(dbh, args.rollup_interval)
+    if args.metrics:
+        live = livestate.LiveState(args.expire, registrations(dbh))
+        live.register()
+        metrics.routes['/tracks'] = simplify.http_tracks(dbh)
+        metrics.routes['/coverage'] = coverage.http_coverage(dbh, args.sensor)
+        if args.acars_stream:
+            host, _, port = args.acars_stream.rpartition(':')
+            t = threading.Thread(target=livestate.follow_acars, args=(live, host or 'localhost', int(port)))
+            t.daemon = True
+            t.start()
 
     icao_cache = load_icao_cache(args)
+    metrics.gauge('skyshark_icao_cache_size', 'entries in the ICAO to callsign cache', fn=lambda: len(icao_cache))
 
     if len(args.files):
+        if args.batch:
+            sbs_batch.require_numpy()
         do_file_io(icao_cache, dbh, args)
     else:
         do_network_io(icao_cache, dbh, args)
 
     
     save_icao_cache(args, icao_cache)
+    if flight_builder is not None:
+        flight_builder.flush()
+    if archive_sink is not None:
+        archive_sink.flush()
+    if coverage_stats is not None:
+        coverage_stats.flush()
+    if rollup_counters is not None:
+        rollup_counters.flush()
 
 if __name__ == '__main__':
     main()
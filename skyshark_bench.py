@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Ingest benchmarks for the loaders, run over the synthetic corpora in
+# bench/ (regenerate them with bench/make_corpus.py). Each loader is split
+# into parse, decode, enrich and write stages plus an end-to-end run of the
+# loader's own per-line entry point. Writes go to an in-process fake
+# collection unless a mongodb url is given.
+#
+# Save a baseline with --save, and compare a later run against it with
+# --compare; stages that got slower by more than --threshold are flagged
+# and the exit status is non-zero.
+
+import os
+import gc
+import csv
+import sys
+import json
+import gzip
+import logging
+import argparse
+import resource
+
+from replay import monotonic
+import fakemongo
+import storage
+
+try:
+    import tracemalloc
+except ImportError: # python2
+    tracemalloc = None
+
+corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench')
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def load_corpus(name):
+    fn = os.path.join(corpus_dir, name)
+    opener = gzip.open if fn.endswith('.gz') else open
+    with opener(fn, 'rb') as fd:
+        return fd.readlines()
+
+def cpu_time():
+    # getrusage() has microseconds where os.times() has clock ticks
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    return r.ru_utime + r.ru_stime
+
+def _status_kb(field):
+    with open('/proc/self/status') as fd:
+        for line in fd:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+def peak_memory(setup, run):
+    '''KiB that memory use grew by at most while run(setup()) ran, or None if that can't be told
+
+    Without tracemalloc (python2) run() goes in a forked child, whose
+    resident set high-water mark is reset after setup() through
+    /proc/self/clear_refs, so each stage starts from its own baseline.
+    '''
+    if tracemalloc is not None:
+        arg = setup()
+        tracemalloc.start()
+        run(arg)
+        peak = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+        return peak
+    if not hasattr(os, 'fork') or not os.path.exists('/proc/self/clear_refs'):
+        return None
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r)
+            arg = setup()
+            gc.collect()
+            with open('/proc/self/clear_refs', 'w') as fd:
+                fd.write('5')
+            base = _status_kb('VmRSS')
+            run(arg)
+            os.write(w, str(_status_kb('VmHWM') - base))
+        except Exception as e:
+            logging.debug("measuring memory: %s", e)
+        finally:
+            os._exit(0)
+    os.close(w)
+    data = os.read(r, 64)
+    os.close(r)
+    os.waitpid(pid, 0)
+    return float(data) if data else None
+
+def measure(setup, run, repeat=3):
+    '''time run(setup()) a few times, keeping the best, then once more to find peak memory
+
+    run() returns the number of messages it handled.
+    '''
+    best = None
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        t0, c0 = monotonic(), cpu_time()
+        n = run(arg)
+        wall, cpu = monotonic() - t0, cpu_time() - c0
+        if best is None or wall < best[1]:
+            best = (n, wall, cpu)
+
+    n, wall, cpu = best
+    return {'messages': n,
+            'seconds': wall,
+            'msgs_per_sec': n / wall if wall > 0 else 0.0,
+            'cpu_us_per_msg': 1e6 * cpu / n if n else 0.0,
+            'peak_kb': peak_memory(setup, run)}
+
+def bench_adsb(new_db, repeat):
+    import skyshark_adsb_loader as adsb
+    lines = load_corpus('sbs1.txt.gz')[1:] # open_datafile() skips the first line
+    rows = list(csv.DictReader(lines, adsb.fields))
+    idents = [r for r in rows if r['transmission_type'] == '1']
+    positions = [r for r in rows if r['transmission_type'] in ['2', '3']]
+
+    cache = {}
+    for r in idents:
+        adsb.process_ident(cache, fakemongo.NullDatabase(), dict(r))
+    records = []
+    for r in positions:
+        r = dict(r)
+        adsb.resolve_icao(cache, r)
+        records.append(adsb.position_record(r))
+
+    def parse(arg):
+        return len(list(csv.DictReader(arg, adsb.fields)))
+
+    def decode(arg):
+        c = {}
+        null = fakemongo.NullDatabase()
+        for r in arg:
+            if r['transmission_type'] == '1':
+                adsb.process_ident(c, null, r)
+            else:
+                adsb.position_record(r)
+        return len(arg)
+
+    def enrich(arg):
+        for r in arg:
+            adsb.resolve_icao(cache, r)
+        return len(arg)
+
+    def write(dbh):
+        for ident in cache.values():
+            adsb.store_ident(dbh, ident)
+        for rv in records:
+            adsb.store_position(dbh, dict(rv))
+        return len(cache) + len(records)
+
+    def end_to_end(arg):
+        c, dbh = {}, new_db()
+        for r in arg:
+            adsb.handle_line(c, dbh, r)
+        return len(arg)
+
+    copies = lambda src: lambda: [dict(r) for r in src]
+    return [('parse', measure(lambda: lines, parse, repeat)),
+            ('decode', measure(copies(idents + positions), decode, repeat)),
+            ('enrich', measure(copies(positions), enrich, repeat)),
+            ('write', measure(new_db, write, repeat)),
+            ('end_to_end', measure(copies(rows), end_to_end, repeat))]
+
+def bench_acars(new_db, repeat):
+    import skyshark_acars_loader as acars
+    from airlines import airline_resolver, resolve_flight
+    from skyshark_metadata_loader import parse_airlines
+
+    lines = load_corpus('acars.json.gz')
+    meta = fakemongo.FakeDatabase()
+    for a in parse_airlines(load_corpus('airlines.sql')):
+        meta.airline_info.insert_one(a)
+    airlines = airline_resolver(meta)
+
+    msgs = [json.loads(l) for l in lines]
+    decoded = []
+    for m in msgs:
+        m = dict(m)
+        if acars.process_acars(m, airlines):
+            decoded.append(m)
+
+    def parse(arg):
+        for l in arg:
+            json.loads(l)
+        return len(arg)
+
+    def decode(arg):
+        for m in arg:
+            acars.process_acars(m, airlines)
+        return len(arg)
+
+    def enrich(arg):
+        for m in arg:
+            resolve_flight(airlines, m.get('flight', '').strip())
+        return len(arg)
+
+    def write(dbh):
+        for m in decoded:
+            acars.store_acars(dbh, dict(m))
+        return len(decoded)
+
+    def end_to_end(dbh):
+        for l in lines:
+            acars.line_handler(dbh, l, airlines)
+        return len(lines)
+
+    return [('parse', measure(lambda: lines, parse, repeat)),
+            ('decode', measure(lambda: [dict(m) for m in msgs], decode, repeat)),
+            ('enrich', measure(lambda: msgs, enrich, repeat)),
+            ('write', measure(new_db, write, repeat)),
+            ('end_to_end', measure(new_db, end_to_end, repeat))]
+
+def bench_regdb(new_db, repeat):
+    import skyshark_regdb_loader as regdb
+    lines = load_corpus('MASTER.txt.gz')
+    lines[0] = lines[0][3:] # byte-order mark
+
+    def rows():
+        reader = csv.DictReader(lines)
+        regdb.fix_field_names(reader)
+        return list(reader)
+
+    cleaned = rows()
+    for r in cleaned:
+        regdb.clean_record(r, 'MASTER')
+
+    def parse(arg):
+        return len(rows())
+
+    def decode(arg):
+        for r in arg:
+            regdb.clean_record(r, 'MASTER')
+        return len(arg)
+
+    def write(dbh):
+        for r in cleaned:
+            dbh['MASTER'].insert(dict(r))
+        return len(cleaned)
+
+    def end_to_end(dbh):
+        n = 0
+        for r in rows():
+            regdb.clean_record(r, 'MASTER')
+            dbh['MASTER'].insert(r)
+            n += 1
+        return n
+
+    return [('parse', measure(lambda: None, parse, repeat)),
+            ('decode', measure(rows, decode, repeat)),
+            ('write', measure(new_db, write, repeat)),
+            ('end_to_end', measure(new_db, end_to_end, repeat))]
+
+def bench_metadata(new_db, repeat):
+    import skyshark_metadata_loader as meta
+    from airlines import airline_resolver
+    airline_lines = load_corpus('airlines.sql')
+    airport_lines = load_corpus('airport-codes.csv')
+    airlines = list(meta.parse_airlines(airline_lines))
+    airports = list(csv.DictReader(airport_lines))
+    for a in airports:
+        meta.clean_airport(a)
+
+    def parse(arg):
+        return len(list(meta.parse_airlines(airline_lines))) + len(list(csv.DictReader(airport_lines)))
+
+    def decode(arg):
+        for a in arg:
+            meta.clean_airport(a)
+        return len(arg)
+
+    def write(dbh):
+        for a in airlines:
+            selector = {'iata': a['iata'], 'icao': a['icao'], 'callsign': a['callsign']}
+            dbh['airline_info'].update_one(selector, {'$set': a}, upsert=True)
+        for a in airports:
+            dbh['airport_info'].update_one({'_id': a['_id']}, {'$set': a}, upsert=True)
+        return len(airlines) + len(airports)
+
+    def enrich(dbh):
+        airline_resolver(dbh)
+        return len(airlines)
+
+    def populated():
+        dbh = new_db()
+        write(dbh)
+        return dbh
+
+    return [('parse', measure(lambda: None, parse, repeat)),
+            ('decode', measure(lambda: [dict(a) for a in csv.DictReader(airport_lines)], decode, repeat)),
+            ('enrich', measure(populated, enrich, repeat)),
+            ('write', measure(new_db, write, repeat))]
+
+benchmarks = [('adsb', bench_adsb), ('acars', bench_acars), ('regdb', bench_regdb), ('metadata', bench_metadata)]
+
+def compare(results, baseline, threshold):
+    '''return the names of stages whose throughput dropped by more than threshold'''
+    regressions = []
+    for name, r in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None or not old['msgs_per_sec']:
+            continue
+        change = r['msgs_per_sec'] / old['msgs_per_sec'] - 1.0
+        r['change'] = change
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    descr = 'benchmark skyshark ingest stages'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='benchmark writes against this MongoDB, or a sqlite: database, instead of a fake collection')
+    parser.add_argument('-n', '--repeat', dest='repeat', type=int, metavar='N', default=3, help='runs per stage, best is kept')
+    parser.add_argument('-s', '--save', dest='save', metavar='FILE', default=None, help='save results as a baseline')
+    parser.add_argument('-c', '--compare', dest='compare', metavar='FILE', default=None, help='compare against a saved baseline')
+    parser.add_argument('-t', '--threshold', dest='threshold', type=float, metavar='FRAC', default=0.10, help='throughput loss flagged as a regression')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    parser.add_argument(dest='only', metavar='LOADER', nargs='*', help='only run these benchmarks: ' + ', '.join(b[0] for b in benchmarks))
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+
+    client = None
+    if storage.is_sqlite(args.db):
+        import skyshark_adsb_loader, skyshark_acars_loader
+        current = []
+        def new_db():
+            # a forked child measuring memory must leave the parent's connection alone
+            if current:
+                pid, dbh = current.pop()
+                if pid == os.getpid():
+                    dbh.close()
+            path = storage.sqlite_path(args.db)
+            for fn in [path, path + '-wal', path + '-shm']:
+                if os.path.exists(fn):
+                    os.unlink(fn)
+            # the loaders' indexes, without which every upsert is a scan
+            dbh = skyshark_adsb_loader.dbConnect(args.db)
+            skyshark_acars_loader.acars_indexes(dbh['acars'])
+            current.append((os.getpid(), dbh))
+            return dbh
+    elif args.db:
+        import pymongo
+        client = pymongo.MongoClient(args.db)
+        def new_db():
+            client.drop_database('skyshark_bench')
+            return client['skyshark_bench']
+    else:
+        new_db = fakemongo.FakeDatabase
+
+    results = {}
+    for name, fn in benchmarks:
+        if args.only and name not in args.only:
+            continue
+        logging.info("running %s benchmarks", name)
+        for stage, r in fn(new_db, args.repeat):
+            results['{}.{}'.format(name, stage)] = r
+
+    if client is not None:
+        client.drop_database('skyshark_bench')
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd)['results'], args.threshold)
+
+    print('{:<22} {:>8} {:>12} {:>12} {:>12} {:>8}'.format('stage', 'msgs', 'msgs/s', 'cpu us/msg', 'peak KiB', 'change'))
+    for name, r in sorted(results.items()):
+        change = '{:+.1%}'.format(r['change']) if 'change' in r else ''
+        flag = ' REGRESSION' if name in regressions else ''
+        peak = '{:.0f}'.format(r['peak_kb']) if r['peak_kb'] is not None else '-'
+        print('{:<22} {:>8} {:>12.0f} {:>12.2f} {:>12} {:>8}{}'.format(
+            name, r['messages'], r['msgs_per_sec'], r['cpu_us_per_msg'], peak, change, flag))
+
+    if args.save:
+        with open(args.save, 'w') as fd:
+            json.dump({'backend': args.db or 'fake', 'python': sys.version.split()[0], 'results': results}, fd, indent=1, sort_keys=True)
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
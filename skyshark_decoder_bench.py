@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Golden corpus check and microbenchmark for decoders.py.
+#
+# bench/decoders.json holds message texts per decoder together with what
+# the decoder is expected to add to the message. Every run checks the
+# decoders against it, then reports per-decoder throughput and the slowest
+# corpus input, and times each decoder on synthetic inputs of growing
+# length that almost match its regexes. A decoder whose time grows faster
+# than linearly with input length, or that is slow on any single input, is
+# flagged. After an intentional change in decoder output, regenerate the
+# expectations with --update and review the diff.
+#
+# Texts from a real capture (acarsdec JSON, optionally compressed) can be
+# scanned with --scan to find inputs that take disproportionately long.
+
+import os
+import sys
+import json
+import math
+import logging
+import argparse
+from datetime import datetime
+
+import inputs
+from replay import monotonic
+import decoders
+
+golden_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench', 'decoders.json')
+
+# Inputs that nearly match each decoder, as (prefix, repeated unit, suffix).
+# Repeating the unit makes the regex engine retry from many positions and
+# exposes backtracking that is more than linear in the input length.
+adversarial = {
+    'decode_SA': [('', '0AB12345', ''), ('0EV123456V', '\n', '')],
+    'decode_SQ': [('', '02' + '1' * 4 + 'N', ''), ('', '024235N07112WV', '')],
+    'decode_5Z': [('/B6 ', 'KBOS R', ''), ('/B6 ', 'K', '')],
+    'decode_15': [('', '(2N12345W123456', ''), ('(2N12345W123456', 'OFF', '(')],
+    'decode_16_autpos': [('', '1/AUTPOS/LLD N1 W1 ', ''), ('1/AUTPOS/LLD N1 W1', ' ', '/ALT')],
+    'decode_16_weather': [('', 'N 1', ''), ('', 'N1', '')],
+    'decode_colonsemi': [('', '1', 'x')],
+}
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def normalize(v):
+    '''make decoder output comparable with what json can store'''
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, float):
+        return round(v, 6)
+    return v
+
+def run_decoder(name, text):
+    '''apply a decoder to a bare message, returning (result, fields it added or changed)'''
+    msg = {'label': '', 'text': text}
+    before = dict(msg)
+    try:
+        result = getattr(decoders, name)(msg)
+    except Exception as e:
+        return 'raised ' + type(e).__name__, {}
+    changed = dict((k, normalize(v)) for k, v in msg.items() if before.get(k, None) != v)
+    return result, changed
+
+def load_golden():
+    with open(golden_file) as fd:
+        return json.load(fd)
+
+def check_golden(corpus, update=False):
+    failures = 0
+    for case in corpus:
+        result, changed = run_decoder(case['decoder'], case['text'])
+        if update:
+            case['result'] = result
+            case['expect'] = changed
+            continue
+        # round-trip through json so unicode/str and int/float compare equal
+        changed = json.loads(json.dumps(changed))
+        if result != case['result'] or changed != case['expect']:
+            failures += 1
+            logging.error("%s(%r): got %r %r, expected %r %r", case['decoder'], case['text'],
+                          result, changed, case['result'], case['expect'])
+    return failures
+
+def time_call(name, text, n):
+    fn = getattr(decoders, name)
+    t0 = monotonic()
+    for _ in range(n):
+        try:
+            fn({'label': '', 'text': text})
+        except Exception:
+            pass
+    return (monotonic() - t0) / n
+
+def throughput(corpus, seconds=0.2):
+    '''per decoder messages/second over its corpus inputs, and its slowest input'''
+    by_decoder = {}
+    for case in corpus:
+        by_decoder.setdefault(case['decoder'], []).append(case['text'])
+
+    rv = {}
+    for name, texts in sorted(by_decoder.items()):
+        per_input = [(time_call(name, t, 200), t) for t in texts]
+        mean = sum(p[0] for p in per_input) / len(per_input)
+        reps = max(1, int(seconds / (mean * len(texts)))) if mean > 0 else 1
+        t0 = monotonic()
+        for _ in range(reps):
+            for t in texts:
+                time_call(name, t, 1)
+        elapsed = monotonic() - t0
+        worst = max(per_input)
+        rv[name] = {'msgs_per_sec': reps * len(texts) / elapsed, 'worst_us': worst[0] * 1e6,
+                    'worst_text': worst[1], 'median_us': sorted(p[0] for p in per_input)[len(per_input) // 2] * 1e6}
+    return rv
+
+def growth(name, prefix, unit, suffix, sizes=(256, 512, 1024, 2048, 4096)):
+    '''time a decoder on inputs of increasing length, returning (timings, growth exponent)'''
+    timings = []
+    for size in sizes:
+        text = prefix + unit * (size // len(unit)) + suffix
+        n = 3 if size > 1024 else 10
+        timings.append((len(text), time_call(name, text, n)))
+    (l1, t1), (l2, t2) = timings[-2], timings[-1]
+    exponent = math.log(max(t2, 1e-9) / max(t1, 1e-9)) / math.log(float(l2) / l1)
+    return timings, exponent
+
+def scan_capture(fn, factor, limit_us):
+    '''time every decodable message of a capture and report the slow ones'''
+    timings = {}
+    with inputs.open_input(fn) as fd:
+        for line in fd:
+            try:
+                msg = json.loads(line)
+                name = decoders.label_decoders[msg['label'].upper()].__name__
+            except (ValueError, KeyError, AttributeError):
+                continue
+            timings.setdefault(name, []).append((time_call(name, msg.get('text', ''), 3), msg.get('text', '')))
+
+    slow = 0
+    for name, t in sorted(timings.items()):
+        median = sorted(x[0] for x in t)[len(t) // 2]
+        for elapsed, text in t:
+            if elapsed > factor * median and elapsed * 1e6 > limit_us:
+                slow += 1
+                logging.warning("%s took %.1fus (median %.1fus) on %r", name, elapsed * 1e6, median * 1e6, text[:200])
+    return slow
+
+def main():
+    descr = 'check and benchmark the ACARS decoders'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-u', '--update', dest='update', action='store_true', default=False, help='rewrite the expected output in the golden corpus')
+    parser.add_argument('-e', '--exponent', dest='exponent', type=float, metavar='X', default=1.5, help='flag decoders whose time grows faster than length**X')
+    parser.add_argument('-l', '--limit', dest='limit', type=float, metavar='US', default=1000, help='flag any single input slower than this many microseconds')
+    parser.add_argument('-s', '--scan', dest='scan', metavar='FILE', default=None, help='look for slow inputs in an acarsdec JSON capture')
+    parser.add_argument('-f', '--factor', dest='factor', type=float, metavar='X', default=20, help='with --scan, flag inputs this many times slower than the median')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+
+    corpus = load_golden()
+    if args.update:
+        check_golden(corpus, update=True)
+        with open(golden_file, 'w') as fd:
+            json.dump(corpus, fd, indent=1, sort_keys=True)
+            fd.write('\n')
+        logging.warning("updated %d expectations in %s", len(corpus), golden_file)
+        return
+
+    failures = check_golden(corpus)
+    flagged = []
+
+    print('{:<20} {:>12} {:>10} {:>10}  {}'.format('decoder', 'msgs/s', 'median us', 'worst us', 'worst input'))
+    for name, r in sorted(throughput(corpus).items()):
+        print('{:<20} {:>12.0f} {:>10.1f} {:>10.1f}  {!r}'.format(name, r['msgs_per_sec'], r['median_us'], r['worst_us'], r['worst_text'][:40]))
+        if r['worst_us'] > args.limit:
+            flagged.append(name)
+
+    print('')
+    print('{:<20} {:>8} {:>10}  {}'.format('decoder', 'length', 'us', 'growth'))
+    for name, cases in sorted(adversarial.items()):
+        for prefix, unit, suffix in cases:
+            timings, exponent = growth(name, prefix, unit, suffix)
+            length, t = timings[-1]
+            bad = exponent > args.exponent or t * 1e6 > args.limit
+            print('{:<20} {:>8} {:>10.1f}  n^{:.2f}{}  {!r}'.format(name, length, t * 1e6, exponent,
+                                                                    ' PATHOLOGICAL' if bad else '', (prefix + unit)[:30]))
+            if bad:
+                flagged.append(name)
+
+    if args.scan:
+        if scan_capture(args.scan, args.factor, args.limit / 10.0):
+            flagged.append('scan')
+
+    if failures:
+        logging.error("%d golden corpus mismatches", failures)
+    if flagged:
+        logging.warning("slow decoders: %s", ', '.join(sorted(set(flagged))))
+    if failures or flagged:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
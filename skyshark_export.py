@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Export positions and ACARS messages into the columnar archive described
+# in archive.py. Each run picks up where the last one stopped, so it can
+# be run from cron; documents newer than --settle seconds are left for the
+# next run since the loaders may still be writing them.
+
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import config
+import storage
+import archive
+import partitions
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def export(dbh, outdir, kind, start, end, fmt='parquet', batch=65536, compression='snappy'):
+    '''archive documents of `kind` with start <= time < end, returning the number written'''
+    time_field = archive.schemas[kind][0]
+    total = 0
+    for lo, hi in archive.days(start, end):
+        f = None
+        buf = archive.ColumnBuffer(kind)
+        for doc in partitions.find(dbh, kind, lo, hi, time_field=time_field):
+            buf.add(doc)
+            if buf.rows >= batch:
+                if f is None:
+                    f = archive.ArchiveFile(outdir, kind, lo, fmt, compression)
+                f.write(buf)
+        if buf.rows and f is None:
+            f = archive.ArchiveFile(outdir, kind, lo, fmt, compression)
+        if f is not None:
+            f.write(buf)
+            f.close(hi)
+            total += f.rows
+        archive.write_watermark(outdir, kind, hi)
+    return total
+
+def main():
+    descr = 'export positions and ACARS messages to Parquet or Arrow files'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
+    parser.add_argument('-o', '--output', dest='output', metavar='DIR', required=True, help='archive directory')
+    parser.add_argument('-k', '--kind', dest='kinds', choices=sorted(archive.schemas), action='append', default=None, help='what to export, may be repeated (default: all)')
+    parser.add_argument('-f', '--format', dest='format', choices=sorted(archive.formats), default='parquet', help='file format')
+    parser.add_argument('-z', '--compression', dest='compression', default='snappy', help='parquet compression codec')
+    parser.add_argument('-s', '--since', dest='since', metavar='YYYY-MM-DD', default=None, help='start here rather than at the watermark, or the oldest document if there is none')
+    parser.add_argument('-u', '--until', dest='until', metavar='YYYY-MM-DD', default=None, help='stop here rather than at the present')
+    parser.add_argument('-S', '--settle', dest='settle', type=float, metavar='SECONDS', default=300, help='leave documents this recent for the next run')
+    parser.add_argument('-B', '--batch', dest='batch', type=int, metavar='ROWS', default=65536, help='rows per row group')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+    archive.require_pyarrow()
+    if args.db is None:
+        args.db = config.mongo_url
+    dbh = storage.connect(args.db)
+
+    end = (datetime.utcnow() - timedelta(seconds=args.settle)).replace(microsecond=0)
+    if args.until:
+        end = min(end, datetime.strptime(args.until, '%Y-%m-%d'))
+    for kind in args.kinds or sorted(archive.schemas):
+        if args.since:
+            start = datetime.strptime(args.since, '%Y-%m-%d')
+        else:
+            start = archive.read_watermark(args.output, kind)
+            if start is None:
+                start = partitions.earliest(dbh, kind, archive.schemas[kind][0])
+        if start is None:
+            logging.warning("nothing to export in %s", kind)
+            continue
+        start = start.replace(microsecond=0)
+        logging.info("exporting %s from %s to %s", kind, start, end)
+        n = export(dbh, args.output, kind, start, end, args.format, args.batch, args.compression)
+        logging.warning("exported %d %s documents", n, kind)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Edge-side store-and-forward for a sensor. Receives acarsdec JSON by UDP
+# and/or reads SBS1 from the local dump1090, spools it to disk in
+# compressed batches, and ships the batches to the aggregator's loaders
+# (started with -F) over TCP. Nothing is lost while the backhaul is down
+# unless the spool fills up; the backlog is sent at a limited rate once the
+# link comes back.
+#
+#   acarsdec -j localhost:5555 ...
+#   skyshark_forwarder.py -H collector.example.com -s localhost
+
+import os
+import socket
+import logging
+import argparse
+import threading
+from time import sleep
+from daemonize import Daemonize
+
+import metrics
+import spool
+from replay import monotonic
+
+args = None
+
+received = metrics.counter('skyshark_forwarder_received_total', 'messages received for forwarding', ['stream'])
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+class Batcher(object):
+    '''collect messages and spool them every `size` messages or `interval` seconds'''
+    def __init__(self, spool, size, interval):
+        self.spool = spool
+        self.size = size
+        self.interval = interval
+        self.lines = []
+        self.started = None
+        self.lock = threading.Lock()
+
+    def add(self, line):
+        received.inc(self.spool.stream)
+        with self.lock:
+            if not self.lines:
+                self.started = monotonic()
+            self.lines.append(line)
+            if len(self.lines) >= self.size:
+                self._flush()
+
+    def _flush(self):
+        if self.lines:
+            self.spool.append(self.lines)
+            self.lines = []
+
+    def flusher(self):
+        '''spool partial batches once they are old enough'''
+        while True:
+            sleep(self.interval / 4.0)
+            with self.lock:
+                if self.lines and monotonic() - self.started >= self.interval:
+                    self._flush()
+
+def acars_input(batcher, bind, port):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    s.bind((socket.gethostbyname(bind), port))
+    logging.info("listening for acarsdec on %s:%d", bind, port)
+    while True:
+        line = s.recv(4096).strip()
+        if line:
+            batcher.add(line)
+
+def sbs_input(batcher, server, port):
+    while True:
+        try:
+            fd = socket.create_connection((server, port)).makefile('rb')
+        except socket.error as e:
+            logging.warning("connecting to %s:%d: %s", server, port, e)
+            sleep(5)
+            continue
+        logging.info("reading SBS1 from %s:%d", server, port)
+        try:
+            for line in fd:
+                line = line.strip()
+                if line:
+                    batcher.add(line)
+        except socket.error as e:
+            logging.warning("reading from %s:%d: %s", server, port, e)
+        logging.info("SBS1 EOF - reconnecting")
+        sleep(1)
+
+def start(fn, *a):
+    t = threading.Thread(target=fn, args=a)
+    t.daemon = True
+    t.start()
+    return t
+
+def main():
+    '''Wrapper main(), just enough to decide to daemonize or not'''
+    global args
+
+    descr = 'spool ACARS and SBS1 messages on a sensor and forward them to the aggregator'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-H', '--host', dest='host', metavar='HOST', required=True, help='aggregator running the loaders')
+    parser.add_argument('-n', '--name', dest='name', metavar='NAME', default=socket.gethostname(), help='name of this sensor')
+    parser.add_argument('-b', '--bind', dest='bind', metavar='IP', default='localhost', help='address to receive acarsdec JSON on')
+    parser.add_argument('-p', '--port', dest='port', type=int, metavar='PORT', default=5555, help='UDP port to receive acarsdec JSON on, 0 to disable')
+    parser.add_argument('-s', '--sbs', dest='server', metavar='SERVER', default=None, help='dump1090 to read SBS1 from')
+    parser.add_argument('-P', '--sbs-port', dest='sbs_port', type=int, metavar='PORT', default=30003, help='SBS1 port')
+    parser.add_argument('--acars-dest', dest='acars_dest', type=int, metavar='PORT', default=5556, help='port of the ACARS loader\'s forwarder listener')
+    parser.add_argument('--sbs-dest', dest='sbs_dest', type=int, metavar='PORT', default=30004, help='port of the ADS-B loader\'s forwarder listener')
+    parser.add_argument('-S', '--spool', dest='spool', metavar='DIR', default='/var/tmp/skyshark', help='spool directory')
+    parser.add_argument('-l', '--limit', dest='limit', type=int, metavar='MB', default=256, help='maximum size of each spool')
+    parser.add_argument('-B', '--batch', dest='batch', type=int, metavar='N', default=200, help='messages per batch')
+    parser.add_argument('-i', '--interval', dest='interval', type=float, metavar='SECONDS', default=1.0, help='longest a message waits for its batch to fill')
+    parser.add_argument('-r', '--rate', dest='rate', type=float, metavar='KB/S', default=128, help='limit on backhaul use, 0 for none')
+    parser.add_argument('-M', '--metrics', dest='metrics', type=int, metavar='PORT', default=None, help='serve Prometheus metrics on this port')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    parser.add_argument('-d', '--daemon', dest='daemon', action='store_true', default=False, help='detach from controlling terminal')
+    args = parser.parse_args()
+
+    if not args.port and not args.server:
+        parser.error('nothing to forward: give an acarsdec port and/or an SBS1 server')
+
+    if args.daemon:
+        procname='skyshark_forwarder'
+        pidfile='/tmp/{}.pid'.format(procname)
+        daemon = Daemonize(app=procname, pid=pidfile, action=skyshark_forwarder)
+        daemon.start()
+    else:
+        skyshark_forwarder()
+
+def skyshark_forwarder():
+    global args
+
+    log_config(args.verbose)
+    if args.metrics:
+        metrics.serve(args.metrics)
+
+    rate = args.rate * 1024 if args.rate else None
+    streams = []
+    if args.port:
+        streams.append(('acars', args.acars_dest, acars_input, (args.bind, args.port)))
+    if args.server:
+        streams.append(('sbs', args.sbs_dest, sbs_input, (args.server, args.sbs_port)))
+
+    for name, dest, reader, reader_args in streams:
+        sp = spool.Spool(os.path.join(args.spool, name), name, args.limit << 20)
+        batcher = Batcher(sp, args.batch, args.interval)
+        start(batcher.flusher)
+        start(reader, batcher, *reader_args)
+        start(spool.ship, sp, args.host, dest, args.name, rate)
+        logging.info("forwarding %s to %s:%d", name, args.host, dest)
+
+    try:
+        while True:
+            sleep(60)
+    except KeyboardInterrupt:
+        logging.info("Caught ^C - shutting down")
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,11 @@
 # vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
 
 import json
-from time import sleep
 import logging
-import bz2
-import gzip
 import argparse
 import socket
+import inputs
+from replay import paced, ReplayStats
 
 def log_config(lvl):
     logging_format = '%(levelname)s: %(message)s'
@@ -18,6 +17,15 @@ def log_config(lvl):
     else:
         logging.basicConfig(format=logging_format, level=logging.WARN)
 
+def read_events(fd):
+    '''yield (timestamp, line) from an acarsdec JSON log; unparseable lines get no timestamp'''
+    for line in fd:
+        try:
+            ts = float(json.loads(line)['timestamp'])
+        except (ValueError, KeyError, TypeError):
+            ts = None
+        yield ts, line
+
 def main():
     descr = 'replay acarsdec JSON log'
     parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -25,7 +33,9 @@ def main():
     parser.add_argument('-d', '--dest',    dest='dest', type=str,   metavar='IP', default='localhost', help='destination host')
     parser.add_argument('-p', '--port',    dest='port', type=int,   metavar='PORT', default=5555, help='destination port')
     parser.add_argument('-r', '--rate',    dest='rate', type=float, metavar='RATE', default=1, help='scale replay rate')
-    parser.add_argument('-q', '--quick',   dest='quick', action='store_true', default=False, help='scale replay rate')
+    parser.add_argument('-q', '--quick',   dest='quick', action='store_true', default=False, help='send as fast as possible')
+    parser.add_argument('-M', '--mps',     dest='mps', type=float, metavar='MPS', default=None, help='ignore timestamps and send this many messages per second')
+    parser.add_argument('-b', '--batch',   dest='batch', type=int, metavar='N', default=64, help='maximum messages sent back to back when behind schedule')
     parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
     args = parser.parse_args()
 
@@ -36,40 +46,16 @@ def main():
     logging.info("sending to %s:%d (%s)", ip, args.port, args.dest)
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
     
-    if args.file.lower().endswith('.bz2'):
-        fd = bz2.BZ2File(args.file, 'r')
-    elif args.file.lower().endswith('.gz'):
-        fd = gzip.open(args.file)
-    else:
-        fd = open(args.file, 'rU')
-    
-    line = fd.readline()
-    if args.quick is False:
-        parsed = json.loads(line)
-        last_time = float(parsed['timestamp'])
+    fd = inputs.open_input(args.file)
 
-    while True:
-        if line:
+    stats = ReplayStats(args.mps)
+    for batch in paced(read_events(fd), args.rate, args.mps, args.quick, args.batch, stats):
+        for line in batch:
             s.sendto(line, dest)
-            logging.debug("%s", line.strip())
-        else:
-            logging.info("EOF")
-            exit(0)
-
-        line = fd.readline()
-
-        if args.quick is False:
-            try:
-                parsed = json.loads(line)
-            except ValueError:
-                continue
+        logging.debug("sent %d", len(batch))
 
-            next_time = float(parsed['timestamp'])
-            sleep_time = (next_time - last_time) / args.rate
-            sleep_time = sleep_time if sleep_time >= 0 else -sleep_time
-            last_time = next_time
-            logging.info("sleep %fs", sleep_time)
-            sleep(sleep_time)
+    logging.info("EOF")
+    stats.log_report()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Multiply recorded ACARS JSON and SBS1 captures into N virtual sensors to
+# see how the loaders hold up with many receivers. Each virtual sensor has
+# its own station_id and clock offset; each message is heard by one sensor
+# and duplicated to others with some probability, with jittered signal
+# level and arrival time. The generated traffic only depends on the inputs
+# and --seed, so benchmark runs are comparable.
+#
+# ACARS is sent by UDP like acarsdec -j; each sensor's SBS1 feed is served
+# on its own TCP port (--sbs-port + sensor number) like dump1090.
+
+import json
+import logging
+import argparse
+import random
+import socket
+import threading
+from datetime import datetime
+from time import sleep
+from replay import paced, ReplayStats
+import inputs
+from skyshark_sbs_replay import sbs_time
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def make_sensors(n, rng, skew):
+    '''describe n virtual sensors, each with a clock offset and a signal level bias'''
+    return [{'index': i,
+             'station_id': 'loadgen{:02d}'.format(i),
+             'offset': rng.uniform(-skew, skew),
+             'level': rng.uniform(-10.0, 0.0)} for i in range(n)]
+
+def receivers(rng, sensors, dup_prob):
+    '''pick the sensors that hear a message: one for sure, others with probability dup_prob'''
+    first = rng.randrange(len(sensors))
+    rv = [sensors[first]]
+    for s in sensors:
+        if s['index'] != first and rng.random() < dup_prob:
+            rv.append(s)
+    return rv
+
+def acars_events(files, sensors, rng, dup_prob, jitter):
+    for fn in files:
+        logging.info("loading ACARS from %s", fn)
+        for line in inputs.open_input(fn):
+            try:
+                msg = json.loads(line)
+                ts = float(msg['timestamp'])
+            except (ValueError, KeyError, TypeError):
+                continue
+            for s in receivers(rng, sensors, dup_prob):
+                m = dict(msg)
+                m['station_id'] = s['station_id']
+                m['timestamp'] = round(ts + s['offset'] + rng.uniform(0, jitter), 6)
+                m['level'] = round(float(msg.get('level', -20)) + s['level'] + rng.gauss(0, 1), 1)
+                yield m['timestamp'], 'acars', s['index'], json.dumps(m, sort_keys=True) + '\n'
+
+def sbs_events(files, sensors, rng, dup_prob, jitter):
+    for fn in files:
+        logging.info("loading SBS1 from %s", fn)
+        for line in inputs.open_input(fn):
+            fields = line.rstrip('\r\n').split(',')
+            if len(fields) < 22 or fields[0] != 'MSG':
+                continue
+            try:
+                ts = sbs_time(fields[6], fields[7])
+            except ValueError:
+                continue
+            for s in receivers(rng, sensors, dup_prob):
+                f = fields[:]
+                t = ts + s['offset'] + rng.uniform(0, jitter)
+                d = datetime.fromtimestamp(t)
+                f[6] = f[8] = d.strftime('%Y/%m/%d')
+                f[7] = f[9] = d.strftime('%H:%M:%S.%f')[:-3]
+                yield t, 'sbs', s['index'], ','.join(f) + '\r\n'
+
+def generate(args):
+    '''build the complete, time ordered list of (timestamp, kind, sensor, payload)'''
+    rng = random.Random(args.seed)
+    sensors = make_sensors(args.sensors, rng, args.skew)
+    events = list(acars_events(args.acars, sensors, rng, args.dup_prob, args.jitter))
+    events.extend(sbs_events(args.sbs, sensors, rng, args.dup_prob, args.jitter))
+    events.sort(key=lambda e: (e[0], e[1], e[2]))
+    logging.info("generated %d messages for %d sensors", len(events), len(sensors))
+    return sensors, events
+
+def serve_sbs(bind, port):
+    '''listen for SBS1 clients in the background, returning the (live) list of clients'''
+    clients = []
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((bind, port))
+    s.listen(5)
+
+    def accept():
+        while True:
+            c, addr = s.accept()
+            logging.info("SBS1 client on port %d from %s:%d", port, addr[0], addr[1])
+            clients.append(c)
+
+    t = threading.Thread(target=accept)
+    t.daemon = True
+    t.start()
+    return clients
+
+def send_sbs(clients, data):
+    for c in clients[:]:
+        try:
+            c.sendall(data)
+        except socket.error as e:
+            logging.info("dropping SBS1 client: %s", e)
+            c.close()
+            clients.remove(c)
+
+def main():
+    descr = 'generate multi-sensor ACARS and SBS1 traffic from captures'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-a', '--acars',   dest='acars', metavar='FILE', action='append', default=[], help='acarsdec JSON capture, may be repeated')
+    parser.add_argument('-s', '--sbs',     dest='sbs', metavar='FILE', action='append', default=[], help='SBS1 capture, may be repeated')
+    parser.add_argument('-n', '--sensors', dest='sensors', type=int, metavar='N', default=20, help='number of virtual sensors')
+    parser.add_argument('-S', '--seed',    dest='seed', type=int, metavar='SEED', default=0, help='random seed')
+    parser.add_argument('--dup',           dest='dup_prob', type=float, metavar='P', default=0.3, help='probability that another sensor also hears a message')
+    parser.add_argument('--skew',          dest='skew', type=float, metavar='SEC', default=0.5, help='maximum sensor clock offset')
+    parser.add_argument('--jitter',        dest='jitter', type=float, metavar='SEC', default=0.05, help='maximum arrival time jitter of duplicates')
+    parser.add_argument('-d', '--dest',    dest='dest', type=str, metavar='IP', default='localhost', help='ACARS loader host')
+    parser.add_argument('-p', '--port',    dest='port', type=int, metavar='PORT', default=5555, help='ACARS loader UDP port')
+    parser.add_argument('-b', '--bind',    dest='bind', type=str, metavar='IP', default='localhost', help='address for the SBS1 listeners')
+    parser.add_argument('-P', '--sbs-port', dest='sbs_port', type=int, metavar='PORT', default=30003, help='SBS1 port of the first sensor')
+    parser.add_argument('-w', '--wait',    dest='wait', type=int, metavar='N', default=0, help='wait for N SBS1 clients before starting')
+    parser.add_argument('-r', '--rate',    dest='rate', type=float, metavar='RATE', default=1, help='scale replay rate')
+    parser.add_argument('-M', '--mps',     dest='mps', type=float, metavar='MPS', default=None, help='aggregate messages per second, ignoring timestamps')
+    parser.add_argument('-q', '--quick',   dest='quick', action='store_true', default=False, help='send as fast as possible')
+    parser.add_argument('-o', '--dump',    dest='dump', metavar='FILE', default=None, help='write the generated traffic to FILE instead of sending it')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+    sensors, events = generate(args)
+
+    if args.dump:
+        with open(args.dump, 'w') as fd:
+            for ts, kind, sensor, payload in events:
+                fd.write('{:.6f} {} {} {}'.format(ts, kind, sensors[sensor]['station_id'], payload.rstrip('\r\n') + '\n'))
+        return
+
+    ip = socket.gethostbyname_ex(args.dest)[-1][0]
+    dest = (ip, args.port)
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+
+    sbs_clients = []
+    if args.sbs:
+        bind = socket.gethostbyname_ex(args.bind)[-1][0]
+        sbs_clients = [serve_sbs(bind, args.sbs_port + s['index']) for s in sensors]
+        logging.info("SBS1 sensors listening on %s:%d-%d", bind, args.sbs_port, args.sbs_port + len(sensors) - 1)
+    while sum(map(len, sbs_clients)) < args.wait:
+        sleep(0.1)
+
+    stats = ReplayStats(args.mps)
+    timeline = ((e[0], e) for e in events)
+    try:
+        for batch in paced(timeline, args.rate, args.mps, args.quick, 256, stats):
+            sbs = {}
+            for ts, kind, sensor, payload in batch:
+                if kind == 'acars':
+                    udp.sendto(payload, dest)
+                else:
+                    sbs.setdefault(sensor, []).append(payload)
+            for sensor, lines in sbs.items():
+                send_sbs(sbs_clients[sensor], ''.join(lines))
+    except KeyboardInterrupt:
+        logging.info("Caught ^C - exiting")
+
+    stats.log_report()
+
+if __name__ == '__main__':
+    main()
@@ -4,16 +4,30 @@
 import requests
 import re
 import csv
-import pymongo
 import logging
 import config
+import storage
 
 
 def main():
-    dbh = pymongo.MongoClient(config.mongo_url)['skyshark']
+    dbh = storage.connect(config.mongo_url)
     load_airlines(dbh)
     load_airports(dbh)
 
+def clean_airport(apt):
+    '''Convert a row of airport-codes.csv into an airport_info document, in place'''
+    apt['_id'] = apt.pop('ident', None)
+    apt['lon'], apt['lat'] = map(float, apt['coordinates'].split(','))
+    apt['coordinates'] = {'type':'Point', 'coordinates': [ apt['lon'], apt['lat'] ] }
+
+    for k in list(apt.keys()):
+        if apt[k] == '':
+            apt.pop(k, None)
+    try:
+        apt['elevation_ft'] = int(apt['elevation_ft'])
+    except (TypeError, KeyError):
+        pass
+
 def load_airports(dbh, force=False):
     coll = 'airport_info'
 
@@ -26,7 +40,7 @@ def load_airports(dbh, force=False):
 
     for k in ['continent', 'elevation_ft', 'gps_code', 'iata_code', 'ident', 'iso_region', 'iso_country', 'local_code', 'municipality', 'name', 'type']:
         dbh[coll].create_index(k)
-    dbh[coll].create_index([('coordinates', pymongo.GEOSPHERE)])
+    dbh[coll].create_index([('coordinates', storage.GEOSPHERE)])
 
     url = 'https://raw.githubusercontent.com/datasets/airport-codes/master/data/airport-codes.csv'
 
@@ -36,20 +50,18 @@ def load_airports(dbh, force=False):
 
     airports = csv.DictReader(resp.iter_lines())
     for apt in airports:
-        apt['_id'] = apt.pop('ident', None)
-        apt['lon'], apt['lat'] = map(float, apt['coordinates'].split(','))
-        apt['coordinates'] = {'type':'Point', 'coordinates': [ apt['lon'], apt['lat'] ] }
-        
-        for k in list(apt.keys()):
-            if apt[k] == '':
-                apt.pop(k, None)
-        try:
-            apt['elevation_ft'] = int(apt['elevation_ft'])
-        except (TypeError, KeyError):
-            pass
+        clean_airport(apt)
         dbh[coll].update_one({'_id': apt['_id']}, {'$set': apt}, upsert=True)
 
 
+def parse_airlines(lines):
+    '''Extract airline records from the rows of airlines.sql'''
+    rgx = re.compile(r"[(]\d+, '(?P<iata>.+?)', '(?P<icao>.+?)', '(?P<airline>.+?)', '(?P<callsign>.+?)', '(?P<country>.+?)'[)]")
+    for line in lines:
+        match = re.match(rgx, line)
+        if match:
+            yield match.groupdict()
+
 def load_airlines(dbh, force=False):
     '''Load airline (IATA, ICAO, Country, Callsign, Name) metadata'''
     coll = 'airline_info'
@@ -63,18 +75,14 @@ def load_airlines(dbh, force=False):
         dbh[coll].create_index(column)
 
     url = 'https://raw.githubusercontent.com/BroadcastEngineer/Airlines-ICAO-IATA-Database/master/airlines.sql'
-    rgx = re.compile(r"[(]\d+, '(?P<iata>.+?)', '(?P<icao>.+?)', '(?P<airline>.+?)', '(?P<callsign>.+?)', '(?P<country>.+?)'[)]")
 
     resp = requests.get(url, timeout=300, stream=True)
     if resp.ok is False:
         return False
 
-    for line in resp.iter_lines():
-        match = re.match(rgx, line)
-        if match:
-            data = match.groupdict()
-            selector = {'iata': data['iata'], 'icao': data['icao'], 'callsign':data['callsign']}
-            dbh[coll].update_one(selector, {'$set': data}, upsert=True)
+    for data in parse_airlines(resp.iter_lines()):
+        selector = {'iata': data['iata'], 'icao': data['icao'], 'callsign':data['callsign']}
+        dbh[coll].update_one(selector, {'$set': data}, upsert=True)
 
     # observed deviations from the documentation
     fixes = [
@@ -1,13 +1,13 @@
 #!/usr/bin/env python
 # vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
 
-import pymongo
 import csv
 import sys
 import os
 import logging
 import arrow
 import config
+import storage
 
 def log_config(lvl):
     logging_format = '%(levelname)s: %(message)s'
@@ -99,8 +99,7 @@ def dbConnect(db=None, check_index=True):
     if db is None:
         db = 'mongodb://localhost:27017/'
 
-    mc = pymongo.MongoClient(db)
-    dbh = mc['skyshark']
+    dbh = storage.connect(db)
 
     if check_index is True:
         logging.info("checking indexes")
@@ -173,7 +172,7 @@ def main():
                 clean_record(row, table)
                 try:
                     dbh[table].insert(row)
-                except pymongo.errors.DuplicateKeyError:
+                except storage.DuplicateKeyError:
                     pass
 
 
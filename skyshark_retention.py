@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Retention for time-partitioned collections (loaders run with -P). Run it
+# daily, eg. from cron. Partitions that ended more than --keep days ago are
+# dropped whole. With --downsample, position partitions older than that
+# many days are first thinned to one position per aircraft per --interval
+# seconds into the adsb_positions_coarse tier, which is kept for
+# --keep-coarse days.
+
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import config
+import storage
+import partitions
+from skyshark_adsb_loader import position_indexes
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def _store(coarse, docs):
+    # upserts, so that a rerun after a failure doesn't copy positions twice
+    coarse.collection(docs[0]['timestamp']).bulk_write(
+        [storage.ReplaceOne({'icao24': d['icao24'], 'timestamp': d['timestamp']}, d, upsert=True) for d in docs], ordered=False)
+
+def downsample(dbh, name, coarse, interval, batch=1000):
+    '''copy the first position per aircraft per interval from `name` into `coarse`'''
+    seen = set()
+    pending = []
+    n = kept = 0
+    for doc in dbh[name].find().sort('timestamp'):
+        n += 1
+        t = partitions._utc(doc['timestamp'])
+        key = (doc['icao24'], int((t - datetime(1970, 1, 1)).total_seconds() // interval))
+        if key in seen:
+            continue
+        seen.add(key)
+        doc.pop('_id', None)
+        pending.append(doc)
+        if len(pending) >= batch:
+            _store(coarse, pending)
+            kept += len(pending)
+            pending = []
+    if pending:
+        _store(coarse, pending)
+        kept += len(pending)
+    return n, kept
+
+def expire(dbh, base, keep_days, now, dry_run=False):
+    horizon = now - timedelta(days=keep_days)
+    dropped = 0
+    for name, start, end in partitions.partitions(dbh, base):
+        if end <= horizon:
+            logging.info("dropping %s", name)
+            if not dry_run:
+                dbh.drop_collection(name)
+                if base == 'acars':
+                    # and the text index postings of its messages
+                    dbh['acars_text'].delete_many({'coll': name})
+            dropped += 1
+    return dropped
+
+def main():
+    descr = 'drop and downsample old time-partitioned collections'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
+    parser.add_argument('-c', '--collection', dest='collections', metavar='NAME', action='append', default=None, help='partitioned collection to expire, may be repeated (default: adsb_positions and acars)')
+    parser.add_argument('-k', '--keep', dest='keep', type=float, metavar='DAYS', default=90, help='drop partitions older than this')
+    parser.add_argument('-D', '--downsample', dest='downsample', type=float, metavar='DAYS', default=None, help='thin out position partitions older than this into the coarse tier')
+    parser.add_argument('-i', '--interval', dest='interval', type=float, metavar='SECONDS', default=60, help='one position per aircraft per this long in the coarse tier')
+    parser.add_argument('-K', '--keep-coarse', dest='keep_coarse', type=float, metavar='DAYS', default=365, help='drop coarse tier partitions older than this')
+    parser.add_argument('-n', '--dry-run', dest='dry_run', action='store_true', default=False, help='only report what would be done')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+    if args.db is None:
+        args.db = config.mongo_url
+    dbh = storage.connect(args.db)
+    now = datetime.utcnow()
+
+    for base in args.collections or ['adsb_positions', 'acars']:
+        n = expire(dbh, base, args.keep, now, args.dry_run)
+        if n:
+            logging.warning("%s %d partitions of %s", 'would drop' if args.dry_run else 'dropped', n, base)
+
+    if args.downsample is not None:
+        horizon = now - timedelta(days=args.downsample)
+        for name, start, end in partitions.partitions(dbh, 'adsb_positions'):
+            if end > horizon:
+                continue
+            logging.info("downsampling %s", name)
+            if args.dry_run:
+                continue
+            period = name[len('adsb_positions_')]
+            coarse = partitions.Partitioner(dbh, 'adsb_positions_coarse', period, position_indexes)
+            n, kept = downsample(dbh, name, coarse, args.interval)
+            dbh.drop_collection(name)
+            logging.warning("downsampled %s: kept %d of %d positions", name, kept, n)
+        expire(dbh, 'adsb_positions_coarse', args.keep_coarse, now, args.dry_run)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Build the rollups described in rollups.py from messages and positions
+# already stored, eg. those loaded before the loaders kept rollups. Whole
+# UTC days are rebuilt: the rollups of the days in range are deleted and
+# counted again, so run it on days that the loaders are not still adding
+# to, or the loaders' counts for those days will be lost.
+
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import config
+import storage
+import partitions
+import rollups
+from fakemongo import NullDatabase
+
+# rollup kinds built from each collection, and its time field
+sources = {
+    'acars': ('date', ['acars_label', 'acars_station', 'acars_airline', 'acars_flight', 'acars_aircraft']),
+    'adsb_positions': ('timestamp', ['adsb_positions', 'adsb_airline', 'adsb_aircraft']),
+}
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def backfill(dbh, base, since, until, dry_run=False):
+    '''recount the rollups of `base` for since <= time < until, returning the documents counted'''
+    time_field, kinds = sources[base]
+    if not dry_run:
+        for kind in kinds:
+            dbh['rollups'].delete_many({'kind': kind, 'start': {'$gte': since, '$lt': until}})
+    r = rollups.Rollups(NullDatabase() if dry_run else dbh, interval=3600)
+    n = 0
+    for doc in partitions.find(dbh, base, since, until, time_field=time_field):
+        if base == 'acars':
+            rollups.acars_rollup(r, doc)
+            # copies from other receivers were merged into the first
+            for rx in doc.get('receivers', [])[1:]:
+                rollups.acars_rollup(r, dict(rx, date=doc['date']), merged=True)
+        else:
+            rollups.position_rollup(r, doc)
+        n += 1
+        if n % 100000 == 0:
+            logging.info("counted %d %s documents", n, base)
+    r.flush()
+    return n
+
+def main():
+    descr = 'build traffic statistics rollups from stored messages and positions'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
+    parser.add_argument('-c', '--collection', dest='collections', choices=sorted(sources), action='append', default=None, help='what to count, may be repeated (default: all)')
+    parser.add_argument('-s', '--since', dest='since', metavar='YYYY-MM-DD', default=None, help='first day to rebuild (default: the oldest document)')
+    parser.add_argument('-u', '--until', dest='until', metavar='YYYY-MM-DD', default=None, help='rebuild up to the start of this day (default: today)')
+    parser.add_argument('-n', '--dry-run', dest='dry_run', action='store_true', default=False, help='count the documents but write nothing')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+    if args.db is None:
+        args.db = config.mongo_url
+    dbh = storage.connect(args.db)
+    rollups.create_indexes(dbh)
+
+    if args.until:
+        until = datetime.strptime(args.until, '%Y-%m-%d')
+    else:
+        until = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    for base in args.collections or sorted(sources):
+        if args.since:
+            since = datetime.strptime(args.since, '%Y-%m-%d')
+        else:
+            since = partitions.earliest(dbh, base, sources[base][0])
+            if since is None:
+                logging.warning("nothing to count in %s", base)
+                continue
+            since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        if since >= until:
+            continue
+        logging.info("counting %s from %s to %s", base, since, until)
+        n = backfill(dbh, base, since, until, args.dry_run)
+        logging.warning("counted %d %s documents from %s to %s", n, base, since.date(), until.date() - timedelta(days=1))
+
+if __name__ == '__main__':
+    main()
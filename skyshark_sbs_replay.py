@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Stand-in for dump1090's port 30003 output: serve a recorded SBS1 log to
+# any number of TCP clients, eg. skyshark_adsb_loader.py -s localhost
+
+import logging
+import argparse
+import socket
+import threading
+from datetime import datetime
+from time import mktime, sleep
+import inputs
+from replay import paced, ReplayStats, monotonic
+
+clients = []
+clients_lock = threading.Lock()
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def sbs_time(date_str, time_str):
+    '''SBS1 date and time (local time) to seconds since the epoch'''
+    dt = datetime.strptime(date_str + ' ' + time_str, '%Y/%m/%d %H:%M:%S.%f')
+    return mktime(dt.timetuple()) + dt.microsecond / 1e6
+
+def virtual_aircraft(fields, n):
+    '''Yield n copies of an SBS1 message, each from a different (made up) aircraft'''
+    yield fields
+    try:
+        icao = int(fields[4], 16)
+    except ValueError:
+        return
+    try:
+        lat, lon = float(fields[14]), float(fields[15])
+    except ValueError:
+        # no position, or a garbled one: copy it as it is
+        lat = lon = None
+    for i in range(1, n):
+        f = fields[:]
+        # golden ratio stride keeps the synthetic addresses well spread
+        f[4] = '%06X' % ((icao + i * 0x9E3779) & 0xFFFFFF)
+        if lat is not None:
+            f[14] = '%.5f' % (lat + i * 0.01)
+            f[15] = '%.5f' % (lon + i * 0.01)
+        yield f
+
+def read_events(files, fanout=1, now=False):
+    '''yield (timestamp, text) for every message in the SBS1 logs'''
+    for fn in files:
+        logging.info("replaying %s", fn)
+        for line in inputs.open_input(fn):
+            fields = line.rstrip('\r\n').split(',')
+            if len(fields) < 22 or fields[0] != 'MSG':
+                yield None, line.rstrip('\r\n') + '\r\n'
+                continue
+            try:
+                ts = sbs_time(fields[6], fields[7])
+            except ValueError:
+                ts = None
+
+            for f in virtual_aircraft(fields, fanout):
+                if now:
+                    # rewritten again just before sending, see stamp()
+                    f[6] = f[7] = f[8] = f[9] = None
+                yield ts, f
+
+def stamp(msg):
+    '''format a message for the wire, filling in the current time if it was blanked out'''
+    if isinstance(msg, str):
+        return msg
+    if msg[6] is None:
+        d = datetime.now()
+        msg[6] = msg[8] = d.strftime('%Y/%m/%d')
+        msg[7] = msg[9] = d.strftime('%H:%M:%S.%f')[:-3]
+    return ','.join(msg) + '\r\n'
+
+def accept_clients(s):
+    while True:
+        c, addr = s.accept()
+        c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logging.info("client connected from %s:%d", addr[0], addr[1])
+        with clients_lock:
+            clients.append(c)
+
+def broadcast(data):
+    '''send to every client, returning the time spent blocked in sendall()'''
+    t0 = monotonic()
+    with clients_lock:
+        current = clients[:]
+    for c in current:
+        try:
+            c.sendall(data)
+        except socket.error as e:
+            logging.info("dropping client: %s", e)
+            c.close()
+            with clients_lock:
+                clients.remove(c)
+    return monotonic() - t0
+
+def main():
+    descr = 'serve SBS1 logs like dump1090 port 30003'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-b', '--bind',    dest='bind', type=str,   metavar='IP', default='localhost', help='hostname or IP address to listen on')
+    parser.add_argument('-p', '--port',    dest='port', type=int,   metavar='PORT', default=30003, help='port to listen on')
+    parser.add_argument('-r', '--rate',    dest='rate', type=float, metavar='RATE', default=1, help='scale replay rate')
+    parser.add_argument('-q', '--quick',   dest='quick', action='store_true', default=False, help='send as fast as possible')
+    parser.add_argument('-M', '--mps',     dest='mps', type=float, metavar='MPS', default=None, help='ignore timestamps and send this many messages per second')
+    parser.add_argument('-n', '--now',     dest='now', action='store_true', default=False, help='rewrite timestamps to the current time')
+    parser.add_argument('-a', '--aircraft', dest='fanout', type=int, metavar='N', default=1, help='replicate each message as N virtual aircraft')
+    parser.add_argument('-w', '--wait',    dest='wait', type=int, metavar='N', default=1, help='wait for N clients before starting')
+    parser.add_argument('-B', '--batch',   dest='batch', type=int, metavar='N', default=64, help='maximum messages written at once when behind schedule')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    parser.add_argument(dest='files', metavar='FILE', nargs='+', help='SBS1 logs to replay')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+
+    ip = socket.gethostbyname_ex(args.bind)[-1][0]
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((ip, args.port))
+    s.listen(5)
+    logging.info("listening on %s:%d (%s)", ip, args.port, args.bind)
+
+    t = threading.Thread(target=accept_clients, args=(s,))
+    t.daemon = True
+    t.start()
+
+    while len(clients) < args.wait:
+        sleep(0.1)
+
+    stats = ReplayStats(args.mps)
+    blocked = 0.0
+    try:
+        events = read_events(args.files, args.fanout, args.now)
+        for batch in paced(events, args.rate, args.mps, args.quick, args.batch, stats):
+            blocked += broadcast(''.join([stamp(m) for m in batch]))
+    except KeyboardInterrupt:
+        logging.info("Caught ^C - exiting")
+
+    stats.log_report()
+    logging.warning("%.3fs blocked writing to clients", blocked)
+
+if __name__ == '__main__':
+    main()
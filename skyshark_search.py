@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Search ACARS message text with the index kept by the ACARS loader (-T),
+# see textindex.py for the query syntax, eg.
+#
+#   skyshark_search.py 'RWY 22L' 'APT:KBOS' 'hyd*' '"gate change"' -l 5Z -s 2026-10-01
+#
+# --rebuild indexes messages stored without -T, or before it existed.
+
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import config
+import storage
+import partitions
+import textindex
+
+def log_config(lvl):
+    logging_format = '%(levelname)s: %(message)s'
+    if lvl > 1:
+        logging.basicConfig(format=logging_format, level=logging.DEBUG)
+    elif lvl > 0:
+        logging.basicConfig(format=logging_format, level=logging.INFO)
+    else:
+        logging.basicConfig(format=logging_format, level=logging.WARN)
+
+def parse_date(s):
+    for fmt in ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d']:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError('{} is not YYYY-MM-DD[THH:MM[:SS]]'.format(s))
+
+def rebuild(dbh, since=None, until=None):
+    '''index the messages in acars and its partitions'''
+    index = textindex.TextIndex(dbh, textindex.known_airports(dbh), rows=10000, interval=3600)
+    colls = ['acars'] + [name for name, start, end in partitions.partitions(dbh, 'acars')
+                         if (since is None or end > since) and (until is None or start < until)]
+    n = 0
+    for coll in colls:
+        n += textindex.reindex(dbh, coll, index, since, until)
+    return n
+
+def main():
+    descr = 'search the text of ACARS messages'
+    parser = argparse.ArgumentParser(description=descr, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--mongodb', dest='db', metavar='MONGO', default=None, help='MongoDB server url')
+    parser.add_argument('-s', '--since', dest='since', type=parse_date, metavar='YYYY-MM-DD', default=None, help='only messages from this UTC time on')
+    parser.add_argument('-u', '--until', dest='until', type=parse_date, metavar='YYYY-MM-DD', default=None, help='only messages before this UTC time')
+    parser.add_argument('-l', '--label', dest='labels', metavar='LABEL', action='append', default=None, help='only messages with this label, may be repeated')
+    parser.add_argument('-n', '--limit', dest='limit', type=int, metavar='N', default=50, help='show at most this many messages, newest first, 0 for all')
+    parser.add_argument('--rebuild', dest='rebuild', action='store_true', default=False, help='index the stored messages between --since and --until first')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='count', default=0, help='increase verbosity')
+    parser.add_argument(dest='query', metavar='TERM', nargs='*', help='words, prefix* or "quoted phrases", all of which must match')
+    args = parser.parse_args()
+
+    log_config(args.verbose)
+    if args.db is None:
+        args.db = config.mongo_url
+    dbh = storage.connect(args.db)
+
+    if args.rebuild:
+        textindex.create_indexes(dbh)
+        n = rebuild(dbh, args.since, args.until)
+        logging.warning("indexed %d messages", n)
+    if not args.query:
+        return
+
+    t0 = time.time()
+    found = textindex.search(dbh, ' '.join(args.query), args.since, args.until, args.labels, args.limit)
+    logging.info("%d messages in %.1fms", len(found), (time.time() - t0) * 1000)
+    for msg in found:
+        print('{} {:2} {:8} {:8} {}'.format(msg['date'].strftime('%Y-%m-%d %H:%M:%S'), msg.get('label', ''),
+                                            msg.get('flight', ''), msg.get('tail', ''),
+                                            ' '.join((msg.get('text') or '').split())))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Store-and-forward between edge sensors and the aggregator's loaders.
+#
+# On the sensor, messages are appended in batches to a spool directory of
+# segment files. Each batch is a frame: a header with a sequence number,
+# length and checksum, followed by the zlib-compressed newline-separated
+# messages. Frames are shipped over TCP exactly as they are stored, and the
+# loader acknowledges each sequence number once it has queued the messages.
+# Acknowledged segments are deleted; if the link is down long enough for the
+# spool to reach its size limit, the oldest segments are discarded.
+#
+# Protocol, after connecting:
+#   sensor -> loader: {"sensor": NAME, "stream": "acars"|"sbs", "newest": SEQ}\n
+#   loader -> sensor: {"last": SEQ}\n    (last sequence seen from NAME, or 0)
+#   sensor -> loader: frame, frame, ...
+#   loader -> sensor: 8 byte sequence number per frame handled
+
+import os
+import json
+import zlib
+import socket
+import struct
+import logging
+import threading
+from time import sleep
+
+import metrics
+from replay import monotonic
+
+magic = b'SKSP'
+header = struct.Struct('!4sQII') # magic, seq, payload length, crc32
+ack_fmt = struct.Struct('!Q')
+
+spooled = metrics.counter('skyshark_spool_frames_total', 'batches written to the spool', ['stream'])
+discarded = metrics.counter('skyshark_spool_discarded_total', 'spooled batches discarded unsent because the spool was full', ['stream'])
+shipped = metrics.counter('skyshark_spool_shipped_bytes_total', 'compressed bytes sent to the aggregator', ['stream'])
+backlog = metrics.gauge('skyshark_spool_backlog', 'spooled batches not yet acknowledged', ['stream'])
+forwarded = metrics.counter('skyshark_forwarded_messages_total', 'messages received from forwarders', ['sensor'])
+
+def encode_frame(seq, lines):
+    payload = zlib.compress(b'\n'.join(lines))
+    return header.pack(magic, seq, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+def decode_payload(payload, crc):
+    if zlib.crc32(payload) & 0xffffffff != crc:
+        raise ValueError('frame checksum mismatch')
+    return zlib.decompress(payload).split(b'\n')
+
+def read_frame(fd):
+    '''(seq, payload, crc) of the next frame in a file, or None at the end or a torn write'''
+    h = fd.read(header.size)
+    if len(h) < header.size:
+        return None
+    m, seq, n, crc = header.unpack(h)
+    if m != magic:
+        return None
+    payload = fd.read(n)
+    if len(payload) < n:
+        return None
+    return seq, payload, crc
+
+class Spool(object):
+    def __init__(self, directory, stream, max_bytes=256 << 20, segment_bytes=4 << 20):
+        self.directory = directory
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.cond = threading.Condition(threading.Lock())
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.acked = 0
+        try:
+            with open(self._ackfile()) as fd:
+                self.acked = int(fd.read().strip() or 0)
+        except (IOError, ValueError):
+            pass
+
+        # [first seq, file name, bytes] of each segment, oldest first, and
+        # their total, kept up to date rather than listing the directory
+        self.files = []
+        for fn in os.listdir(directory):
+            if fn.endswith('.seg'):
+                path = os.path.join(directory, fn)
+                self.files.append([int(fn[:-4]), path, os.path.getsize(path)])
+        self.files.sort()
+
+        # find where the last run stopped, dropping any partly written frame
+        self.next_seq = self.acked + 1
+        self.current = None
+        if self.files:
+            first, fn, _ = self.files[-1]
+            good = 0
+            with open(fn, 'rb') as fd:
+                while True:
+                    f = read_frame(fd)
+                    if f is None:
+                        break
+                    self.next_seq = max(self.next_seq, f[0] + 1)
+                    good = fd.tell()
+            with open(fn, 'r+b') as fd:
+                fd.truncate(good)
+            self.files[-1][2] = good
+        self.size = sum(n for _, _, n in self.files)
+        self._update_backlog()
+        logging.info("%s spool: %d batches waiting", stream, self.pending())
+
+    def _ackfile(self):
+        return os.path.join(self.directory, 'acked')
+
+    def segments(self):
+        '''[(first seq, file name)] oldest first'''
+        with self.cond:
+            return [(first, fn) for first, fn, _ in self.files]
+
+    def pending(self):
+        return self.next_seq - 1 - self.acked
+
+    def _update_backlog(self):
+        backlog.set(self.pending(), self.stream)
+
+    def append(self, lines):
+        '''spool a batch of messages, returning its sequence number'''
+        with self.cond:
+            seq = self.next_seq
+            frame = encode_frame(seq, lines)
+            if self.current is None or self.current.tell() + len(frame) > self.segment_bytes:
+                if self.current is not None:
+                    self.current.close()
+                fn = os.path.join(self.directory, '{:020d}.seg'.format(seq))
+                self.current = open(fn, 'ab')
+                self.files.append([seq, fn, 0])
+            self.current.write(frame)
+            self.current.flush()
+            self.files[-1][2] += len(frame)
+            self.size += len(frame)
+            self.next_seq += 1
+            spooled.inc(self.stream)
+            self._enforce_limit()
+            self._update_backlog()
+            self.cond.notify_all()
+        return seq
+
+    def _drop_oldest(self):
+        first, fn, n = self.files.pop(0)
+        self.size -= n
+        os.unlink(fn)
+        return first
+
+    def _enforce_limit(self):
+        while self.size > self.max_bytes and len(self.files) > 1:
+            first = self._drop_oldest()
+            lost = self.files[0][0] - max(first, self.acked + 1)
+            if lost > 0:
+                discarded.inc(self.stream, n=lost)
+                logging.warning("%s spool full, discarded %d unsent batches", self.stream, lost)
+            self._set_acked(max(self.acked, self.files[0][0] - 1))
+
+    def _set_acked(self, seq):
+        self.acked = seq
+        tmp = self._ackfile() + '.tmp'
+        with open(tmp, 'w') as fd:
+            fd.write('{}\n'.format(seq))
+        os.rename(tmp, self._ackfile())
+
+    def ack(self, seq):
+        '''the loader has everything up to seq; forget about it'''
+        with self.cond:
+            if seq <= self.acked:
+                return
+            self._set_acked(min(seq, self.next_seq - 1))
+            while len(self.files) > 1 and self.files[1][0] - 1 <= self.acked:
+                self._drop_oldest()
+            self._update_backlog()
+
+    def frames(self, after):
+        '''yield (seq, raw frame) for spooled frames after seq, until the end of what's written'''
+        segments = self.segments()
+        for i, (first, fn) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][0] - 1 <= after:
+                continue # all sent already
+            try:
+                fd = open(fn, 'rb')
+            except IOError: # discarded or acked since we listed the directory
+                continue
+            with fd:
+                while True:
+                    f = read_frame(fd)
+                    if f is None:
+                        break
+                    seq, payload, crc = f
+                    if seq > after:
+                        yield seq, header.pack(magic, seq, len(payload), crc) + payload
+
+    def wait(self, after, timeout):
+        '''wait until something after seq has been spooled'''
+        with self.cond:
+            if self.next_seq - 1 <= after:
+                self.cond.wait(timeout)
+            return self.next_seq - 1 > after
+
+def _readline(sock, buf):
+    while b'\n' not in buf:
+        data = sock.recv(4096)
+        if not data:
+            raise EOFError()
+        buf.extend(data)
+    i = buf.index(b'\n')
+    line = bytes(buf[:i])
+    del buf[:i + 1]
+    return line
+
+def _readexact(sock, buf, n):
+    while len(buf) < n:
+        data = sock.recv(max(4096, n - len(buf)))
+        if not data:
+            raise EOFError()
+        buf.extend(data)
+    rv = bytes(buf[:n])
+    del buf[:n]
+    return rv
+
+def _collect(sock, buf, spool, inflight):
+    '''read an ack and forget the frames it covers; acks for frames not in flight are ignored'''
+    seq = ack_fmt.unpack(_readexact(sock, buf, ack_fmt.size))[0]
+    if seq not in inflight:
+        logging.debug("%s: ignoring ack for %d, not in flight", spool.stream, seq)
+        return
+    del inflight[:inflight.index(seq) + 1]
+    spool.ack(seq)
+
+def ship(spool, host, port, sensor, rate=None, window=16):
+    '''send the spool to a loader forever, reconnecting and resuming as needed
+
+    rate limits the bytes per second sent, so a backlog drains without
+    saturating the backhaul.
+    '''
+    while True:
+        try:
+            sock = socket.create_connection((host, port), 10)
+        except socket.error as e:
+            logging.info("%s: connecting to %s:%d: %s", spool.stream, host, port, e)
+            sleep(5)
+            continue
+        try:
+            _ship(sock, spool, sensor, rate, window)
+        except (socket.error, EOFError, ValueError) as e:
+            logging.warning("%s: connection to %s:%d lost: %s", spool.stream, host, port, e or 'EOF')
+        sock.close()
+        sleep(1)
+
+def _ship(sock, spool, sensor, rate, window):
+    buf = bytearray()
+    hello = {'sensor': sensor, 'stream': spool.stream, 'newest': spool.next_seq - 1}
+    sock.sendall(json.dumps(hello).encode('utf-8') + b'\n')
+    last = json.loads(_readline(sock, buf).decode('utf-8'))['last']
+    spool.ack(last)
+    logging.info("%s: connected, loader has up to %d, %d batches to send", spool.stream, last, spool.pending())
+
+    inflight = []
+    sent = spool.acked
+    next_send = monotonic()
+    while True:
+        for seq, frame in spool.frames(max(sent, spool.acked)):
+            while len(inflight) >= window:
+                _collect(sock, buf, spool, inflight)
+            if rate:
+                delay = next_send - monotonic()
+                if delay > 0:
+                    sleep(delay)
+                next_send = max(next_send, monotonic()) + len(frame) / float(rate)
+            sock.sendall(frame)
+            shipped.inc(spool.stream, n=len(frame))
+            inflight.append(seq)
+            sent = seq
+        # caught up; collect the remaining acks, then wait for more to send
+        sock.settimeout(1.0)
+        try:
+            while inflight:
+                _collect(sock, buf, spool, inflight)
+        except socket.timeout:
+            pass
+        sock.settimeout(10)
+        spool.wait(sent, 1.0)
+
+class ForwardServer(object):
+    '''accept forwarders and pass each batch of messages to handler(sensor, lines)'''
+    def __init__(self, stream, handler):
+        self.stream = stream
+        self.handler = handler
+        self.last = {}
+        self.lock = threading.Lock()
+
+    def client(self, sock, addr):
+        buf = bytearray()
+        try:
+            hello = json.loads(_readline(sock, buf).decode('utf-8'))
+            sensor = hello['sensor']
+            if hello.get('stream') != self.stream:
+                logging.error("forwarder %s at %s sent %s to the %s loader", sensor, addr[0], hello.get('stream'), self.stream)
+                return
+            with self.lock:
+                last = self.last.get(sensor, 0)
+                if last > hello.get('newest', last):
+                    # the sensor's spool was wiped, its numbering starts over
+                    last = self.last[sensor] = 0
+            sock.sendall(json.dumps({'last': last}).encode('utf-8') + b'\n')
+            logging.info("forwarder %s connected from %s", sensor, addr[0])
+            while True:
+                m, seq, n, crc = header.unpack(_readexact(sock, buf, header.size))
+                if m != magic:
+                    raise ValueError('bad frame')
+                lines = decode_payload(_readexact(sock, buf, n), crc)
+                with self.lock:
+                    dup = seq <= self.last.get(sensor, 0)
+                if not dup:
+                    self.handler(sensor, [l for l in lines if l])
+                    forwarded.inc(sensor, n=len(lines))
+                    with self.lock:
+                        self.last[sensor] = seq
+                sock.sendall(ack_fmt.pack(seq))
+        except (socket.error, EOFError, ValueError, KeyError, zlib.error) as e:
+            logging.info("forwarder at %s disconnected: %s", addr[0], e or 'EOF')
+        finally:
+            sock.close()
+
+    def accept(self, listener):
+        while True:
+            sock, addr = listener.accept()
+            t = threading.Thread(target=self.client, args=(sock, addr))
+            t.daemon = True
+            t.start()
+
+def serve(port, bind, stream, handler):
+    '''accept forwarders for `stream` on a background thread'''
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((bind, port))
+    listener.listen(16)
+    server = ForwardServer(stream, handler)
+    t = threading.Thread(target=server.accept, args=(listener,))
+    t.daemon = True
+    t.start()
+    logging.info("accepting %s forwarders on %s:%d", stream, bind, port)
+    return server
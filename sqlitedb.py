@@ -0,0 +1,504 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# An embedded SQLite document store with enough of the pymongo interface
+# for the loaders and tools, for sensors too small to run mongod. Select it
+# with a sqlite: url, eg. mongo_url='sqlite:///var/lib/skyshark/skyshark.db'
+# in config.py, or -m sqlite:skyshark.db.
+#
+# Each collection is a table of pickled documents keyed by _id. Every field
+# that gets create_index() also gets a column holding its value, indexed
+# by SQLite, so selectors on indexed fields are answered from the index and
+# anything else is checked against the documents in Python. So are fields
+# holding a list, or inside one (receivers.station_id): their column holds
+# a marker instead of a value, since one row can't hold several. Geospatial
+# indexes are skipped and geospatial queries raise OperationFailure, which
+# callers already treat like any other database error.
+#
+# The database is in WAL mode and writes are batched into transactions of
+# up to `batch` writes, committed at least every `interval` seconds, which
+# keeps SD card writes to a trickle. A crash loses at most that interval.
+
+import re
+import atexit
+import sqlite3
+import cPickle
+import logging
+import threading
+from datetime import datetime
+from calendar import timegm
+
+from fakemongo import apply_update, get_path, project
+from storage import ObjectId, InsertOne, UpdateMany, DuplicateKeyError, OperationFailure
+
+class Result(object):
+    def __init__(self, **kwargs):
+        self.upserted_id = None
+        self.inserted_id = None
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.__dict__.update(kwargs)
+
+def _normalize(v):
+    '''store datetimes as naive UTC, as mongo does'''
+    if isinstance(v, datetime):
+        if v.tzinfo is not None:
+            v = v.replace(tzinfo=None) - v.utcoffset()
+        return v
+    if isinstance(v, dict):
+        return dict((k, _normalize(x)) for k, x in v.items())
+    if isinstance(v, (list, tuple)):
+        return [_normalize(x) for x in v]
+    return v
+
+def _same(v):
+    return v
+
+def _sqlvalue(v):
+    '''the value of an indexed field as SQLite sees it, or None'''
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, (int, long, float, basestring)):
+        return v
+    if isinstance(v, datetime):
+        return timegm(v.utctimetuple()) + v.microsecond / 1e6
+    return None
+
+# the column value of an indexed field that is or is inside a list
+multi = sqlite3.Binary(b'\0')
+
+def _indexed(doc, path):
+    '''the column value of an indexed field of doc'''
+    for p in path.split('.'):
+        if isinstance(doc, dict):
+            doc = doc.get(p)
+        elif isinstance(doc, list):
+            if not p.isdigit():
+                return multi
+            doc = doc[int(p)] if int(p) < len(doc) else None
+        else:
+            return None
+    return multi if isinstance(doc, list) else _sqlvalue(doc)
+
+def _idvalue(v):
+    if isinstance(v, ObjectId):
+        return sqlite3.Binary(v.binary)
+    if isinstance(v, (int, long, basestring)):
+        return v
+    return sqlite3.Binary(cPickle.dumps(v, 2))
+
+def _column(path):
+    return '"i_{}"'.format(path.replace('.', '__'))
+
+def _compare(op, v, arg):
+    if op == '$eq':
+        return v == arg or (isinstance(v, list) and arg in v)
+    if op == '$ne':
+        return not _compare('$eq', v, arg)
+    if op == '$in':
+        return any(_compare('$eq', v, a) for a in arg)
+    if op == '$nin':
+        return not _compare('$in', v, arg)
+    if op == '$exists':
+        return (v is not None) == bool(arg)
+    if op == '$regex':
+        return isinstance(v, basestring) and re.search(arg, v) is not None
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        if v is None or isinstance(v, (dict, list)):
+            return False
+        return {'$gt': v > arg, '$gte': v >= arg, '$lt': v < arg, '$lte': v <= arg}[op]
+    raise OperationFailure('{} is not supported by the SQLite backend'.format(op))
+
+def _operators(cond):
+    return isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond)
+
+def _lookup(doc, path):
+    '''get_path(), except that a path into a list of documents gives the list of their values, as in mongo'''
+    parts = path.split('.')
+    for i, p in enumerate(parts):
+        if isinstance(doc, dict):
+            doc = doc.get(p)
+        elif isinstance(doc, list) and not p.isdigit():
+            rest = '.'.join(parts[i:])
+            values = [v for v in (_lookup(d, rest) for d in doc if isinstance(d, dict)) if v is not None]
+            return values or None
+        elif isinstance(doc, list) and int(p) < len(doc):
+            doc = doc[int(p)]
+        else:
+            return None
+    return doc
+
+def matches(doc, selector):
+    for k, cond in selector.items():
+        if k.startswith('$'):
+            raise OperationFailure('{} is not supported by the SQLite backend'.format(k))
+        v = _lookup(doc, k)
+        if _operators(cond):
+            if not all(_compare(op, v, arg) for op, arg in cond.items()):
+                return False
+        elif not _compare('$eq', v, cond):
+            return False
+    return True
+
+class Cursor(object):
+    def __init__(self, coll, selector, projection=None):
+        self.coll = coll
+        self.selector = _normalize(selector or {})
+        self.projection = projection
+        self.order = []
+        self.n = 0
+
+    def sort(self, key, direction=1):
+        self.order = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def count(self, with_limit_and_skip=False):
+        where, params, exact = self.coll._where(self.selector)
+        if not self.coll.db._exists(self.coll.name):
+            return 0
+        if exact and not (with_limit_and_skip and self.n):
+            return self.coll.db._execute('SELECT COUNT(*) FROM {} {}'.format(self.coll.table, where), params).fetchone()[0]
+        return sum(1 for _ in self)
+
+    def __iter__(self):
+        where, params, exact = self.coll._where(self.selector)
+        sql_order = all((k in self.coll.fields and k not in self.coll.multi) or k == '_id' for k, _ in self.order)
+        sql = 'SELECT doc FROM {} {}'.format(self.coll.table, where)
+        if self.order and sql_order:
+            sql += ' ORDER BY ' + ', '.join('{} {}'.format('_id' if k == '_id' else _column(k), 'DESC' if d < 0 else 'ASC')
+                                            for k, d in self.order)
+        if self.n and exact and (sql_order or not self.order):
+            sql += ' LIMIT {:d}'.format(self.n)
+        docs = (d for d in self.coll._select(sql, params) if exact or matches(d, self.selector))
+        if self.order and not sql_order:
+            docs = list(docs)
+            for k, d in reversed(self.order):
+                docs.sort(key=lambda doc: (get_path(doc, k) is not None, get_path(doc, k)), reverse=d < 0)
+        n = 0
+        for doc in docs:
+            yield project(doc, self.projection)
+            n += 1
+            if n == self.n:
+                break
+
+class Collection(object):
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.table = '"{}"'.format(name.replace('"', '""'))
+        self.fields = []
+        self.multi = set()
+        if db._exists(name):
+            self.fields = [r[1][2:].replace('__', '.') for r in db._execute('PRAGMA table_info({})'.format(self.table))
+                           if r[1].startswith('i_')]
+        # fields with lists in them, which the indexes can't answer for
+        self.multi = set(f for f in self.fields
+                         if db._execute('SELECT 1 FROM {} WHERE {} = ? LIMIT 1'.format(self.table, _column(f)), [multi]).fetchone())
+
+    def _create(self):
+        if not self.db._exists(self.name):
+            self.db._execute('CREATE TABLE IF NOT EXISTS {} (_id PRIMARY KEY, doc BLOB)'.format(self.table))
+            self.db.tables.add(self.name)
+
+    def _select(self, sql, params):
+        if not self.db._exists(self.name):
+            return
+        with self.db.lock:
+            cur = self.db.conn.execute(sql, params)
+        while True:
+            with self.db.lock:
+                rows = cur.fetchmany(1000)
+            if not rows:
+                break
+            for (doc,) in rows:
+                yield cPickle.loads(str(doc))
+
+    def _where(self, selector):
+        '''SQL for the conditions on indexed fields, and whether that's all of them'''
+        clauses, params = [], []
+        exact = True
+        for k, cond in selector.items():
+            if k != '_id' and (k not in self.fields or k in self.multi):
+                exact = False
+                continue
+            col = '_id' if k == '_id' else _column(k)
+            conv = _idvalue if k == '_id' else _sqlvalue
+            if not _operators(cond):
+                cond = {'$eq': cond}
+            for op, arg in cond.items():
+                sqlop = {'$eq': '=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}.get(op)
+                if sqlop is not None and conv(arg) is not None:
+                    clauses.append('{} {} ?'.format(col, sqlop))
+                    params.append(conv(arg))
+                elif op == '$in' and arg and all(conv(a) is not None for a in arg):
+                    clauses.append('{} IN ({})'.format(col, ','.join('?' * len(arg))))
+                    params.extend(conv(a) for a in arg)
+                else:
+                    exact = False
+        where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return where, params, exact
+
+    def _row(self, doc):
+        values = [_indexed(doc, f) for f in self.fields]
+        self.multi.update(f for f, v in zip(self.fields, values) if v is multi)
+        return [_idvalue(doc['_id']), sqlite3.Binary(cPickle.dumps(doc, 2))] + values
+
+    def _write(self, sql, params):
+        try:
+            self.db._write(sql, params)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError('{}: {}'.format(self.name, e))
+
+    def _insert(self, doc):
+        cols = ['_id', 'doc'] + [_column(f) for f in self.fields]
+        self._write('INSERT INTO {} ({}) VALUES ({})'.format(self.table, ', '.join(cols), ','.join('?' * len(cols))),
+                    self._row(doc))
+
+    def _replace(self, rowid, doc):
+        cols = ['_id', 'doc'] + [_column(f) for f in self.fields]
+        self._write('UPDATE {} SET {} WHERE rowid = ?'.format(self.table, ', '.join(c + ' = ?' for c in cols)),
+                    self._row(doc) + [rowid])
+
+    def _matching(self, selector, limit=None):
+        '''[(rowid, doc)] of documents matching selector'''
+        where, params, exact = self._where(selector)
+        sql = 'SELECT rowid, doc FROM {} {}'.format(self.table, where)
+        if limit and exact:
+            sql += ' LIMIT {:d}'.format(limit)
+        rv = []
+        if not self.db._exists(self.name):
+            return rv
+        with self.db.lock:
+            for rowid, doc in self.db.conn.execute(sql, params):
+                doc = cPickle.loads(str(doc))
+                if exact or matches(doc, selector):
+                    rv.append((rowid, doc))
+                    if len(rv) == limit:
+                        break
+        return rv
+
+    def create_index(self, keys, name=None, unique=False, **kwargs):
+        if isinstance(keys, basestring):
+            keys = [(keys, 1)]
+        if any(not isinstance(d, int) for _, d in keys):
+            logging.debug("%s: the SQLite backend has no %s indexes", self.name, [d for _, d in keys])
+            return name
+        with self.db.lock:
+            self._create()
+            new = [k for k, _ in keys if k not in self.fields and k != '_id']
+            for k in new:
+                self.db._execute('ALTER TABLE {} ADD COLUMN {}'.format(self.table, _column(k)))
+                self.fields.append(k)
+            if new:
+                for rowid, doc in self._matching({}):
+                    self._replace(rowid, doc)
+            if name is None:
+                name = '_'.join('{}_{}'.format(k, d) for k, d in keys)
+            idx = '"{}__{}"'.format(self.name, name)
+            cols = ', '.join('{} {}'.format(_column(k), 'DESC' if d < 0 else 'ASC') for k, d in keys)
+            try:
+                self.db._execute('CREATE {}INDEX IF NOT EXISTS {} ON {} ({})'.format('UNIQUE ' if unique else '', idx, self.table, cols))
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError('{}: {}'.format(self.name, e))
+        return name
+
+    def insert_one(self, doc):
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        with self.db.lock:
+            self._create()
+            self._insert(_normalize(doc))
+        return Result(inserted_id=doc['_id'])
+
+    def insert(self, doc):
+        if isinstance(doc, list):
+            return self.insert_many(doc).inserted_ids
+        return self.insert_one(doc).inserted_id
+
+    def insert_many(self, docs, ordered=True):
+        ids = []
+        for d in docs:
+            try:
+                ids.append(self.insert_one(d).inserted_id)
+            except DuplicateKeyError:
+                if ordered:
+                    raise
+        return Result(inserted_ids=ids)
+
+    def _update(self, selector, update, upsert, multi):
+        selector = _normalize(selector)
+        update = _normalize(update)
+        with self.db.lock:
+            found = self._matching(selector, None if multi else 1)
+            # documents are unpickled afresh and pickled again, so the
+            # update's values needn't be copied into them
+            for rowid, doc in found:
+                apply_update(doc, update, clone=_same)
+                self._replace(rowid, doc)
+            if found or not upsert:
+                return Result(matched_count=len(found), modified_count=len(found))
+            doc = dict((k, v) for k, v in selector.items() if not k.startswith('$') and not _operators(v))
+            apply_update(doc, update, inserting=True, clone=_same)
+            doc.setdefault('_id', ObjectId())
+            self._create()
+            self._insert(doc)
+            return Result(upserted_id=doc['_id'])
+
+    def update_one(self, selector, update, upsert=False):
+        return self._update(selector, update, upsert, False)
+
+    def update_many(self, selector, update, upsert=False):
+        return self._update(selector, update, upsert, True)
+
+    def replace_one(self, selector, doc, upsert=False):
+        return self._update(selector, doc, upsert, False)
+
+    def update(self, selector, update, upsert=False, multi=False):
+        return self._update(selector, update, upsert, multi)
+
+    def bulk_write(self, requests, ordered=True):
+        '''InsertOne, UpdateOne, UpdateMany and ReplaceOne requests, under one lock'''
+        rv = Result(inserted_count=0, upserted_ids={})
+        with self.db.lock:
+            for i, req in enumerate(requests):
+                try:
+                    if isinstance(req, InsertOne):
+                        self.insert_one(req._doc)
+                        rv.inserted_count += 1
+                        continue
+                    r = self._update(req._filter, req._doc, req._upsert, isinstance(req, UpdateMany))
+                except DuplicateKeyError:
+                    if ordered:
+                        raise
+                    continue
+                rv.matched_count += r.matched_count
+                rv.modified_count += r.modified_count
+                if r.upserted_id is not None:
+                    rv.upserted_ids[i] = r.upserted_id
+        return rv
+
+    def find(self, selector=None, projection=None):
+        return Cursor(self, selector, projection)
+
+    def find_one(self, selector=None, projection=None):
+        if selector is not None and not isinstance(selector, dict):
+            selector = {'_id': selector}
+        for doc in self.find(selector, projection).limit(1):
+            return doc
+        return None
+
+    def count(self, selector=None):
+        return self.find(selector).count()
+
+    def _delete(self, selector, limit=None):
+        with self.db.lock:
+            found = self._matching(_normalize(selector or {}), limit)
+            for rowid, _ in found:
+                self.db._write('DELETE FROM {} WHERE rowid = ?'.format(self.table), [rowid])
+        return Result(deleted_count=len(found))
+
+    def delete_many(self, selector):
+        return self._delete(selector)
+
+    def delete_one(self, selector):
+        return self._delete(selector, 1)
+
+    def remove(self, selector=None):
+        return self._delete(selector)
+
+    def drop(self):
+        self.db.drop_collection(self.name)
+
+class Database(object):
+    def __init__(self, path, batch=1000, interval=1.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.lock = threading.RLock()
+        self.batch = batch
+        self.pending = 0
+        self.tables = set(r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        self.collections = {}
+        self.stopping = threading.Event()
+        self.committer = None
+        atexit.register(self._shutdown)
+        if interval:
+            self.committer = threading.Thread(target=self._committer, args=(interval,))
+            self.committer.daemon = True
+            self.committer.start()
+
+    def _exists(self, name):
+        return name in self.tables
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def _write(self, sql, params):
+        with self.lock:
+            if not self.pending:
+                self.conn.execute('BEGIN')
+            self.pending += 1
+            try:
+                self.conn.execute(sql, params)
+            finally:
+                if self.pending >= self.batch:
+                    self.commit()
+
+    def _committer(self, interval):
+        while not self.stopping.wait(interval):
+            self.commit()
+
+    def _shutdown(self):
+        # stop the committer before the interpreter tears down the modules
+        # it is using, then write out what's left
+        self.stopping.set()
+        if self.committer is not None:
+            self.committer.join(5)
+        self.commit()
+
+    def commit(self):
+        with self.lock:
+            if self.pending:
+                self.conn.execute('COMMIT')
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.commit()
+            self.conn.close()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = Collection(self, name)
+            return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def collection_names(self):
+        return sorted(self.tables)
+
+    list_collection_names = collection_names
+
+    def drop_collection(self, name):
+        with self.lock:
+            self.commit()
+            self.conn.execute('DROP TABLE IF EXISTS "{}"'.format(name.replace('"', '""')))
+            self.tables.discard(name)
+            self.collections.pop(name, None)
+
+    def command(self, cmd, *args, **kwargs):
+        with self.lock:
+            pages = self.conn.execute('PRAGMA page_count').fetchone()[0]
+            size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        return {'ok': 1.0, 'db': self.path, 'collections': len(self.tables), 'storageSize': pages * size}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Database selection. mongodb:// urls connect to mongod as always;
+# sqlite:PATH or sqlite:///ABSOLUTE/PATH opens the embedded store in
+# sqlitedb.py instead, for standalone sensors.
+#
+# The few pymongo and bson names the loaders and sqlitedb.py use are
+# imported from here. Without pymongo installed they are stand-ins that
+# behave the same as far as the SQLite backend is concerned, so a sensor
+# only needs pymongo to talk to a mongod.
+
+import os
+import struct
+import threading
+from time import time
+
+try:
+    import pymongo
+    from pymongo import GEOSPHERE, InsertOne, UpdateOne, UpdateMany, ReplaceOne
+    from pymongo.errors import PyMongoError, OperationFailure, WriteError, DuplicateKeyError
+    from bson import ObjectId
+except ImportError:
+    pymongo = None
+    GEOSPHERE = '2dsphere'
+
+    class InsertOne(object):
+        def __init__(self, document):
+            self._doc = document
+
+    class UpdateOne(object):
+        def __init__(self, filter, update, upsert=False):
+            self._filter = filter
+            self._doc = update
+            self._upsert = upsert
+
+    class UpdateMany(UpdateOne):
+        pass
+
+    class ReplaceOne(UpdateOne):
+        pass
+
+    class PyMongoError(Exception):
+        pass
+
+    class OperationFailure(PyMongoError):
+        pass
+
+    class WriteError(OperationFailure):
+        pass
+
+    class DuplicateKeyError(WriteError):
+        pass
+
+    class ObjectId(object):
+        '''12 bytes of seconds, random and a counter, like bson's'''
+        __slots__ = ['binary']
+        _lock = threading.Lock()
+        _random = os.urandom(5)
+        _inc = struct.unpack('>I', os.urandom(4))[0] & 0xffffff
+
+        def __init__(self, oid=None):
+            if oid is None:
+                with ObjectId._lock:
+                    ObjectId._inc = (ObjectId._inc + 1) & 0xffffff
+                    inc = ObjectId._inc
+                oid = struct.pack('>I', int(time()) & 0xffffffff) + ObjectId._random + struct.pack('>I', inc)[1:]
+            elif len(oid) == 24:
+                oid = oid.decode('hex')
+            self.binary = oid
+
+        def __getstate__(self):
+            return self.binary
+
+        def __setstate__(self, state):
+            # bson's own pickles hold a dict
+            self.binary = state['_ObjectId__id'] if isinstance(state, dict) else state
+
+        def __str__(self):
+            return self.binary.encode('hex')
+
+        def __repr__(self):
+            return "ObjectId('{}')".format(self)
+
+        def __eq__(self, other):
+            return isinstance(other, ObjectId) and self.binary == other.binary
+
+        def __ne__(self, other):
+            return not self == other
+
+        def __lt__(self, other):
+            return self.binary < other.binary
+
+        def __hash__(self):
+            return hash(self.binary)
+
+def is_sqlite(url):
+    return url is not None and url.startswith('sqlite:')
+
+def sqlite_path(url):
+    path = url[len('sqlite:'):]
+    if path.startswith('//'):
+        path = path[2:]
+    return path
+
+def connect(url, db='skyshark', **kwargs):
+    '''a database handle for url; kwargs are passed to MongoClient'''
+    if is_sqlite(url):
+        import sqlitedb
+        return sqlitedb.Database(sqlite_path(url))
+    if pymongo is None:
+        raise ImportError('{} needs pymongo (pip install pymongo), or use a sqlite: url'.format(url))
+    return pymongo.MongoClient(url, **kwargs)[db]
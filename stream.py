@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Live feed of what the loaders store, so dashboards and alerting don't
+# have to poll MongoDB. A loader started with -L PORT publishes each
+# decoded ACARS message and each ADS-B position as a line of JSON to every
+# TCP subscriber whose filter matches it.
+#
+# A subscriber may send a filter as a line of JSON at any time; it applies
+# from then on. Every given key must match, and a list matches any of its
+# values:
+#   {"type": "acars"|"position", "label": ["H1", "SQ"], "icao24": "A1B2C3",
+#    "callsign": "UAL123", "bbox": [west, south, east, north]}
+# callsign matches the flight of ACARS messages. eg.
+#   (echo '{"label": "SQ"}'; cat) | nc localhost 5557
+#
+# Each subscriber has a bounded buffer. If it can't keep up, its oldest
+# undelivered messages are dropped; ingest never waits for a subscriber.
+
+import json
+import socket
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import metrics
+
+published = metrics.counter('skyshark_stream_published_total', 'messages published to live subscribers', ['type'])
+stream_dropped = metrics.counter('skyshark_stream_dropped_total', 'messages dropped because a live subscriber was too slow')
+
+_publisher = None
+
+def _default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+def msg_position(msg):
+    '''(lon, lat) of a position or a decoded ACARS message, or None'''
+    loc = msg.get('loc')
+    if loc is not None:
+        return tuple(loc['coordinates'])
+    try:
+        return float(msg['lon']), float(msg['lat'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _aslist(v):
+    return v if isinstance(v, list) else [v]
+
+def compile_filter(spec):
+    '''turn a subscriber's filter into a predicate on (type, msg)'''
+    tests = []
+    if spec.get('type'):
+        types = set(_aslist(spec['type']))
+        tests.append(lambda kind, msg: kind in types)
+    if spec.get('label'):
+        labels = set(l.upper() for l in _aslist(spec['label']))
+        tests.append(lambda kind, msg: msg.get('label') in labels)
+    if spec.get('icao24'):
+        icaos = set(i.upper() for i in _aslist(spec['icao24']))
+        tests.append(lambda kind, msg: (msg.get('icao24') or '').strip().upper() in icaos)
+    if spec.get('callsign'):
+        callsigns = set(c.strip().upper() for c in _aslist(spec['callsign']))
+        def callsign(kind, msg):
+            c = msg.get('flight') if kind == 'acars' else msg.get('callsign')
+            return (c or '').strip().upper() in callsigns
+        tests.append(callsign)
+    if spec.get('bbox'):
+        west, south, east, north = [float(x) for x in spec['bbox']]
+        def bbox(kind, msg):
+            pos = msg_position(msg)
+            return pos is not None and west <= pos[0] <= east and south <= pos[1] <= north
+        tests.append(bbox)
+    return lambda kind, msg: all(t(kind, msg) for t in tests)
+
+class Subscriber(object):
+    def __init__(self, sock, addr, buffer_size):
+        self.sock = sock
+        self.addr = addr
+        self.match = compile_filter({})
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.cond = threading.Condition(threading.Lock())
+        self.closed = False
+
+    def send(self, line):
+        with self.cond:
+            if len(self.buffer) >= self.buffer_size:
+                self.buffer.popleft()
+                stream_dropped.inc()
+            self.buffer.append(line)
+            self.cond.notify()
+
+    def writer(self):
+        try:
+            while not self.closed:
+                with self.cond:
+                    if not self.buffer:
+                        self.cond.wait(1.0)
+                    lines = list(self.buffer)
+                    self.buffer.clear()
+                if lines:
+                    self.sock.sendall(b''.join(lines))
+        except socket.error:
+            pass
+        self.closed = True
+
+    def reader(self):
+        fd = self.sock.makefile('rb')
+        try:
+            for line in fd:
+                if not line.strip():
+                    continue
+                try:
+                    self.match = compile_filter(json.loads(line))
+                    logging.info("live subscriber %s:%d filter %s", self.addr[0], self.addr[1], line.strip())
+                except (ValueError, TypeError, AttributeError) as e:
+                    self.send(json.dumps({'error': 'bad filter: {}'.format(e)}).encode('utf-8') + b'\n')
+        except socket.error:
+            pass
+        self.closed = True
+        with self.cond:
+            self.cond.notify()
+
+class Publisher(object):
+    def __init__(self, buffer_size=1000):
+        self.buffer_size = buffer_size
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def accept(self, listener):
+        while True:
+            sock, addr = listener.accept()
+            sub = Subscriber(sock, addr, self.buffer_size)
+            for fn in [sub.reader, sub.writer]:
+                t = threading.Thread(target=fn)
+                t.daemon = True
+                t.start()
+            with self.lock:
+                self.subscribers.append(sub)
+            logging.info("live subscriber connected from %s:%d", addr[0], addr[1])
+
+    def publish(self, kind, msg):
+        with self.lock:
+            if any(s.closed for s in self.subscribers):
+                for s in self.subscribers:
+                    if s.closed:
+                        s.sock.close()
+                self.subscribers = [s for s in self.subscribers if not s.closed]
+            subscribers = self.subscribers
+        line = None
+        for s in subscribers:
+            if s.match(kind, msg):
+                if line is None:
+                    doc = dict(msg)
+                    doc['type'] = kind
+                    doc.pop('_id', None)
+                    line = json.dumps(doc, default=_default).encode('utf-8') + b'\n'
+                s.send(line)
+        if line is not None:
+            published.inc(kind)
+
+def publish(kind, msg):
+    '''send msg to matching subscribers, if the live stream is enabled'''
+    if _publisher is not None:
+        _publisher.publish(kind, msg)
+
+def serve(port, bind='localhost', buffer_size=1000):
+    '''start accepting live subscribers on a background thread'''
+    global _publisher
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((bind, port))
+    listener.listen(16)
+    _publisher = Publisher(buffer_size)
+    t = threading.Thread(target=_publisher.accept, args=(listener,))
+    t.daemon = True
+    t.start()
+    logging.info("serving live stream on %s:%d", bind, port)
+    return _publisher
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# vim: tabstop=4:softtabstop=4:shiftwidth=4:expandtab:
+
+# Inverted index of ACARS message text, so that finding every message that
+# mentions a runway, a station or a fault code doesn't scan `acars`. The
+# loader tokenizes each message it stores and appends its _id to one
+# posting list per token and hour in `acars_text`:
+#
+#   {_id: 'TOKEN|COLLECTION|YYYYMMDDHH', token, coll, hour, n, ids: [...]}
+#
+# Postings are buffered and written every `rows` messages or `interval`
+# seconds, of data or, on a quiet feed, of wall clock time, one $push per
+# list, so a busy token costs one write a flush rather than one per
+# message. Tokens are
+#
+#   the words of the text, flight and tail, uppercased: RWY, 22L, UA123
+#   APT:XXXX   airports named in the text or by the decoders (dep, arr, dest)
+#   the words of the expansion of abbreviations in expn.abbrevs and of
+#   label 5Z message types in expn.united_5z, so 'approach' finds APRCH
+#
+# Queries are words, all of which must match; a word ending in * matches
+# any token with that prefix, and "quoted words" must also appear in that
+# order in the text, which is checked on the messages themselves. The
+# rarest term is looked up first and only the hours it was found in are
+# read for the others, so a search costs about as much as its rarest term.
+
+import re
+import logging
+
+from expn import abbrevs, united_5z
+from partitions import _utc
+from replay import monotonic
+
+word_re = re.compile('[A-Z0-9]+')
+airport_fields = ['dep', 'arr', 'dest']
+# short abbreviations are mostly field tags which also turn up by accident
+min_abbrev = 3
+
+def _expansions(table, min_len=1):
+    return dict((k, tuple(set(word_re.findall(v.upper())))) for k, v in table.items() if len(k) >= min_len)
+
+abbrev_words = _expansions(abbrevs, min_abbrev)
+mtype_words = _expansions(united_5z)
+
+def words(text):
+    return word_re.findall(text.upper()) if text else []
+
+def tokens(msg, airports=()):
+    '''the set of index tokens of a processed ACARS message'''
+    text = msg.get('text') or ''
+    ws = words(text)
+    rv = set(ws)
+    for w in ws:
+        if w in abbrev_words:
+            rv.update(abbrev_words[w])
+        if len(w) == 4 and w in airports:
+            rv.add('APT:' + w)
+    for f in ['flight', 'tail']:
+        rv.update(words(msg.get(f)))
+    for f in airport_fields:
+        apt = msg.get(f)
+        if apt:
+            apt = apt.upper()
+            rv.add('APT:' + apt)
+            if len(apt) == 3 and 'K' + apt in airports:
+                rv.add('APT:K' + apt) # decode_5Z drops the K of US airports
+    mtype = msg.get('mtype')
+    if mtype in mtype_words:
+        rv.update(mtype_words[mtype])
+    return rv
+
+def known_airports(dbh):
+    '''ICAO idents of the airports in airport_info'''
+    return set(a['_id'] for a in dbh['airport_info'].find({}, {'_id': True}) if a.get('_id'))
+
+def create_indexes(dbh):
+    dbh['acars_text'].create_index([('token', 1), ('hour', 1)])
+    dbh['acars_text'].create_index('hour')
+
+def _hour(ts):
+    return _utc(ts).replace(minute=0, second=0, microsecond=0)
+
+class TextIndex(object):
+    '''buffers postings of stored messages and writes them to acars_text'''
+    def __init__(self, dbh, airports=(), rows=1000, interval=60):
+        self.dbh = dbh
+        self.airports = airports
+        self.max_rows = rows
+        self.interval = interval
+        self.pending = {} # (token, coll, hour) -> [_id]
+        self.rows = 0
+        self.first = None
+        self.since = None # monotonic() at the first pending message
+
+    def add(self, coll, _id, msg):
+        '''index a message stored as _id in collection coll'''
+        t = _utc(msg['date'])
+        hour = t.replace(minute=0, second=0, microsecond=0)
+        for token in tokens(msg, self.airports):
+            self.pending.setdefault((token, coll, hour), []).append(_id)
+        self.rows += 1
+        if self.first is None:
+            self.first = t
+            self.since = monotonic()
+        if self.rows >= self.max_rows or abs((t - self.first).total_seconds()) >= self.interval:
+            self.flush()
+
+    def idle(self):
+        '''flush postings that have waited `interval` seconds, for when no more messages come'''
+        if self.since is not None and monotonic() - self.since >= self.interval:
+            self.flush()
+
+    def flush(self):
+        for (t, coll, hour), ids in self.pending.items():
+            key = '{}|{}|{}'.format(t, coll, hour.strftime('%Y%m%d%H'))
+            self.dbh['acars_text'].update_one({'_id': key},
+                {'$set': {'token': t, 'coll': coll, 'hour': hour},
+                 '$inc': {'n': len(ids)}, '$push': {'ids': {'$each': ids}}}, upsert=True)
+        self.pending = {}
+        self.rows = 0
+        self.first = None
+        self.since = None
+
+def parse_query(q):
+    '''[(kind, value)] for a query string; kind is word, prefix or phrase'''
+    rv = []
+    for phrase, term in re.findall(r'"([^"]*)"|(\S+)', q):
+        if phrase:
+            ws = words(phrase)
+            if len(ws) > 1:
+                rv.append(('phrase', ws))
+            rv.extend(('word', w) for w in ws)
+        elif term.endswith('*'):
+            ws = words(term)
+            rv.extend(('word', w) for w in ws[:-1])
+            if ws:
+                rv.append(('prefix', ws[-1]))
+        elif term.upper().startswith('APT:'):
+            rv.append(('word', term.upper()))
+        else:
+            rv.extend(('word', w) for w in words(term))
+    return rv
+
+def _selector(kind, value, since, until, hours=None):
+    if kind == 'prefix':
+        sel = {'token': {'$gte': value, '$lt': value + u'\uffff'}}
+    else:
+        sel = {'token': value}
+    if hours is not None:
+        sel['hour'] = {'$in': sorted(hours)}
+    elif since is not None or until is not None:
+        sel['hour'] = {}
+        if since is not None:
+            sel['hour']['$gte'] = _hour(since)
+        if until is not None:
+            sel['hour']['$lt'] = until
+    return sel
+
+def candidates(dbh, terms, since=None, until=None):
+    '''{(coll, hour): set(_id)} of messages with every word and prefix term'''
+    terms = [t for t in terms if t[0] != 'phrase']
+    if not terms:
+        return {}
+    sizes = []
+    for kind, value in terms:
+        n = sum(p.get('n', 0) for p in dbh['acars_text'].find(_selector(kind, value, since, until), {'n': True}))
+        if n == 0:
+            return {}
+        sizes.append((n, kind, value))
+    sizes.sort()
+
+    rv = None
+    for n, kind, value in sizes:
+        hours = None if rv is None else set(h for _, h in rv)
+        found = {}
+        for p in dbh['acars_text'].find(_selector(kind, value, since, until, hours), {'coll': True, 'hour': True, 'ids': True}):
+            found.setdefault((p['coll'], p['hour']), set()).update(p.get('ids', []))
+        if rv is None:
+            rv = found
+        else:
+            rv = dict((k, ids & found[k]) for k, ids in rv.items() if k in found)
+            rv = dict((k, ids) for k, ids in rv.items() if ids)
+        if not rv:
+            return {}
+    return rv
+
+def _has_phrase(msg, phrase):
+    ws = words(msg.get('text'))
+    n = len(phrase)
+    return any(ws[i:i + n] == phrase for i in range(len(ws) - n + 1))
+
+def search(dbh, q, since=None, until=None, labels=None, limit=100, batch=500):
+    '''ACARS messages matching query q, newest first'''
+    terms = parse_query(q)
+    phrases = [v for k, v in terms if k == 'phrase']
+    found = candidates(dbh, terms, since, until)
+    rv = []
+    for coll, hour in sorted(found, key=lambda k: k[1], reverse=True):
+        ids = list(found[(coll, hour)])
+        for i in range(0, len(ids), batch):
+            sel = {'_id': {'$in': ids[i:i + batch]}}
+            if labels:
+                sel['label'] = {'$in': [l.upper() for l in labels]}
+            for msg in dbh[coll].find(sel):
+                if since is not None and _utc(msg['date']) < _utc(since):
+                    continue
+                if until is not None and _utc(msg['date']) >= _utc(until):
+                    continue
+                if all(_has_phrase(msg, p) for p in phrases):
+                    rv.append(msg)
+        # hours are newest first, so once there are enough the rest are older
+        if limit and len(rv) >= limit:
+            break
+    rv.sort(key=lambda m: _utc(m['date']), reverse=True)
+    return rv[:limit] if limit else rv
+
+def reindex(dbh, coll, index, since=None, until=None):
+    '''replace the postings of a collection's messages, returning how many were indexed'''
+    sel = {}
+    postings = {'coll': coll}
+    if since is not None or until is not None:
+        sel['date'] = {}
+        postings['hour'] = {}
+        if since is not None:
+            sel['date']['$gte'] = since
+            postings['hour']['$gte'] = _hour(since)
+        if until is not None:
+            sel['date']['$lt'] = until
+            postings['hour']['$lt'] = until
+    dbh['acars_text'].delete_many(postings)
+    n = 0
+    for msg in dbh[coll].find(sel):
+        index.add(coll, msg['_id'], msg)
+        n += 1
+        if n % 100000 == 0:
+            logging.info("indexed %d messages from %s", n, coll)
+    index.flush()
+    return n